@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Module: bench_db
+Role: Microbenchmark for db.py hot paths (pooled vs connect-per-call).
+Uses: db (import), argparse, multiprocessing, tempfile, threading, time (stdlib)
+Used by: humans (python3 bench_db.py [-n 2000] [--concurrent])
+
+Runs the orchestrator's per-cycle calls against a throwaway database with
+the production schema, once with DB_POOL=0 (a fresh connection + PRAGMAs per
+call) and once pooled, and prints ops/sec for each.
+
+--concurrent instead runs callback-like writer processes (dispatch + release
++ finish) next to orchestrator-like reader threads for a fixed time, once
+with reads inside get_db() transactions and once through read_db(), and
+prints throughput and read latency for both.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+import db  # noqa: E402
+
+
+def _ops() -> dict:
+    def cycle_reads():
+        db.get_project_state("bench")
+        db.get_available_slots("claude")
+
+    def dispatch_finish():
+        res = db.dispatch_task("bench", "claude", 1, "bench:FTR-1", "autopilot", "running")
+        db.release_slot(1)
+        db.finish_task(1, "done", 0)
+        return res
+
+    return {"read (state + slots)": cycle_reads, "dispatch + release + finish": dispatch_finish}
+
+
+def _run(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return n / (time.perf_counter() - start)
+
+
+def _writer(db_path: str, worker: int, stop, counter) -> None:
+    """Callback-like process: dispatch + release + finish until `stop` is set."""
+    db.DB_PATH = db_path
+    pueue_id = worker * 1_000_000
+    done = 0
+    while not stop.is_set():
+        pueue_id += 1
+        db.dispatch_task("bench", "claude", pueue_id, "bench:FTR-1", "autopilot", "running")
+        db.release_slot(pueue_id)
+        db.finish_task(pueue_id, "done", 0)
+        done += 1
+    with counter.get_lock():
+        counter.value += done
+
+
+def _concurrent(readers: int, writers: int, seconds: float) -> dict:
+    """Run writers (processes) and readers (threads) together; return throughput."""
+    ctx = multiprocessing.get_context("fork")
+    stop, counter = ctx.Event(), ctx.Value("i", 0)
+    procs = [
+        ctx.Process(target=_writer, args=(db.DB_PATH, w + 1, stop, counter)) for w in range(writers)
+    ]
+    latencies: list[float] = []
+    halt = threading.Event()
+
+    def reader() -> None:
+        local = []
+        while not halt.is_set():
+            start = time.perf_counter()
+            db.get_project_state("bench")
+            db.get_free_slots_by_provider()
+            db.get_occupied_slots()
+            local.append(time.perf_counter() - start)
+        db.close_db()
+        latencies.extend(local)
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    for p in procs:
+        p.start()
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    halt.set()
+    stop.set()
+    for t in threads:
+        t.join()
+    for p in procs:
+        p.join()
+    latencies.sort()
+    return {
+        "reads": len(latencies) / seconds,
+        "writes": counter.value / seconds,
+        "p50": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+        "p99": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[3])
+    ap.add_argument("-n", type=int, default=2000, help="iterations per operation")
+    ap.add_argument("--concurrent", action="store_true", help="mixed reader/writer run")
+    ap.add_argument("--readers", type=int, default=4, help="reader threads (--concurrent)")
+    ap.add_argument("--writers", type=int, default=4, help="writer processes (--concurrent)")
+    ap.add_argument("--seconds", type=float, default=5.0, help="duration per mode (--concurrent)")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = str(Path(tmp) / "bench.db")
+        conn = sqlite3.connect(db.DB_PATH)
+        conn.executescript((SCRIPT_DIR / "schema.sql").read_text())
+        conn.close()
+        db.seed_projects_from_json([{"project_id": "bench", "path": tmp, "provider": "claude"}])
+
+        if args.concurrent:
+            read_db = db.read_db
+            print(f"{'reads via':<10} {'reads':>10} {'writes':>10} {'p50 ms':>8} {'p99 ms':>8}")
+            for name, ctx in (("get_db", db.get_db), ("read_db", read_db)):
+                db.read_db = ctx  # the read helpers look read_db up at call time
+                r = _concurrent(args.readers, args.writers, args.seconds)
+                print(
+                    f"{name:<10} {r['reads']:>8.0f}/s {r['writes']:>8.0f}/s "
+                    f"{r['p50']:>8.2f} {r['p99']:>8.2f}"
+                )
+            db.read_db = read_db
+            return
+
+        print(f"{'operation':<30} {'per-call':>12} {'pooled':>12} {'speedup':>8}")
+        for name, fn in _ops().items():
+            os.environ["DB_POOL"] = "0"
+            base = _run(fn, args.n)
+            os.environ["DB_POOL"] = "1"
+            pooled = _run(fn, args.n)
+            db.close_db()
+            print(f"{name:<30} {base:>10.0f}/s {pooled:>10.0f}/s {pooled / base:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,24 +2,36 @@
 """
 Module: callback
 Role: Pueue completion callback — release slot, update phase, dispatch QA/Reflect.
-Uses: db, event_writer, subprocess (pueue CLI fallback)
-Used by: Pueue daemon (pueue.yml callback config)
+      Only slot release + task finish run inline; the other steps are durable
+      callback_jobs (db.py) with retries, run by the daemon's worker.
+Uses: db, event_writer, pueue_state, spec_catalog, subprocess (pueue CLI fallback)
+Used by: callback_client.py (pueue.yml callback hook; in-process fallback),
+         systemd dld-callback.service (daemon mode)
 CLI: python3 callback.py <pueue_id> '<group>' '<result>'
-INVARIANT: Always exit 0. Every step in try/except.
+     python3 callback.py serve [--socket PATH]
+INVARIANT: Always exit 0. A failing step never blocks the others (job retries).
 """
 
 import json
 import logging
 import os
 import re
+import shutil
+import signal
+import socketserver
 import subprocess
 import sys
+import tempfile
+import threading
+import time
 from pathlib import Path
 
 SCRIPT_DIR = Path(__file__).resolve().parent
 sys.path.insert(0, str(SCRIPT_DIR))
 import db  # noqa: E402
 import event_writer  # noqa: E402
+import spec_catalog  # noqa: E402
+from pueue_state import PueueSnapshot, state_name  # noqa: E402
 
 log = logging.getLogger("callback")
 
@@ -54,7 +66,76 @@ def _setup_logging() -> None:
     root.addHandler(stderr_handler)
 
 
-def resolve_label(pueue_id: str) -> str:
+class PueueView:
+    """One callback's view of pueue: `pueue status --json` at most once.
+
+    Created per callback run and passed through resolve_label,
+    extract_agent_output and the QA/reflect dedup checks, which used to
+    fetch and parse the full pueue state up to four times per callback.
+    The fetch is lazy (the DB answers most lookups) and task records are
+    memoized; tasks we add are noted so later dedup checks still see them.
+    """
+
+    def __init__(self):
+        self._snapshot: PueueSnapshot | None = None
+        self._records: dict[int, dict] = {}
+
+    def snapshot(self) -> PueueSnapshot:
+        if self._snapshot is None:
+            # Any parseable output counts, whatever the exit status — as the
+            # per-step fetches this replaces did (PueueSnapshot.fetch is stricter).
+            try:
+                r = subprocess.run(
+                    ["pueue", "status", "--json"],
+                    capture_output=True,
+                    text=True,
+                    timeout=10,
+                )
+                self._snapshot = PueueSnapshot(json.loads(r.stdout).get("tasks", {}))
+            except Exception as exc:
+                log.warning("pueue status failed: %s", exc)
+                self._snapshot = PueueSnapshot(None)
+        return self._snapshot
+
+    def task(self, pueue_id) -> dict:
+        """{label, command, start_ts, state} of one task; {} if pueue does not know it."""
+        tid = int(pueue_id)
+        if tid not in self._records:
+            task = self.snapshot().task(tid)
+            self._records[tid] = _task_record(task) if task else {}
+        return self._records[tid]
+
+    def has_active_label(self, label: str) -> bool:
+        return self.snapshot().has_active_label(label)
+
+    def note_added(self, pueue_id: int, label: str) -> None:
+        if self._snapshot is not None:
+            self._snapshot.note_added(pueue_id, label)
+
+
+def _task_record(task: dict) -> dict:
+    """The fields callbacks use from a raw pueue task (start_ts: epoch, 0.0 if unknown)."""
+    start_ts = 0.0
+    s = task.get("status", {})
+    if isinstance(s, dict):
+        inner = s.get("Running") or s.get("Done") or {}
+        start_str = inner.get("start") if isinstance(inner, dict) else None
+        if start_str:
+            try:
+                from datetime import datetime
+
+                start_ts = datetime.fromisoformat(start_str.replace("Z", "+00:00")).timestamp()
+            except Exception:
+                pass
+    return {
+        "label": task.get("label") or "",
+        "command": task.get("command") or task.get("original_command") or "",
+        "start_ts": start_ts,
+        "state": state_name(task.get("status", "")),
+    }
+
+
+def resolve_label(pueue_id: str, pueue: PueueView | None = None) -> str:
     """Get task label. DB-first, pueue CLI fallback."""
     # Layer 1: DB (reliable — no socket dependency)
     try:
@@ -73,15 +154,7 @@ def resolve_label(pueue_id: str) -> str:
 
     # Layer 2: pueue CLI (fallback — may fail due to socket mismatch)
     try:
-        result = subprocess.run(
-            ["pueue", "status", "--json"],
-            capture_output=True,
-            text=True,
-            timeout=10,
-        )
-        data = json.loads(result.stdout)
-        task = data.get("tasks", {}).get(pueue_id, {})
-        label = task.get("label", "unknown") or "unknown"
+        label = (pueue or PueueView()).task(pueue_id).get("label") or "unknown"
         if label != "unknown":
             log.info("resolve_label from pueue: %s", label)
         return label
@@ -123,8 +196,25 @@ def _find_log_file(project_name: str, after_ts: float = 0.0) -> Path | None:
     return None
 
 
-def _skill_from_pueue_command(pueue_id: str) -> tuple[str, float]:
-    """Read skill + task start_time from `pueue status --json`.
+def _runner_log(pueue_id: str, project_id: str, after_ts: float = 0.0) -> Path | None:
+    """This run's runner log file, or None.
+
+    O(1) through task_log.log_path, which claude-runner.py records when it
+    starts; a recorded path that does not exist means the runner was killed
+    before writing it. Rows without a path (codex/gemini runners, tasks
+    logged before log_path existed) fall back to _find_log_file.
+    """
+    row = db.get_task_by_pueue_id(int(pueue_id))
+    if row and row.get("log_path"):
+        path = Path(row["log_path"])
+        return path if path.is_file() else None
+    state = db.get_project_state(project_id) if project_id else None
+    project_name = Path(state.get("path", "")).name if state else ""
+    return _find_log_file(project_name, after_ts=after_ts) if project_name else None
+
+
+def _skill_from_pueue_command(pueue_id: str, pueue: PueueView | None = None) -> tuple[str, float]:
+    """Read skill + task start_time from the pueue task record.
 
     Pueue stores the original launch command. Our run-agent.sh signature is:
         run-agent.sh <project_dir> <provider> <skill> <task...>
@@ -138,39 +228,17 @@ def _skill_from_pueue_command(pueue_id: str) -> tuple[str, float]:
     Returns (skill, start_ts). Both empty/0.0 on failure (caller falls back).
     """
     try:
-        r = subprocess.run(
-            ["pueue", "status", "--json"],
-            capture_output=True,
-            text=True,
-            timeout=10,
-        )
-        if r.returncode != 0:
-            return "", 0.0
-        data = json.loads(r.stdout)
-        task = data.get("tasks", {}).get(str(pueue_id), {})
-        cmd = task.get("command") or task.get("original_command") or ""
+        task = (pueue or PueueView()).task(pueue_id)
         # Extract 4th token (after run-agent.sh project_dir provider <skill>)
         # Tolerant to absolute / relative path of run-agent.sh.
-        parts = cmd.split()
+        parts = task.get("command", "").split()
         skill = ""
         for i, p in enumerate(parts):
             if p.endswith("run-agent.sh") and i + 3 < len(parts):
                 skill = parts[i + 3]
                 break
-        # Parse start_ts to filter stale neighbour logs
-        start_ts = 0.0
-        s = task.get("status", {})
-        if isinstance(s, dict):
-            inner = s.get("Running") or s.get("Done") or {}
-            start_str = inner.get("start") if isinstance(inner, dict) else None
-            if start_str:
-                try:
-                    from datetime import datetime
-
-                    start_ts = datetime.fromisoformat(start_str.replace("Z", "+00:00")).timestamp()
-                except Exception:
-                    pass
-        return skill, start_ts
+        # start_ts filters stale neighbour logs
+        return skill, task.get("start_ts", 0.0)
     except Exception as exc:
         log.warning("_skill_from_pueue_command failed: %s", exc)
         return "", 0.0
@@ -204,7 +272,9 @@ def _parse_log_file(log_path: Path) -> tuple:
         return "", ""
 
 
-def extract_agent_output(pueue_id: str, project_id: str = "") -> tuple:
+def extract_agent_output(
+    pueue_id: str, project_id: str = "", pueue: PueueView | None = None
+) -> tuple:
     """Extract skill and result_preview.
 
     Resolution order (skill first, preview second):
@@ -214,27 +284,22 @@ def extract_agent_output(pueue_id: str, project_id: str = "") -> tuple:
       3. pueue raw log
     """
     # Layer 0: skill from pueue command (deterministic, never fooled by stale logs)
-    pueue_skill, start_ts = _skill_from_pueue_command(pueue_id)
+    pueue_skill, start_ts = _skill_from_pueue_command(pueue_id, pueue)
 
     # Layer 1: Read from log file (reliable — written by claude-runner.py at end of run)
-    if project_id:
-        try:
-            state = db.get_project_state(project_id)
-            if state:
-                project_name = Path(state.get("path", "")).name
-                if project_name:
-                    log_path = _find_log_file(project_name, after_ts=start_ts)
-                    if log_path:
-                        skill, preview = _parse_log_file(log_path)
-                        # If pueue gave us a skill, trust it over the log file's
-                        # (covers edge case of a still-stale log slipping through).
-                        if pueue_skill:
-                            skill = pueue_skill
-                        if skill:
-                            log.info("extract_agent_output from log: %s", log_path.name)
-                            return skill, preview
-        except Exception as exc:
-            log.warning("extract_agent_output log file failed: %s", exc)
+    try:
+        log_path = _runner_log(pueue_id, project_id, after_ts=start_ts)
+        if log_path:
+            skill, preview = _parse_log_file(log_path)
+            # If pueue gave us a skill, trust it over the log file's
+            # (covers edge case of a still-stale log slipping through).
+            if pueue_skill:
+                skill = pueue_skill
+            if skill:
+                log.info("extract_agent_output from log: %s", log_path.name)
+                return skill, preview
+    except Exception as exc:
+        log.warning("extract_agent_output log file failed: %s", exc)
 
     # If log file missing/stale but pueue knew the skill — return it now.
     if pueue_skill:
@@ -282,10 +347,9 @@ def extract_agent_output(pueue_id: str, project_id: str = "") -> tuple:
 
 def resolve_spec_id(task_label: str, preview: str, project_path: str) -> str | None:
     """Multi-layer spec_id resolution."""
-    # `[a-z]*` captures sub-spec suffixes (e.g. ARCH-176a/b/c/d). Mirrors
-    # orchestrator.scan_backlog regex (v3.15.8). Without it status_sync
-    # would target the parent ARCH-176 instead of ARCH-176a.
-    spec_re = re.compile(r"(TECH|FTR|BUG|ARCH)-\d+[a-z]*")
+    # Shared with orchestrator.scan_backlog via spec_catalog (v3.15.8): the
+    # `[a-z]*` suffix keeps status_sync on ARCH-176a instead of parent ARCH-176.
+    spec_re = spec_catalog.SPEC_ID_RE
 
     # Layer 1: from task label
     m = spec_re.search(task_label)
@@ -312,28 +376,16 @@ def resolve_spec_id(task_label: str, preview: str, project_path: str) -> str | N
     return None
 
 
-def is_already_queued(label: str) -> bool:
-    """Check if a task with this label is Running or Queued."""
+def is_already_queued(label: str, pueue: PueueView | None = None) -> bool:
+    """Check if a task with this label is live (Running, Queued, Paused, ...)."""
     try:
-        result = subprocess.run(
-            ["pueue", "status", "--json"],
-            capture_output=True,
-            text=True,
-            timeout=10,
-        )
-        data = json.loads(result.stdout)
-        for task in data.get("tasks", {}).values():
-            if task.get("label") == label:
-                status = task.get("status", {})
-                if isinstance(status, dict) and ("Running" in status or "Queued" in status):
-                    return True
-        return False
+        return (pueue or PueueView()).has_active_label(label)
     except Exception:
         return False
 
 
-def _pueue_add(group: str, label: str, cmd: list) -> int | None:
-    """Submit task to pueue. Returns task ID or None."""
+def _pueue_add(group: str, label: str, cmd: list, env: dict | None = None) -> int | None:
+    """Submit task to pueue (DLD_TASK_LABEL + extra `env` for the task). Returns ID or None."""
     try:
         pueue_cmd = [
             "pueue",
@@ -350,6 +402,7 @@ def _pueue_add(group: str, label: str, cmd: list) -> int | None:
             capture_output=True,
             text=True,
             timeout=30,
+            env={**os.environ, **(env or {}), "DLD_TASK_LABEL": label},
         )
         for line in result.stdout.strip().splitlines():
             m = re.search(r"(\d+)", line.strip())
@@ -360,44 +413,75 @@ def _pueue_add(group: str, label: str, cmd: list) -> int | None:
         return None
 
 
-def dispatch_qa(project_id: str, project_path: str, spec_id: str, provider: str) -> None:
-    """Dispatch QA task via pueue."""
+def dispatch_qa(
+    project_id: str,
+    project_path: str,
+    spec_id: str,
+    provider: str,
+    pueue: PueueView | None = None,
+) -> bool:
+    """Dispatch QA task via pueue. False if pueue add failed (caller may retry)."""
     qa_label = f"{project_id}:qa-{spec_id}"
-    if is_already_queued(qa_label):
+    if is_already_queued(qa_label, pueue):
         log.info("skip duplicate QA: %s", qa_label)
-        return
+        return True
     runner_group = f"{provider}-runner"
+    # Follow-up work is submitted even without a free slot (it waits in the
+    # runner group); the reservation only closes the window against the
+    # orchestrator claiming the slot between pueue add and dispatch_task.
+    slot = db.reserve_slot(project_id, provider)
     pueue_id = _pueue_add(
         runner_group,
         qa_label,
         [str(SCRIPT_DIR / "run-agent.sh"), project_path, provider, "qa", f"/qa {spec_id}"],
+        env=db.lease_env(slot),
     )
     if pueue_id:
-        db.try_acquire_slot(project_id, provider, pueue_id)
-        db.log_task(project_id, qa_label, "qa", "running", pueue_id)
+        db.dispatch_task(
+            project_id, provider, pueue_id, qa_label, "qa", "running", reserved_slot=slot
+        )
+        if pueue is not None:
+            pueue.note_added(pueue_id, qa_label)
         log.info("QA dispatched: %s pueue_id=%d", qa_label, pueue_id)
-    else:
-        log.warning("QA dispatch failed: %s", qa_label)
+        return True
+    if slot is not None:
+        db.cancel_reservation(slot, project_id)
+    log.warning("QA dispatch failed: %s", qa_label)
+    return False
 
 
-def dispatch_reflect(project_id: str, project_path: str, task_label: str, provider: str) -> None:
-    """Dispatch reflect task via pueue."""
+def dispatch_reflect(
+    project_id: str,
+    project_path: str,
+    task_label: str,
+    provider: str,
+    pueue: PueueView | None = None,
+) -> bool:
+    """Dispatch reflect task via pueue. False if pueue add failed (caller may retry)."""
     reflect_label = f"{project_id}:reflect-{task_label}"
-    if is_already_queued(reflect_label):
+    if is_already_queued(reflect_label, pueue):
         log.info("skip duplicate reflect: %s", reflect_label)
-        return
+        return True
     runner_group = f"{provider}-runner"
+    slot = db.reserve_slot(project_id, provider)
     pueue_id = _pueue_add(
         runner_group,
         reflect_label,
         [str(SCRIPT_DIR / "run-agent.sh"), project_path, provider, "reflect", "/reflect"],
+        env=db.lease_env(slot),
     )
     if pueue_id:
-        db.try_acquire_slot(project_id, provider, pueue_id)
-        db.log_task(project_id, reflect_label, "reflect", "running", pueue_id)
+        db.dispatch_task(
+            project_id, provider, pueue_id, reflect_label, "reflect", "running", reserved_slot=slot
+        )
+        if pueue is not None:
+            pueue.note_added(pueue_id, reflect_label)
         log.info("reflect dispatched: %s pueue_id=%d", reflect_label, pueue_id)
-    else:
-        log.warning("reflect dispatch failed: %s", reflect_label)
+        return True
+    if slot is not None:
+        db.cancel_reservation(slot, project_id)
+    log.warning("reflect dispatch failed: %s", reflect_label)
+    return False
 
 
 _VALID_STATUSES = frozenset({"draft", "queued", "in_progress", "blocked", "resumed", "done"})
@@ -437,21 +521,144 @@ def _fix_backlog_status(backlog_path: Path, spec_id: str, target: str) -> bool:
     return False
 
 
+def _git_batch_window() -> float:
+    """Seconds status fixes for one repository are collected before one commit + push.
+
+    Read on use: the in-process path loads .env after importing this module.
+    """
+    return float(os.environ.get("CALLBACK_GIT_WINDOW", "15"))
+
+
+# git_push jobs run on their own daemon worker (a slow push must not hold up
+# other runs' steps); this wakes it when a new batch is queued.
+_GIT_STEPS = ("git_push",)
+_git_wake = threading.Event()
+_PUSH_REJECTED = ("non-fast-forward", "[rejected]", "fetch first")
+
+
 def _git_commit_push(project_path: str, spec_id: str, target: str, files: list) -> None:
-    """Stage, commit, and push status fix."""
+    """Queue a status fix for the repository's next batched commit + push (git_push job).
+
+    If it cannot be queued, commit and push right away — the fixed files
+    are already written, and a retried status_sync would not see them again.
+    """
+    try:
+        db.coalesce_job(
+            "git_push",
+            str(Path(project_path).resolve()),
+            {"repo": project_path, "files": list(files), "marks": [f"{spec_id} as {target}"]},
+            delay=_git_batch_window(),
+        )
+        _git_wake.set()
+        log.info("STATUS_FIX: queued commit for %s → %s", spec_id, target)
+        return
+    except Exception as exc:
+        log.warning("STATUS_FIX: git_push job not queued (%s), pushing inline", exc)
     git = ["git", "-C", project_path]
     subprocess.run(git + ["add"] + files, capture_output=True, timeout=10)
     subprocess.run(
-        git + ["commit", "-m", f"docs: mark {spec_id} as {target} (callback auto-fix)"],
+        git
+        + ["commit", "-m", f"docs: mark {spec_id} as {target} (callback auto-fix)", "--"]
+        + files,
         capture_output=True,
         timeout=30,
     )
-    subprocess.run(
+    subprocess.run(git + ["push", "origin", "develop"], capture_output=True, timeout=60)
+
+
+def _step_git_push(job: dict, pueue: PueueView) -> None:
+    """Stage, commit and push a batch of status fixes: one commit, one push per batch.
+
+    Only the batch's files are committed (pathspec), never other work an
+    agent has staged in the same checkout. A retry finds the commit
+    already made (nothing staged) and only pushes.
+    Marks committed so far are kept in the payload ("committed"): fixes
+    merged into the batch while it waits for a retry get a commit naming
+    only them. A non-fast-forward rejection is rebased and pushed from a
+    scratch worktree (_push_rebased) — never in the live checkout, and
+    not at all while an agent runs in the project (retried with backoff).
+    """
+    p = job["payload"]
+    git = ["git", "-C", p["repo"]]
+    r = subprocess.run(git + ["add"] + p["files"], capture_output=True, text=True, timeout=10)
+    if r.returncode:
+        raise RuntimeError(f"git add failed: {r.stderr.strip()[:200]}")
+    if subprocess.run(
+        git + ["diff", "--cached", "--quiet", "--"] + p["files"], timeout=10
+    ).returncode:
+        committed = p.get("committed", [])
+        marks = [m for m in p["marks"] if m not in committed] or p["marks"]
+        r = subprocess.run(
+            git
+            + ["commit", "-m", f"docs: mark {', '.join(marks)} (callback auto-fix)", "--"]
+            + p["files"],
+            capture_output=True,
+            text=True,
+            timeout=30,
+        )
+        if r.returncode:
+            raise RuntimeError(f"git commit failed: {(r.stderr or r.stdout).strip()[:200]}")
+        p["committed"] = committed + [m for m in marks if m not in committed]
+        db.set_job_payload(job["id"], p)
+    r = subprocess.run(
         git + ["push", "origin", "develop"],
         capture_output=True,
+        text=True,
         timeout=60,
     )
-    log.info("STATUS_FIX: committed and pushed %s → %s", spec_id, target)
+    if r.returncode == 0:
+        log.info("STATUS_FIX: committed and pushed %s", ", ".join(p["marks"]))
+        return
+    if not any(s in r.stderr for s in _PUSH_REJECTED):
+        raise RuntimeError(f"push failed: {r.stderr.strip()[:200]}")
+    # Same rule as orchestrator.git_pull: no history rewriting while an agent
+    # works in the project. Unknown (pueue unreachable) counts as running.
+    snapshot = pueue.snapshot()
+    running = [pid for pid in _projects_at(p["repo"]) if snapshot.is_project_running(pid)]
+    if running or not snapshot.ok:
+        raise RuntimeError(
+            f"push rejected (non-fast-forward); agent running in {', '.join(running) or '?'}"
+        )
+    _push_rebased(p["repo"])
+    log.info("STATUS_FIX: rebased and pushed %s", ", ".join(p["marks"]))
+
+
+def _projects_at(repo: str) -> list[str]:
+    """project_ids whose checkout is `repo` (usually one)."""
+    target = Path(repo).resolve()
+    return [
+        proj["project_id"]
+        for proj in db.get_all_projects()
+        if proj.get("path") and Path(proj["path"]).resolve() == target
+    ]
+
+
+def _push_rebased(repo: str) -> None:
+    """Rebase HEAD onto origin/develop in a scratch worktree and push it from there.
+
+    The live checkout is left as it is; orchestrator.git_pull brings it up
+    to date later (the rebase drops commits already upstream).
+    """
+    git = ["git", "-C", repo]
+    tmp = tempfile.mkdtemp(prefix="dld-push-")
+    tree = os.path.join(tmp, "tree")
+    try:
+        for cmd, timeout in (
+            (git + ["fetch", "origin", "develop"], 60),
+            (git + ["worktree", "add", "--detach", tree, "HEAD"], 30),
+            (["git", "-C", tree, "rebase", "origin/develop"], 60),
+            (["git", "-C", tree, "push", "origin", "HEAD:develop"], 60),
+        ):
+            r = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+            if r.returncode:
+                raise RuntimeError(f"{' '.join(cmd[3:5])} failed: {r.stderr.strip()[:200]}")
+    finally:
+        subprocess.run(["git", "-C", tree, "rebase", "--abort"], capture_output=True, timeout=10)
+        subprocess.run(
+            git + ["worktree", "remove", "--force", tree], capture_output=True, timeout=30
+        )
+        shutil.rmtree(tmp, ignore_errors=True)
+        subprocess.run(git + ["worktree", "prune"], capture_output=True, timeout=10)
 
 
 def _resync_backlog_to_spec(
@@ -472,12 +679,7 @@ def _resync_backlog_to_spec(
     """
     if not backlog_path.is_file():
         return
-    backlog_re = re.compile(
-        rf"\|\s*{re.escape(spec_id)}\s*\|.*?\|\s*{re.escape(spec_status)}\s*\|",
-        re.IGNORECASE,
-    )
-    text = backlog_path.read_text(errors="replace")
-    if backlog_re.search(text):
+    if spec_catalog.catalog_for(project_path).has_status(spec_id, spec_status):
         return  # already in sync
     if _fix_backlog_status(backlog_path, spec_id, spec_status):
         log.warning(
@@ -491,20 +693,15 @@ def _resync_backlog_to_spec(
 def verify_status_sync(project_path: str, spec_id: str, target: str = "done") -> None:
     """Check that spec file and backlog both have target status. Auto-fix if not."""
     p = Path(project_path)
+    catalog = spec_catalog.catalog_for(project_path)
     spec_re = re.compile(rf"\*\*Status:\*\*\s*{re.escape(target)}", re.IGNORECASE)
-    backlog_re = re.compile(
-        rf"\|\s*{re.escape(spec_id)}\s*\|.*?\|\s*{re.escape(target)}\s*\|",
-        re.IGNORECASE,
-    )
 
     # Check spec file
     spec_ok = False
-    spec_file = None
-    spec_files = list(p.glob(f"ai/features/{spec_id}*.md"))
-    if not spec_files:
+    spec_file = catalog.spec_file(spec_id)
+    if spec_file is None:
         log.warning("STATUS_SYNC: spec file not found for %s", spec_id)
     else:
-        spec_file = spec_files[0]
         text = spec_file.read_text(errors="replace")
         if spec_re.search(text):
             spec_ok = True
@@ -515,9 +712,7 @@ def verify_status_sync(project_path: str, spec_id: str, target: str = "done") ->
     if not backlog_path.is_file():
         log.warning("STATUS_SYNC: backlog.md not found in %s", project_path)
     else:
-        text = backlog_path.read_text(errors="replace")
-        if backlog_re.search(text):
-            backlog_ok = True
+        backlog_ok = catalog.has_status(spec_id, target)
 
     if spec_ok and backlog_ok:
         log.info("STATUS_SYNC: %s — both spec and backlog are %s ✓", spec_id, target)
@@ -604,109 +799,371 @@ def write_event_for_skill(project_path: str, skill: str, status: str, task_label
     )
 
 
-def main() -> None:
-    """Main callback entry point. ALWAYS exits 0."""
+def accept_callback(pueue_id: str, group: str, result: str, pueue: PueueView | None = None) -> int:
+    """Critical path of a finished pueue task: free the slot, finish the task_log row.
+
+    Everything else (phase, agent output, event, QA/reflect, status sync)
+    is queued as callback_jobs and run by drain_jobs(). Returns the number
+    of jobs queued (0 for a repeated callback). Raises only if the jobs
+    could not be queued.
+    """
+    log.info("callback: id=%s group=%s result=%s", pueue_id, group, result)
+
+    # Skip night-reviewer group
+    if group == "night-reviewer":
+        log.info("skip night-reviewer callback")
+        return 0
+
+    label = resolve_label(pueue_id, pueue)
+    project_id, task_label = parse_label(label)
+    status, exit_code = map_result(result)
+
+    log.info("parsed: project=%s task=%s status=%s", project_id, task_label, status)
+
+    # Step 1: Release slot (ALWAYS)
     try:
-        _load_env()
-        _setup_logging()
+        db.release_slot(pueue_id)
+    except Exception as exc:
+        log.warning("release_slot failed: %s", exc)
 
-        pueue_id = sys.argv[1] if len(sys.argv) > 1 else "0"
-        group = sys.argv[2] if len(sys.argv) > 2 else "unknown"
-        result = sys.argv[3] if len(sys.argv) > 3 else "unknown"
+    # Step 2: Finish task
+    try:
+        db.finish_task(pueue_id, status, exit_code)
+    except Exception as exc:
+        log.warning("finish_task failed: %s", exc)
 
-        log.info("callback: id=%s group=%s result=%s", pueue_id, group, result)
+    # Idempotency key per run: pueue ids restart after `pueue reset`, the
+    # task_log row id does not.
+    row = db.get_task_by_pueue_id(int(pueue_id))
+    run = f"{pueue_id}.{row['id']}" if row else str(pueue_id)
+    payload = {"project_id": project_id, "task_label": task_label, "status": status}
+    return db.enqueue_jobs(int(pueue_id), run, [("phase", payload), ("output", payload)])
 
-        # Skip night-reviewer group
-        if group == "night-reviewer":
-            log.info("skip night-reviewer callback")
-            sys.exit(0)
 
-        label = resolve_label(pueue_id)
-        project_id, task_label = parse_label(label)
-        status, exit_code = map_result(result)
+# --- queued callback steps (callback_jobs; a raised exception means retry) ---
+# Each step gets the job row and the PueueView shared by the steps of its run.
 
-        log.info("parsed: project=%s task=%s status=%s", project_id, task_label, status)
 
-        # Step 1: Release slot (ALWAYS)
-        try:
-            db.release_slot(pueue_id)
-        except Exception as exc:
-            log.warning("release_slot failed: %s", exc)
+def _run_of(job: dict) -> str:
+    """Run part of a job key ("<pueue_id>.<task_log id>:<step>")."""
+    return job["job_key"].rpartition(":")[0]
 
-        # Step 2: Finish task
-        try:
-            db.finish_task(pueue_id, status, exit_code)
-        except Exception as exc:
-            log.warning("finish_task failed: %s", exc)
 
-        # Step 3: Update phase
-        try:
-            if task_label.startswith(("qa-", "reflect-")):
-                new_phase = "idle"  # non-blocking tail tasks
-            elif status == "done":
-                if task_label.startswith("inbox-"):
-                    new_phase = "idle"
-                else:
-                    new_phase = "qa_pending"
+def _follow_up(job: dict, steps: list[tuple[str, dict]]) -> None:
+    """Queue further steps of the same run (same idempotency key prefix)."""
+    db.enqueue_jobs(job["pueue_id"], _run_of(job), steps)
+
+
+def _step_phase(job: dict, pueue: PueueView) -> None:
+    """Step 3: Update phase."""
+    p = job["payload"]
+    if p["task_label"].startswith(("qa-", "reflect-")):
+        new_phase = "idle"  # non-blocking tail tasks
+    elif p["status"] == "done":
+        if p["task_label"].startswith("inbox-"):
+            new_phase = "idle"
+        else:
+            new_phase = "qa_pending"
+    else:
+        new_phase = "failed"
+
+    current_task = p["task_label"] if new_phase == "qa_pending" else None
+    db.update_project_phase(p["project_id"], new_phase, current_task)
+    log.info("phase updated: %s -> %s", p["project_id"], new_phase)
+
+
+def _step_output(job: dict, pueue: PueueView) -> None:
+    """Step 4: Extract agent output, then queue the steps that depend on it."""
+    p = job["payload"]
+    skill, preview = extract_agent_output(str(job["pueue_id"]), p["project_id"], pueue)
+    log.info("agent output: skill=%s preview_len=%d", skill, len(preview))
+
+    state = db.get_project_state(p["project_id"]) or {}
+    project_path = state.get("path", "")
+    if not project_path:
+        return
+    ctx = {
+        **p,
+        "skill": skill,
+        "project_path": project_path,
+        "provider": state.get("provider", "claude") or "claude",
+    }
+    steps = [("event", ctx)]
+    if skill == "autopilot":
+        spec_id = resolve_spec_id(p["task_label"], preview, project_path)
+        ctx["spec_id"] = spec_id
+        if p["status"] == "done":
+            if spec_id:
+                steps.append(("qa", ctx))
             else:
-                new_phase = "failed"
+                log.info("skip QA: no spec_id resolved for %s", p["task_label"])
+            steps.append(("reflect", ctx))
+        if spec_id and p["status"] in ("done", "failed"):
+            steps.append(("status_sync", ctx))
+    _follow_up(job, steps)
 
-            current_task = task_label if new_phase == "qa_pending" else None
-            db.update_project_phase(project_id, new_phase, current_task)
-            log.info("phase updated: %s -> %s", project_id, new_phase)
-        except Exception as exc:
-            log.warning("update_phase failed: %s", exc)
 
-        # Step 4: Extract agent output
-        skill, preview = "", ""
-        try:
-            skill, preview = extract_agent_output(pueue_id, project_id)
-            log.info("agent output: skill=%s preview_len=%d", skill, len(preview))
-        except Exception as exc:
-            log.warning("extract_agent_output failed: %s", exc)
+def _step_event(job: dict, pueue: PueueView) -> None:
+    """Step 5: Write OpenClaw event."""
+    p = job["payload"]
+    write_event_for_skill(p["project_path"], p["skill"], p["status"], p["task_label"])
 
-        # Step 5: Write OpenClaw event
+
+def _step_qa(job: dict, pueue: PueueView) -> None:
+    """Step 6a: Post-autopilot QA."""
+    p = job["payload"]
+    if not dispatch_qa(p["project_id"], p["project_path"], p["spec_id"], p["provider"], pueue):
+        raise RuntimeError(f"QA dispatch failed for {p['spec_id']}")
+
+
+def _step_reflect(job: dict, pueue: PueueView) -> None:
+    """Step 6b: Post-autopilot reflect."""
+    p = job["payload"]
+    if not dispatch_reflect(
+        p["project_id"], p["project_path"], p["task_label"], p["provider"], pueue
+    ):
+        raise RuntimeError(f"reflect dispatch failed for {p['task_label']}")
+
+
+def _step_status_sync(job: dict, pueue: PueueView) -> None:
+    """Step 7: Verify spec + backlog status sync."""
+    p = job["payload"]
+    target = "done" if p["status"] == "done" else "blocked"
+    verify_status_sync(p["project_path"], p["spec_id"], target)
+
+
+JOB_STEPS = {
+    "phase": _step_phase,
+    "output": _step_output,
+    "event": _step_event,
+    "qa": _step_qa,
+    "reflect": _step_reflect,
+    "status_sync": _step_status_sync,
+    "git_push": _step_git_push,
+}
+
+
+def run_job(job: dict, pueue: PueueView | None = None) -> str:
+    """Run one claimed job and record its outcome + step time. Returns the new job status."""
+    started = time.monotonic()
+    error = None
+    try:
+        JOB_STEPS[job["step"]](job, pueue or PueueView())
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}"
+    duration_ms = int((time.monotonic() - started) * 1000)
+    status = db.finish_job(job["id"], duration_ms, error)
+    if error:
+        log.warning(
+            "job %s %s after attempt %d (%d ms): %s",
+            job["job_key"],
+            status,
+            job["attempts"],
+            duration_ms,
+            error,
+        )
+    else:
+        log.info("job %s done in %d ms", job["job_key"], duration_ms)
+    return status
+
+
+def drain_jobs(
+    stop: threading.Event | None = None,
+    steps: tuple | None = None,
+    exclude: tuple | None = None,
+    flush: bool = False,
+) -> int:
+    """Run due callback jobs oldest first until none is due (or `stop` is set). Returns count.
+
+    Steps of one run share a PueueView (one `pueue status` per run).
+    `steps` / `exclude` / `flush` as for db.claim_job().
+    """
+    views: dict[str, PueueView] = {}
+    count = 0
+    while not (stop and stop.is_set()) and (job := db.claim_job(steps, exclude, flush)):
+        run_job(job, views.setdefault(_run_of(job), PueueView()))
+        count += 1
+    return count
+
+
+def handle_callback(pueue_id: str, group: str, result: str) -> None:
+    """Process one finished pueue task in-process (no daemon). Never raises.
+
+    Critical path first, then every due job — this task's steps plus any
+    left behind by earlier callbacks.
+    """
+    try:
+        accept_callback(pueue_id, group, result)
+    except Exception as exc:
+        log.warning("queueing callback jobs failed: %s", exc)
+    try:
+        # Without a daemon nothing else notices jobs left 'running' by a killed hook.
+        db.requeue_stale_jobs()
+        drain_jobs()
+        # No daemon may be up to push a batch once its window is over: push now.
+        drain_jobs(steps=_GIT_STEPS, flush=True)
+    except Exception as exc:
+        log.warning("drain_jobs failed: %s", exc)
+
+
+# --- callback daemon (python3 callback.py serve) ---
+
+_MAINTENANCE_INTERVAL = 3600
+
+
+def _stale_check_interval() -> float:
+    """Seconds between looks for stale 'running' jobs (pruning stays hourly).
+
+    On the scale of the job timeout, so a lost job waits about one
+    timeout, not up to an hour.
+    """
+    return max(min(db.job_timeout(), 60), 1)
+
+
+def socket_path() -> str:
+    """Unix socket of the callback daemon (CALLBACK_SOCKET, default next to this script)."""
+    return os.environ.get("CALLBACK_SOCKET") or str(SCRIPT_DIR / "callback.sock")
+
+
+def _accept(line: str, wake: threading.Event) -> dict:
+    """Run the critical path for one hook request line, then wake the worker. Returns the reply.
+
+    The ack is sent only after the jobs are committed, so an acked callback
+    survives a daemon crash.
+    """
+    try:
+        req = json.loads(line)
+        job = (
+            str(int(req["pueue_id"])),
+            str(req.get("group", "unknown")),
+            str(req.get("result", "")),
+        )
+    except (ValueError, TypeError, KeyError) as exc:
+        return {"ok": False, "error": f"bad request: {exc}"}
+    try:
+        queued = accept_callback(*job)
+    except Exception as exc:
+        log.exception("callback failed: id=%s", job[0])
+        return {"ok": False, "error": str(exc)}
+    wake.set()
+    return {"ok": True, "queued": queued}
+
+
+def _work(
+    stop: threading.Event,
+    wake: threading.Event,
+    steps: tuple | None = None,
+    exclude: tuple | None = None,
+    maintain: bool = True,
+) -> None:
+    """Drain callback_jobs until `stop`; sleep until woken or the next retry is due.
+
+    `steps` / `exclude` pick this worker's jobs; `maintain` also requeues
+    stale jobs and prunes old ones (one worker does it for all).
+    """
+    pruned = checked = float("-inf")
+    stale_every = _stale_check_interval()
+    # Longest sleep between looks at callback_jobs (retries due, jobs queued
+    # by in-process fallbacks); new callbacks wake the worker at once.
+    poll = float(os.environ.get("CALLBACK_POLL_INTERVAL", "30"))
+    longest = min(poll, stale_every)
+    while not stop.is_set():
+        delay = None
         try:
-            project_path = ""
-            state = db.get_project_state(project_id)
-            if state:
-                project_path = state.get("path", "")
-            if project_path:
-                write_event_for_skill(project_path, skill, status, task_label)
-        except Exception as exc:
-            log.warning("write_event failed: %s", exc)
-
-        # Step 6: Post-autopilot tail — dispatch QA + Reflect
-        if skill == "autopilot" and status == "done":
-            try:
-                state = db.get_project_state(project_id)
-                if state:
-                    project_path = state.get("path", "")
-                    provider = state.get("provider", "claude") or "claude"
-                    if project_path:
-                        spec_id = resolve_spec_id(task_label, preview, project_path)
-                        if spec_id:
-                            dispatch_qa(project_id, project_path, spec_id, provider)
-                        else:
-                            log.info("skip QA: no spec_id resolved for %s", task_label)
-                        dispatch_reflect(project_id, project_path, task_label, provider)
-            except Exception as exc:
-                log.warning("post-autopilot dispatch failed: %s", exc)
+            if maintain and time.monotonic() - checked >= stale_every:
+                db.requeue_stale_jobs()
+                checked = time.monotonic()
+            if maintain and time.monotonic() - pruned >= _MAINTENANCE_INTERVAL:
+                db.prune_jobs()
+                pruned = time.monotonic()
+            drain_jobs(stop, steps, exclude)
+            delay = db.next_job_delay(steps, exclude)
+        except Exception:
+            log.exception("callback worker error")
+        wake.wait(longest if delay is None else min(max(delay, 0.05), longest))
+        wake.clear()
+    db.close_db()
+
+
+def make_server(path: str, wake: threading.Event):
+    """Unix socket server answering each NDJSON request line once its jobs are queued."""
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for raw in self.rfile:
+                line = raw.decode(errors="replace")
+                if line.strip():
+                    self.wfile.write((json.dumps(_accept(line, wake)) + "\n").encode())
+                    self.wfile.flush()
+            db.close_db()
+
+    if os.path.exists(path):
+        os.unlink(path)  # stale socket from a previous run
+    server = socketserver.ThreadingUnixStreamServer(path, Handler)
+    server.daemon_threads = True
+    os.chmod(path, 0o600)
+    return server
+
+
+def serve(path: str) -> None:
+    """Long-running callback service (systemd: dld-callback.service).
+
+    .env, logging, DB connections and spec caches are set up once and stay
+    warm. Each hook request runs the critical path (slot release, task
+    finish) and is acked once its remaining steps are in callback_jobs;
+    one worker runs those in order, with retries, and a second one runs
+    the batched git pushes. SIGTERM stops accepting and lets the current
+    jobs finish — queued jobs wait for the next start.
+    """
+    stop, wake = threading.Event(), threading.Event()
+    server = make_server(path, wake)
+    workers = [
+        threading.Thread(target=_work, args=(stop, wake, None, _GIT_STEPS), name="callback-worker"),
+        threading.Thread(
+            target=_work, args=(stop, _git_wake, _GIT_STEPS, None, False), name="git-worker"
+        ),
+    ]
+    for worker in workers:
+        worker.start()
+
+    def on_signal(_signum, _frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+    log.info("callback daemon listening on %s", path)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        os.unlink(path)
+        stop.set()
+        wake.set()
+        _git_wake.set()
+        for worker in workers:
+            worker.join()
+        log.info("callback daemon stopped")
 
-        # Step 7: Verify spec + backlog status sync
-        if skill == "autopilot" and status in ("done", "failed"):
-            try:
-                if not project_path:
-                    state = db.get_project_state(project_id)
-                    project_path = state.get("path", "") if state else ""
-                if project_path:
-                    sid = resolve_spec_id(task_label, preview, project_path)
-                    if sid:
-                        target = "done" if status == "done" else "blocked"
-                        verify_status_sync(project_path, sid, target)
-            except Exception as exc:
-                log.warning("status_sync check failed: %s", exc)
 
+def main() -> None:
+    """Main callback entry point. ALWAYS exits 0.
+
+    `callback.py serve [--socket PATH]` runs the daemon instead; the pueue
+    hook is callback_client.py, which falls back to this in-process path.
+    """
+    if sys.argv[1:2] == ["serve"]:
+        _load_env()
+        _setup_logging()
+        serve(sys.argv[3] if sys.argv[2:3] == ["--socket"] else socket_path())
+        return
+    try:
+        _load_env()
+        _setup_logging()
+
+        pueue_id = sys.argv[1] if len(sys.argv) > 1 else "0"
+        group = sys.argv[2] if len(sys.argv) > 2 else "unknown"
+        result = sys.argv[3] if len(sys.argv) > 3 else "unknown"
+        handle_callback(pueue_id, group, result)
     except Exception:
         log.exception("callback fatal error")
     finally:
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Module: callback_client
+Role: Pueue completion hook — hand (pueue_id, group, result) to the callback daemon.
+Uses: json, os, socket (stdlib); callback (in-process fallback only)
+Used by: Pueue daemon (pueue.yml callback config)
+CLI: python3 callback_client.py <pueue_id> '<group>' '<result>'
+INVARIANT: Always exit 0.
+
+Sends one NDJSON request to `callback.py serve` (CALLBACK_SOCKET, default
+callback.sock next to this script) and returns as soon as the daemon has
+queued it. Only stdlib is imported on that path, so a completion burst
+costs a few milliseconds per task. If the daemon is down or does not ack
+within CALLBACK_CLIENT_TIMEOUT seconds, the callback runs in-process exactly
+as before (callback.main).
+"""
+
+import json
+import os
+import socket
+import sys
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+
+def _load_env() -> None:
+    """CALLBACK_* settings from .env (pueued does not read it); real env wins."""
+    env_file = SCRIPT_DIR / ".env"
+    if not env_file.is_file():
+        return
+    for line in env_file.read_text().splitlines():
+        key, sep, val = line.strip().partition("=")
+        if sep and key.startswith("CALLBACK_"):
+            os.environ.setdefault(key.strip(), val.strip().strip("'\""))
+
+
+def send(pueue_id: str, group: str, result: str) -> bool:
+    """True if the callback daemon acknowledged the request."""
+    path = os.environ.get("CALLBACK_SOCKET") or str(SCRIPT_DIR / "callback.sock")
+    req = json.dumps({"pueue_id": pueue_id, "group": group, "result": result}) + "\n"
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(float(os.environ.get("CALLBACK_CLIENT_TIMEOUT", "5")))
+            sock.connect(path)
+            sock.sendall(req.encode())
+            reply = sock.makefile("rb").readline()
+        return bool(json.loads(reply).get("ok"))
+    except (OSError, ValueError):
+        return False
+
+
+def main() -> None:
+    """Hook entry point. ALWAYS exits 0."""
+    try:
+        defaults = ("0", "unknown", "unknown")
+        args = [sys.argv[i + 1] if len(sys.argv) > i + 1 else d for i, d in enumerate(defaults)]
+        _load_env()
+        if send(*args):
+            return
+        sys.path.insert(0, str(SCRIPT_DIR))
+        import callback
+
+        callback.main()  # same argv; exits 0 itself
+    except SystemExit:
+        pass
+    except Exception as exc:
+        print(f"callback_client: {exc}", file=sys.stderr)
+    finally:
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
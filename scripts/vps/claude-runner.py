@@ -2,7 +2,7 @@
 """
 Module: claude-runner
 Role: Claude Code Agent SDK wrapper for programmatic task execution with Skills.
-Uses: claude-agent-sdk, db.py
+Uses: claude-agent-sdk, db.py (record_usage, record_log_path), spec_catalog (SPEC_ID_RE)
 Used by: run-agent.sh (via Pueue)
 
 Key design (2026-03-11):
@@ -41,6 +41,10 @@ def load_env() -> None:
 
 load_env()
 
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import db  # noqa: E402  (after load_env: DB_PATH may come from .env)
+from spec_catalog import SPEC_ID_RE  # noqa: E402
+
 try:
     from claude_agent_sdk import (
         AssistantMessage,
@@ -87,6 +91,44 @@ ALLOWED_TOOLS = [
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
+def record_usage(
+    project_path: Path, skill: str, task: str, usage: dict, cost_usd: float, model_usage: dict
+) -> None:
+    """Append this run to the task_usage ledger. Never fails the run.
+
+    DLD_TASK_LABEL (set by orchestrator/callback at pueue add) ties the
+    row to its task_log entry; manual runs are recorded by project path.
+    """
+    label = os.environ.get("DLD_TASK_LABEL") or None
+    spec = SPEC_ID_RE.search(f"{label or ''} {task}")
+    try:
+        db.record_usage(
+            label.split(":", 1)[0] if label else None,
+            label,
+            skill,
+            {**usage, "cost_usd": cost_usd},
+            model_usage,
+            spec_id=spec.group(0) if spec else None,
+            project_dir=str(project_path),
+        )
+    except Exception as exc:
+        logger.warning("usage ledger write failed: %s", exc)
+
+
+def record_log_path(log_file: Path) -> None:
+    """Point this run's task_log row (by DLD_TASK_LABEL) at its log file. Never fails the run.
+
+    callback.py reads the result from there by pueue id — no scan of logs/.
+    """
+    label = os.environ.get("DLD_TASK_LABEL")
+    if not label:
+        return
+    try:
+        db.record_log_path(label, str(log_file))
+    except Exception as exc:
+        logger.warning("log path record failed: %s", exc)
+
+
 async def run_task(project_dir: str, task: str, skill: str) -> dict:
     """Run a Claude Code task with Skills via Agent SDK.
 
@@ -94,7 +136,9 @@ async def run_task(project_dir: str, task: str, skill: str) -> dict:
     """
     project_path = Path(project_dir).resolve()
     project_name = project_path.name
-    log_file = LOG_DIR / f"{project_name}-{time.strftime('%Y%m%d-%H%M%S')}.log"
+    # pid suffix: two runs on one project can start in the same second.
+    log_file = LOG_DIR / f"{project_name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.log"
+    record_log_path(log_file)
 
     # Build prompt with skill prefix
     if task.startswith("/"):
@@ -252,6 +296,8 @@ async def run_task(project_dir: str, task: str, skill: str) -> dict:
         "result_preview": result_text[:1000] if result_text else "",
     }
     log_file.write_text(json.dumps(log_data, ensure_ascii=False, indent=2))
+    record_log_path(log_file)  # again: the task_log row may postdate our start
+    record_usage(project_path, skill, task, usage_metrics, cost_usd, model_usage)
     logger.info(
         "done project=%s exit=%d turns=%d cost=$%.4f in=%d out=%d cache_read=%d cache_hit=%.2f",
         project_name,
@@ -0,0 +1,74 @@
+#!/usr/bin/env bash
+# scripts/vps/db-client.sh
+# Shell client for `python3 db.py serve` — source it, don't run it.
+#
+#   source "${SCRIPT_DIR}/db-client.sh"
+#   db_start                                   # one long-lived db.py coprocess
+#   db_call update-phase project_id=p phase=idle
+#   db_call ingest-findings project_id=p findings:="$json"   # := passes raw JSON
+#   db_stop
+#
+# db_call prints the reply line ({"ok": true, "result": ...}) and returns 0
+# when ok. Without a running coprocess it falls back to a one-shot
+# `db.py serve` for that request (same reply, normal start-up cost).
+#
+# Module: db-client
+# Role: NDJSON request builder + bash coproc wrapper around db.py serve.
+# Uses: db.py (serve)
+# Used by: night-reviewer.sh
+
+DB_CLIENT_PY="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)/db.py"
+
+# JSON-quote $1 into _DB_JSON (no subshell: db_call stays fork-free).
+_db_json_str() {
+    local s="$1"
+    s=${s//\\/\\\\}
+    s=${s//\"/\\\"}
+    s=${s//$'\n'/\\n}
+    s=${s//$'\r'/\\r}
+    s=${s//$'\t'/\\t}
+    _DB_JSON="\"${s}\""
+}
+
+db_start() {
+    [[ -n "${DB_COPROC_PID:-}" ]] && return 0
+    coproc DB_COPROC { exec python3 "$DB_CLIENT_PY" serve 2>/dev/null; }
+    # bash hides coproc fds from subshells; plain dups survive $(db_call ...).
+    exec {DB_REQ_FD}>&"${DB_COPROC[1]}" {DB_REPLY_FD}<&"${DB_COPROC[0]}"
+}
+
+db_call() {
+    local req arg reply _DB_JSON
+    _db_json_str "$1"
+    req="{\"cmd\":${_DB_JSON}"
+    shift
+    for arg in "$@"; do
+        if [[ "$arg" =~ ^[A-Za-z_][A-Za-z0-9_]*:= ]]; then
+            req+=",\"${arg%%:=*}\":${arg#*:=}"
+        else
+            _db_json_str "${arg#*=}"
+            req+=",\"${arg%%=*}\":${_DB_JSON}"
+        fi
+    done
+    req+="}"
+
+    if [[ -n "${DB_COPROC_PID:-}" ]] && kill -0 "$DB_COPROC_PID" 2>/dev/null \
+        && printf '%s\n' "$req" >&"$DB_REQ_FD" \
+        && IFS= read -r reply <&"$DB_REPLY_FD"; then
+        :
+    else
+        reply=$(printf '%s\n' "$req" | python3 "$DB_CLIENT_PY" serve 2>/dev/null)
+    fi
+    printf '%s\n' "$reply"
+    [[ "$reply" == '{"ok": true'* ]]
+}
+
+db_stop() {
+    [[ -z "${DB_COPROC_PID:-}" ]] && return 0
+    local pid="$DB_COPROC_PID"
+    exec {DB_REQ_FD}>&- {DB_REPLY_FD}<&-
+    eval "exec ${DB_COPROC[1]}>&-"
+    wait "$pid" 2>/dev/null
+    unset DB_COPROC_PID
+    return 0
+}
@@ -2,22 +2,409 @@
 """
 Module: db
 Role: SQLite WAL helpers for orchestrator state management.
-Uses: sqlite3 (stdlib)
-Used by: orchestrator.py (get_all_projects, seed_projects_from_json, try_acquire_slot, log_task,
-             update_project_phase, get_available_slots, get_occupied_slots),
-         callback.py (release_slot, finish_task, update_project_phase),
-         night-reviewer.sh (via CLI: python3 db.py save-finding / get-new-findings / update-phase)
+Uses: sqlite3, threading, time (stdlib)
+Used by: orchestrator.py (get_all_projects, seed_projects_from_json, reserve_slot,
+             cancel_reservation, expire_reservations, dispatch_task,
+             update_project_phase, get_available_slots, get_occupied_slots,
+             reclaim_expired_leases, lease_env,
+             get_free_slots_by_provider, get_slots_by_project, archive_task_log,
+             WalCheckpointer),
+         callback.py (reserve_slot, lease_env, dispatch_task, release_slot, finish_task,
+             update_project_phase, enqueue_jobs, coalesce_job, claim_job, finish_job,
+             requeue_stale_jobs, next_job_delay, prune_jobs, get_task_by_pueue_id),
+         run-agent.sh (via CLI: python3 db.py heartbeat),
+         claude-runner.py (record_usage, record_log_path),
+         night-reviewer.sh (via db-client.sh coprocess: python3 db.py serve),
+         setup-vps.sh (via CLI: python3 db.py migrate, archive --convert),
+         operators (CLI: python3 db.py archive [days] | archive --convert | wal-stats | usage [by] [since]
+             | stats [--grain G] [--days N] [--by K,..] | jobs [since] | jobs retry [step])
+
+Schema changes after schema.sql are numbered MIGRATIONS, applied
+automatically on the first connection of each process. Plain lookups go
+through read_db() (read-only, autocommit) so they never contend with writers.
 """
 
+import hashlib
+import json
+import logging
 import os
 import sqlite3
+import threading
+import time
 from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Sequence
+
+log = logging.getLogger("db")
 
 DB_PATH = os.environ.get("DB_PATH", str(Path(__file__).parent / "orchestrator.db"))
 _UNSET = object()
 
+# Tunables are read from the environment on use, not at import: the
+# in-process callback imports db before callback.main() loads .env.
+
+
+def reservation_ttl() -> int:
+    """Seconds an unbound slot reservation (reserve_slot) survives before it is reclaimed."""
+    return int(os.environ.get("SLOT_RESERVATION_TTL", "120"))
+
+
+def lease_ttl() -> int:
+    """Seconds a running task's slot lease lasts without a heartbeat (run-agent.sh renews it)."""
+    return int(os.environ.get("SLOT_LEASE_TTL", "90"))
+
+
+def job_attempts() -> int:
+    """Attempts before a callback job is dead."""
+    return int(os.environ.get("CALLBACK_JOB_ATTEMPTS", "5"))
+
+
+def job_backoff() -> int:
+    """Seconds before a failed callback job's first retry (doubles per attempt)."""
+    return int(os.environ.get("CALLBACK_JOB_BACKOFF", "10"))
+
+
+def job_timeout() -> int:
+    """Seconds a callback job may sit in 'running' before its worker counts as lost."""
+    return int(os.environ.get("CALLBACK_JOB_TIMEOUT", "600"))
+
+
+# Upper edges (seconds) of the task duration histogram in task_stats: column
+# h<i> counts runs with DURATION_BINS[i-1] < duration <= DURATION_BINS[i],
+# the last column the rest. Baked into migration 5 — changing it needs a
+# new migration.
+DURATION_BINS = (30, 60, 120, 300, 600, 900, 1200, 1800, 2700, 3600, 5400, 7200)
+_HIST_COLS = [f"h{i}" for i in range(len(DURATION_BINS) + 1)]
+
+
+def _stats_upsert(where: str, start: str = "t.started_at") -> str:
+    """INSERT ... SELECT folding finished task_log rows matching `where` into task_stats.
+
+    Used by finish_task (the rows it just finished) and by migration 5
+    (backfill of all finished rows), so both count exactly the same way.
+    A run's duration is finished_at minus `start`: finish_task passes
+    _RUN_START, migration 5 predates run_started_at and keeps started_at.
+    """
+    edges = (-1,) + DURATION_BINS
+    bins = [f"SUM(d > {lo} AND d <= {hi})" for lo, hi in zip(edges, edges[1:])]
+    bins.append(f"SUM(d > {DURATION_BINS[-1]})")
+    return (
+        "INSERT INTO task_stats (grain, bucket, project_id, skill, provider, runs, successes, "
+        f"total_seconds, max_seconds, {', '.join(_HIST_COLS)}) "
+        "SELECT g.grain, substr(r.finished_at, 1, g.len), r.project_id, r.skill, r.provider, "
+        f"COUNT(*), SUM(r.ok), SUM(r.d), MAX(r.d), {', '.join(bins)} "
+        "FROM (SELECT t.finished_at, t.project_id, t.skill, "
+        "COALESCE(t.provider, p.provider, '') AS provider, COALESCE(t.exit_code, 1) = 0 AS ok, "
+        f"MAX((julianday(t.finished_at) - julianday({start})) * 86400, 0) AS d "
+        "FROM task_log t LEFT JOIN project_state p ON p.project_id = t.project_id "
+        f"WHERE t.finished_at IS NOT NULL AND ({where})) r "
+        "CROSS JOIN (SELECT 'hour' AS grain, 13 AS len UNION ALL SELECT 'day', 10) g "
+        "WHERE 1 GROUP BY 1, 2, 3, 4, 5 "
+        "ON CONFLICT(grain, bucket, project_id, skill, provider) DO UPDATE SET "
+        "runs = runs + excluded.runs, successes = successes + excluded.successes, "
+        "total_seconds = total_seconds + excluded.total_seconds, "
+        "max_seconds = MAX(max_seconds, excluded.max_seconds), "
+        + ", ".join(f"{c} = {c} + excluded.{c}" for c in _HIST_COLS)
+    )
+
+
+# When a run really started: the runner's first slot heartbeat. started_at
+# is when the task was queued in pueue; runs without a slot lease (nothing
+# heartbeats) fall back to it, so their durations include the queue wait.
+_RUN_START = "COALESCE(t.run_started_at, t.started_at)"
+
+
+# Numbered schema migrations applied on top of schema.sql, tracked in
+# PRAGMA user_version. Append only — never edit or renumber a shipped entry.
+MIGRATIONS: list[tuple[int, str, list[str]]] = [
+    (
+        1,
+        "indexes for pueue_id lookups and new-findings scans",
+        [
+            "CREATE INDEX IF NOT EXISTS idx_compute_slots_pueue_id ON compute_slots(pueue_id)",
+            "CREATE INDEX IF NOT EXISTS idx_task_log_pueue_id ON task_log(pueue_id)",
+            "CREATE INDEX IF NOT EXISTS idx_night_findings_project_status "
+            "ON night_findings(project_id, status)",
+        ],
+    ),
+    (
+        2,
+        "task_log retention: finished_at index and monthly rollup",
+        [
+            "CREATE INDEX IF NOT EXISTS idx_task_log_finished_at ON task_log(finished_at)",
+            "CREATE TABLE IF NOT EXISTS task_log_rollup ("
+            " month TEXT NOT NULL,"
+            " project_id TEXT NOT NULL,"
+            " skill TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " runs INTEGER NOT NULL DEFAULT 0,"
+            " failures INTEGER NOT NULL DEFAULT 0,"
+            " total_seconds INTEGER NOT NULL DEFAULT 0,"
+            " PRIMARY KEY (month, project_id, skill, status))",
+        ],
+    ),
+    (
+        3,
+        "slot leases renewed by runner heartbeats",
+        [
+            "ALTER TABLE compute_slots ADD COLUMN lease_expires_at TEXT",
+            "ALTER TABLE compute_slots ADD COLUMN lease_token TEXT",
+            "CREATE INDEX IF NOT EXISTS idx_compute_slots_lease "
+            "ON compute_slots(lease_expires_at) WHERE lease_expires_at IS NOT NULL",
+        ],
+    ),
+    (
+        4,
+        "task_usage: per-run, per-model token and cost ledger",
+        [
+            # No FK to task_log: archive_task_log deletes old task_log rows,
+            # the ledger is kept.
+            "CREATE TABLE IF NOT EXISTS task_usage ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " run_id TEXT NOT NULL,"
+            " task_log_id INTEGER,"
+            " pueue_id INTEGER,"
+            " project_id TEXT NOT NULL,"
+            " task_label TEXT,"
+            " spec_id TEXT,"
+            " skill TEXT,"
+            " model TEXT NOT NULL DEFAULT '',"
+            " input_tokens INTEGER NOT NULL DEFAULT 0,"
+            " output_tokens INTEGER NOT NULL DEFAULT 0,"
+            " cache_read_input_tokens INTEGER NOT NULL DEFAULT 0,"
+            " cache_creation_input_tokens INTEGER NOT NULL DEFAULT 0,"
+            " cost_usd REAL NOT NULL DEFAULT 0,"
+            " recorded_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now')))",
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_task_usage_task_model "
+            "ON task_usage(task_log_id, model) WHERE task_log_id IS NOT NULL",
+            "CREATE INDEX IF NOT EXISTS idx_task_usage_project_time "
+            "ON task_usage(project_id, recorded_at)",
+            "CREATE INDEX IF NOT EXISTS idx_task_usage_time ON task_usage(recorded_at)",
+        ],
+    ),
+    (
+        5,
+        "task_stats: hourly/daily duration rollups maintained by finish_task",
+        [
+            "ALTER TABLE task_log ADD COLUMN provider TEXT",
+            "CREATE TABLE IF NOT EXISTS task_stats ("
+            " grain TEXT NOT NULL,"
+            " bucket TEXT NOT NULL,"
+            " project_id TEXT NOT NULL,"
+            " skill TEXT NOT NULL,"
+            " provider TEXT NOT NULL,"
+            " runs INTEGER NOT NULL DEFAULT 0,"
+            " successes INTEGER NOT NULL DEFAULT 0,"
+            " total_seconds REAL NOT NULL DEFAULT 0,"
+            " max_seconds REAL NOT NULL DEFAULT 0,"
+            + "".join(f" {c} INTEGER NOT NULL DEFAULT 0," for c in _HIST_COLS)
+            + " PRIMARY KEY (grain, bucket, project_id, skill, provider)) WITHOUT ROWID",
+            "DELETE FROM task_stats",  # a re-run backfills from scratch
+            _stats_upsert("1"),
+        ],
+    ),
+    (
+        6,
+        "callback_jobs: durable post-processing queue for pueue callbacks",
+        [
+            "CREATE TABLE IF NOT EXISTS callback_jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " job_key TEXT NOT NULL UNIQUE,"
+            " pueue_id INTEGER,"
+            " step TEXT NOT NULL,"
+            " payload TEXT NOT NULL DEFAULT '{}',"
+            " status TEXT NOT NULL DEFAULT 'queued',"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " max_attempts INTEGER NOT NULL DEFAULT 5,"
+            " run_after TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now')),"
+            " last_error TEXT,"
+            " duration_ms INTEGER,"
+            " created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now')),"
+            " started_at TEXT,"
+            " finished_at TEXT)",
+            "CREATE INDEX IF NOT EXISTS idx_callback_jobs_due "
+            "ON callback_jobs(run_after, id) WHERE status = 'queued'",
+            "CREATE INDEX IF NOT EXISTS idx_callback_jobs_running "
+            "ON callback_jobs(started_at) WHERE status = 'running'",
+        ],
+    ),
+    (
+        7,
+        "task_log.log_path: runner result file, found by pueue_id instead of globbing logs/",
+        ["ALTER TABLE task_log ADD COLUMN log_path TEXT"],
+    ),
+    (
+        8,
+        "task_log.run_started_at: set by the runner's first heartbeat, excludes queue wait",
+        ["ALTER TABLE task_log ADD COLUMN run_started_at TEXT"],
+    ),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+_migrated: set[str] = set()
+_migrate_lock = threading.Lock()
+
+
+def migrate(conn: sqlite3.Connection) -> list[int]:
+    """Apply pending MIGRATIONS in one BEGIN IMMEDIATE transaction. Returns versions applied.
+
+    No-op until schema.sql has created the base tables. Safe to race from
+    several processes: user_version is re-read under the write lock.
+    Re-running a migration is harmless (IF NOT EXISTS, duplicate columns skipped).
+    """
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        return []
+    if not conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'task_log'"
+    ).fetchone():
+        return []
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        current = conn.execute("PRAGMA user_version").fetchone()[0]
+        applied = []
+        for version, name, statements in MIGRATIONS:
+            if version <= current:
+                continue
+            for stmt in statements:
+                try:
+                    conn.execute(stmt)
+                except sqlite3.OperationalError as exc:
+                    # ADD COLUMN has no IF NOT EXISTS; a user_version reset
+                    # (restored backup, manual fix) must not wedge startup.
+                    if "duplicate column name" not in str(exc):
+                        raise
+            applied.append(version)
+            log.info("migration %d applied: %s", version, name)
+        if applied:
+            conn.execute(f"PRAGMA user_version = {applied[-1]}")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return applied
+
+
+def _ensure_migrated(conn: sqlite3.Connection) -> None:
+    """Run migrate() once per DB_PATH per process (first connection)."""
+    if DB_PATH in _migrated:
+        return
+    with _migrate_lock:
+        if DB_PATH in _migrated:
+            return
+        migrate(conn)
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            _migrated.add(DB_PATH)
+
+
+# Per-thread long-lived connection (DB_POOL=0 restores connect-per-call).
+_local = threading.local()
+_STATEMENT_CACHE = 256
+
+
+def _pool_enabled() -> bool:
+    return os.environ.get("DB_POOL", "1") != "0"
+
+
+_SYNCHRONOUS = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+
+def pragma_profile() -> dict:
+    """Per-connection PRAGMA tuning from env (.env is loaded by orchestrator/callback).
+
+    DB_SYNCHRONOUS: NORMAL (default) skips the fsync on every WAL commit;
+        still crash-safe, only a power loss can drop the last commits.
+    DB_CACHE_SIZE: page cache, SQLite units (negative = KiB). Default -16000.
+    DB_MMAP_SIZE: bytes of the file to memory-map for reads. Default 64 MiB.
+    DB_WAL_AUTOCHECKPOINT: WAL pages before a committing connection
+        checkpoints inline. Default 1000 (SQLite's own default).
+    """
+    sync = os.environ.get("DB_SYNCHRONOUS", "NORMAL").upper()
+    if sync not in _SYNCHRONOUS:
+        log.warning("DB_SYNCHRONOUS=%s not one of %s, using NORMAL", sync, _SYNCHRONOUS)
+        sync = "NORMAL"
+    return {
+        "synchronous": sync,
+        "cache_size": int(os.environ.get("DB_CACHE_SIZE", "-16000")),
+        "mmap_size": int(os.environ.get("DB_MMAP_SIZE", str(64 * 1024 * 1024))),
+        "wal_autocheckpoint": int(os.environ.get("DB_WAL_AUTOCHECKPOINT", "1000")),
+    }
+
+
+def _apply_profile(conn: sqlite3.Connection, read_only: bool = False) -> None:
+    profile = pragma_profile()
+    if read_only:  # durability/checkpoint settings only matter to writers
+        profile = {k: profile[k] for k in ("cache_size", "mmap_size")}
+    for name, value in profile.items():
+        conn.execute(f"PRAGMA {name}={value}")
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        DB_PATH,
+        isolation_level=None,
+        cached_statements=_STATEMENT_CACHE,
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.execute("PRAGMA foreign_keys=ON")
+    _apply_profile(conn)
+    conn.row_factory = sqlite3.Row
+    _ensure_migrated(conn)
+    return conn
+
+
+def _connect_ro() -> sqlite3.Connection:
+    """Read-only connection: mode=ro URI plus query_only, autocommit (no BEGIN).
+
+    Every statement reads its own WAL snapshot and releases it when done, so
+    readers never queue behind BEGIN IMMEDIATE writers or hold a read
+    transaction open that would stall checkpoints.
+    """
+    conn = sqlite3.connect(
+        Path(DB_PATH).resolve().as_uri() + "?mode=ro",
+        uri=True,
+        isolation_level=None,
+        cached_statements=_STATEMENT_CACHE,
+    )
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.execute("PRAGMA query_only=ON")
+    _apply_profile(conn, read_only=True)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+_CONNECTORS = {"rw": _connect, "ro": _connect_ro}
+
+
+def _pooled_connection(kind: str = "rw") -> sqlite3.Connection:
+    """This thread's `kind` ("rw" / "ro") connection to DB_PATH, opened on first use.
+
+    Keyed by (DB_PATH, pid): a changed DB_PATH (tests) or a forked child
+    gets a fresh connection instead of sharing the parent's file handle.
+    """
+    key = (DB_PATH, os.getpid())
+    pool = getattr(_local, "pool", None)
+    if pool is None:
+        pool = _local.pool = {}
+    entry = pool.get(kind)
+    if entry is not None:
+        if entry[0] == key:
+            return entry[1]
+        if entry[0][1] == key[1]:
+            entry[1].close()
+    conn = _CONNECTORS[kind]()
+    pool[kind] = (key, conn)
+    return conn
+
+
+def close_db() -> None:
+    """Close this thread's pooled connections (next get_db() / read_db() reopens)."""
+    pool = getattr(_local, "pool", None) or {}
+    _local.pool = {}
+    for key, conn in pool.values():
+        if key[1] == os.getpid():
+            conn.close()
+
 
 @contextmanager
 def get_db(immediate: bool = False):
@@ -27,25 +414,86 @@ def get_db(immediate: bool = False):
     can safely issue BEGIN IMMEDIATE without conflicting with implicit
     transactions that autocommit=False would start.
 
+    The connection is a per-thread long-lived one (PRAGMAs applied once,
+    prepared statements cached) unless DB_POOL=0. Each `with` block is
+    still exactly one transaction.
+
     Args:
         immediate: If True, opens with BEGIN IMMEDIATE (prevents writer
                    starvation; use in try_acquire_slot / release_slot).
     """
-    conn = sqlite3.connect(DB_PATH, isolation_level=None)
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA busy_timeout=5000")
-    conn.execute("PRAGMA foreign_keys=ON")
-    conn.row_factory = sqlite3.Row
+    pooled = _pool_enabled()
+    conn = _pooled_connection() if pooled else _connect()
     begin = "BEGIN IMMEDIATE" if immediate else "BEGIN"
-    conn.execute(begin)
+    try:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")  # left open by an interrupted caller
+        conn.execute(begin)
+    except sqlite3.Error:
+        if not pooled:
+            conn.close()
+        raise
     try:
         yield conn
         conn.execute("COMMIT")
     except Exception:
-        conn.execute("ROLLBACK")
+        try:
+            conn.execute("ROLLBACK")
+        except sqlite3.Error:
+            if pooled:
+                close_db()  # unusable connection — next call reconnects
         raise
     finally:
-        conn.close()
+        if not pooled:
+            conn.close()
+
+
+@contextmanager
+def read_db():
+    """Context manager for read-only queries (no transaction, no write lock).
+
+    Uses a per-thread read-only connection separate from get_db()'s writer
+    connection (or a fresh one per call with DB_POOL=0). Multi-statement
+    reads that must see one consistent snapshot should use get_db().
+    """
+    if DB_PATH not in _migrated:
+        with get_db():  # migrations need the writer; once per DB_PATH per process
+            pass
+    pooled = _pool_enabled()
+    conn = _pooled_connection("ro") if pooled else _connect_ro()
+    try:
+        yield conn
+    finally:
+        if not pooled:
+            conn.close()
+
+
+@dataclass(frozen=True)
+class DispatchResult:
+    """Outcome of dispatch_task: the slot taken (None if none was free) and task_log row id."""
+
+    slot_number: Optional[int]
+    task_log_id: int
+
+
+def _acquire_slot(conn, project_id: str, provider: str, pueue_id: int) -> Optional[int]:
+    _reclaim_expired_leases(conn)
+    row = conn.execute(
+        "SELECT slot_number FROM compute_slots "
+        "WHERE provider = ? AND project_id IS NULL "
+        "ORDER BY slot_number LIMIT 1",
+        (provider,),
+    ).fetchone()
+    if row is None:
+        return None
+    slot = row["slot_number"]
+    conn.execute(
+        "UPDATE compute_slots SET project_id = ?, pueue_id = ?, "
+        "acquired_at = strftime('%Y-%m-%dT%H:%M:%SZ','now') "
+        "WHERE slot_number = ?",
+        (project_id, pueue_id, slot),
+    )
+    return slot
 
 
 def try_acquire_slot(project_id: str, provider: str, pueue_id: int) -> Optional[int]:
@@ -55,6 +503,112 @@ def try_acquire_slot(project_id: str, provider: str, pueue_id: int) -> Optional[
     orchestrator and callback scripts.
     """
     with get_db(immediate=True) as conn:
+        return _acquire_slot(conn, project_id, provider, pueue_id)
+
+
+_FREE_SLOT = (
+    "project_id = NULL, pid = NULL, pueue_id = NULL, acquired_at = NULL, "
+    "lease_expires_at = NULL, lease_token = NULL"
+)
+
+
+def _expire_reservations(conn, ttl: int) -> int:
+    # A reservation whose runner already heartbeats is leased, not abandoned.
+    cursor = conn.execute(
+        f"UPDATE compute_slots SET {_FREE_SLOT} "
+        "WHERE project_id IS NOT NULL AND pueue_id IS NULL AND lease_expires_at IS NULL "
+        "AND acquired_at < strftime('%Y-%m-%dT%H:%M:%SZ','now', ?)",
+        (f"-{int(ttl)} seconds",),
+    )
+    return cursor.rowcount
+
+
+def _reclaim_expired_leases(conn) -> int:
+    cursor = conn.execute(
+        f"UPDATE compute_slots SET {_FREE_SLOT} "
+        "WHERE lease_expires_at < strftime('%Y-%m-%dT%H:%M:%SZ','now')"
+    )
+    return cursor.rowcount
+
+
+def expire_reservations(ttl: Optional[int] = None) -> int:
+    """Free reservations never bound to a pueue task within `ttl` seconds. Returns count.
+
+    `ttl` defaults to reservation_ttl().
+    """
+    with get_db(immediate=True) as conn:
+        return _expire_reservations(conn, reservation_ttl() if ttl is None else ttl)
+
+
+def reclaim_expired_leases() -> int:
+    """Free slots whose runner stopped heartbeating. Returns count.
+
+    Does not consult pueue: a lease that was not renewed within lease_ttl()
+    means the runner is gone (crashed, killed, host rebooted).
+    """
+    with get_db(immediate=True) as conn:
+        return _reclaim_expired_leases(conn)
+
+
+def heartbeat(
+    slot_number: int, token: str, pid: Optional[int] = None, ttl: Optional[int] = None
+) -> bool:
+    """Renew the lease on a slot for `ttl` seconds (default lease_ttl()); records the runner `pid`.
+
+    `token` is the slot's lease_token from reserve_slot (see lease_env), so
+    a runner whose slot was already reclaimed and handed to someone else
+    cannot renew it. Returns False when the lease is no longer held.
+    The first heartbeat of a run also stamps its task_log.run_started_at,
+    so task_stats durations leave out the time spent queued in pueue.
+    """
+    with get_db(immediate=True) as conn:
+        cursor = conn.execute(
+            "UPDATE compute_slots SET "
+            "lease_expires_at = strftime('%Y-%m-%dT%H:%M:%SZ','now', ?), "
+            "pid = COALESCE(?, pid) "
+            "WHERE slot_number = ? AND lease_token = ? AND project_id IS NOT NULL",
+            (f"{int(lease_ttl() if ttl is None else ttl):+d} seconds", pid, slot_number, token),
+        )
+        if cursor.rowcount == 0:
+            return False
+        conn.execute(
+            "UPDATE task_log SET run_started_at = strftime('%Y-%m-%dT%H:%M:%SZ','now') "
+            "WHERE pueue_id = (SELECT pueue_id FROM compute_slots WHERE slot_number = ?) "
+            "AND finished_at IS NULL AND run_started_at IS NULL",
+            (slot_number,),
+        )
+        return True
+
+
+def lease_env(slot_number: Optional[int]) -> dict:
+    """Env for the pueue task holding `slot_number` (empty when no slot).
+
+    run-agent.sh heartbeats with DLD_SLOT_NUMBER / DLD_LEASE_TOKEN.
+    """
+    if slot_number is None:
+        return {}
+    with read_db() as conn:
+        row = conn.execute(
+            "SELECT lease_token FROM compute_slots WHERE slot_number = ?", (slot_number,)
+        ).fetchone()
+    if row is None or row["lease_token"] is None:
+        return {}
+    return {"DLD_SLOT_NUMBER": str(slot_number), "DLD_LEASE_TOKEN": row["lease_token"]}
+
+
+def reserve_slot(project_id: str, provider: str, ttl: Optional[int] = None) -> Optional[int]:
+    """Reserve a free slot before submitting to pueue. Returns slot_number or None.
+
+    A reservation is a slot with project_id set and pueue_id NULL; it counts
+    as taken for everyone else. Bind it with dispatch_task(reserved_slot=...)
+    once pueue returns an id, or give it back with cancel_reservation. A
+    reservation left unbound (crash between reserve and submit) expires
+    after `ttl` seconds (default reservation_ttl()). Each reservation gets a fresh lease_token for the
+    runner's heartbeats; expired leases are reclaimed first.
+    """
+    with get_db(immediate=True) as conn:
+        _expire_reservations(conn, reservation_ttl() if ttl is None else ttl)
+        _reclaim_expired_leases(conn)
         row = conn.execute(
             "SELECT slot_number FROM compute_slots "
             "WHERE provider = ? AND project_id IS NULL "
@@ -63,14 +617,65 @@ def try_acquire_slot(project_id: str, provider: str, pueue_id: int) -> Optional[
         ).fetchone()
         if row is None:
             return None
-        slot = row["slot_number"]
         conn.execute(
-            "UPDATE compute_slots SET project_id = ?, pueue_id = ?, "
-            "acquired_at = strftime('%Y-%m-%dT%H:%M:%SZ','now') "
+            "UPDATE compute_slots SET project_id = ?, pid = NULL, pueue_id = NULL, "
+            "acquired_at = strftime('%Y-%m-%dT%H:%M:%SZ','now'), "
+            "lease_expires_at = NULL, lease_token = lower(hex(randomblob(8))) "
             "WHERE slot_number = ?",
-            (project_id, pueue_id, slot),
+            (project_id, row["slot_number"]),
+        )
+        return row["slot_number"]
+
+
+def cancel_reservation(slot_number: int, project_id: str) -> bool:
+    """Give back an unbound reservation (pueue submission failed). True if released."""
+    with get_db(immediate=True) as conn:
+        cursor = conn.execute(
+            f"UPDATE compute_slots SET {_FREE_SLOT} "
+            "WHERE slot_number = ? AND project_id = ? AND pueue_id IS NULL",
+            (slot_number, project_id),
         )
-        return slot
+        return cursor.rowcount > 0
+
+
+def dispatch_task(
+    project_id: str,
+    provider: str,
+    pueue_id: int,
+    task_label: str,
+    skill: str,
+    status: str,
+    phase: Optional[str] = None,
+    current_task=_UNSET,
+    reserved_slot: Optional[int] = None,
+) -> DispatchResult:
+    """Record a submitted pueue task in one BEGIN IMMEDIATE transaction.
+
+    Binds `reserved_slot` to pueue_id (or acquires a free slot when there
+    is no reservation, or it already expired), inserts the task_log row and
+    (when `phase` is given) updates project_state together, so a crash
+    mid-dispatch cannot leave a slot held without its task_log row or vice
+    versa. The task is logged even when no slot is free (slot_number=None)
+    — it is already in pueue. current_task follows update_project_phase
+    semantics.
+    """
+    with get_db(immediate=True) as conn:
+        slot = None
+        if reserved_slot is not None:
+            bound = conn.execute(
+                "UPDATE compute_slots SET pueue_id = ? "
+                "WHERE slot_number = ? AND project_id = ? AND pueue_id IS NULL",
+                (pueue_id, reserved_slot, project_id),
+            ).rowcount
+            slot = reserved_slot if bound else None
+        if slot is None:
+            slot = _acquire_slot(conn, project_id, provider, pueue_id)
+        task_log_id = _insert_task_log(
+            conn, project_id, task_label, skill, status, pueue_id, provider
+        )
+        if phase is not None:
+            _set_phase(conn, project_id, phase, current_task)
+        return DispatchResult(slot, task_log_id)
 
 
 def release_slot(pueue_id: int) -> Optional[str]:
@@ -83,17 +688,13 @@ def release_slot(pueue_id: int) -> Optional[str]:
         if row is None:
             return None
         project_id = row["project_id"]
-        conn.execute(
-            "UPDATE compute_slots SET project_id = NULL, pid = NULL, "
-            "pueue_id = NULL, acquired_at = NULL WHERE pueue_id = ?",
-            (pueue_id,),
-        )
+        conn.execute(f"UPDATE compute_slots SET {_FREE_SLOT} WHERE pueue_id = ?", (pueue_id,))
         return project_id
 
 
 def get_project_state(project_id: str) -> Optional[dict]:
     """Get project state as dict. Returns None if not found."""
-    with get_db() as conn:
+    with read_db() as conn:
         row = conn.execute(
             "SELECT * FROM project_state WHERE project_id = ?",
             (project_id,),
@@ -103,13 +704,30 @@ def get_project_state(project_id: str) -> Optional[dict]:
 
 def get_all_projects() -> list[dict]:
     """Get all enabled projects."""
-    with get_db() as conn:
+    with read_db() as conn:
         rows = conn.execute(
             "SELECT * FROM project_state WHERE enabled = 1 ORDER BY project_id"
         ).fetchall()
         return [dict(r) for r in rows]
 
 
+def _set_phase(conn, project_id: str, phase: str, current_task=_UNSET) -> None:
+    if current_task is _UNSET:
+        conn.execute(
+            "UPDATE project_state SET phase = ?, "
+            "updated_at = strftime('%Y-%m-%dT%H:%M:%SZ','now') "
+            "WHERE project_id = ?",
+            (phase, project_id),
+        )
+    else:
+        conn.execute(
+            "UPDATE project_state SET phase = ?, current_task = ?, "
+            "updated_at = strftime('%Y-%m-%dT%H:%M:%SZ','now') "
+            "WHERE project_id = ?",
+            (phase, current_task, project_id),
+        )
+
+
 def update_project_phase(project_id: str, phase: str, current_task=_UNSET) -> None:
     """Update project phase and optionally current_task.
 
@@ -119,20 +737,24 @@ def update_project_phase(project_id: str, phase: str, current_task=_UNSET) -> No
     - str value   -> set current_task to that value
     """
     with get_db() as conn:
-        if current_task is _UNSET:
-            conn.execute(
-                "UPDATE project_state SET phase = ?, "
-                "updated_at = strftime('%Y-%m-%dT%H:%M:%SZ','now') "
-                "WHERE project_id = ?",
-                (phase, project_id),
-            )
-        else:
-            conn.execute(
-                "UPDATE project_state SET phase = ?, current_task = ?, "
-                "updated_at = strftime('%Y-%m-%dT%H:%M:%SZ','now') "
-                "WHERE project_id = ?",
-                (phase, current_task, project_id),
-            )
+        _set_phase(conn, project_id, phase, current_task)
+
+
+def _insert_task_log(
+    conn,
+    project_id: str,
+    task_label: str,
+    skill: str,
+    status: str,
+    pueue_id: int = None,
+    provider: Optional[str] = None,
+) -> int:
+    cursor = conn.execute(
+        "INSERT INTO task_log (project_id, task_label, skill, status, pueue_id, provider) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (project_id, task_label, skill, status, pueue_id, provider),
+    )
+    return cursor.lastrowid
 
 
 def log_task(
@@ -144,28 +766,33 @@ def log_task(
 ) -> int:
     """Create a task_log entry. Returns the row id."""
     with get_db() as conn:
-        cursor = conn.execute(
-            "INSERT INTO task_log (project_id, task_label, skill, status, pueue_id) "
-            "VALUES (?, ?, ?, ?, ?)",
-            (project_id, task_label, skill, status, pueue_id),
-        )
-        return cursor.lastrowid
+        return _insert_task_log(conn, project_id, task_label, skill, status, pueue_id)
 
 
 def finish_task(pueue_id: int, status: str, exit_code: int, summary: str = None) -> None:
-    """Mark a task as finished in task_log."""
-    with get_db() as conn:
+    """Mark a task as finished in task_log and fold it into task_stats (same transaction)."""
+    with get_db(immediate=True) as conn:
+        ids = [
+            r["id"]
+            for r in conn.execute(
+                "SELECT id FROM task_log WHERE pueue_id = ? AND finished_at IS NULL", (pueue_id,)
+            )
+        ]
+        if not ids:
+            return
+        marks = ", ".join("?" * len(ids))
         conn.execute(
             "UPDATE task_log SET status = ?, exit_code = ?, output_summary = ?, "
             "finished_at = strftime('%Y-%m-%dT%H:%M:%SZ','now') "
-            "WHERE pueue_id = ? AND finished_at IS NULL",
-            (status, exit_code, summary, pueue_id),
+            f"WHERE id IN ({marks})",
+            (status, exit_code, summary, *ids),
         )
+        conn.execute(_stats_upsert(f"t.id IN ({marks})", _RUN_START), ids)
 
 
 def get_available_slots(provider: str) -> int:
     """Count available slots for a provider."""
-    with get_db() as conn:
+    with read_db() as conn:
         row = conn.execute(
             "SELECT COUNT(*) as cnt FROM compute_slots WHERE provider = ? AND project_id IS NULL",
             (provider,),
@@ -173,25 +800,45 @@ def get_available_slots(provider: str) -> int:
         return row["cnt"]
 
 
+def get_free_slots_by_provider() -> dict[str, int]:
+    """Return {provider: free slot count} for every provider with slots."""
+    with read_db() as conn:
+        rows = conn.execute(
+            "SELECT provider, SUM(project_id IS NULL) AS free FROM compute_slots GROUP BY provider"
+        ).fetchall()
+        return {r["provider"]: r["free"] for r in rows}
+
+
+def get_slots_by_project() -> dict[str, int]:
+    """Return {project_id: occupied slot count} for projects holding slots."""
+    with read_db() as conn:
+        rows = conn.execute(
+            "SELECT project_id, COUNT(*) AS cnt FROM compute_slots "
+            "WHERE project_id IS NOT NULL GROUP BY project_id"
+        ).fetchall()
+        return {r["project_id"]: r["cnt"] for r in rows}
+
+
 def get_occupied_slots() -> list[dict]:
     """Return all compute_slots with non-NULL pueue_id.
 
     Used by orphan slot watchdog (BUG-162) to cross-reference
-    occupied slots against live pueue tasks.
+    occupied slots against live pueue tasks. Slots with a lease
+    (lease_expires_at set) are covered by reclaim_expired_leases instead.
     """
-    with get_db() as conn:
+    with read_db() as conn:
         rows = conn.execute(
-            "SELECT slot_number, provider, project_id, pueue_id, acquired_at "
+            "SELECT slot_number, provider, project_id, pueue_id, acquired_at, lease_expires_at "
             "FROM compute_slots WHERE pueue_id IS NOT NULL"
         ).fetchall()
         return [dict(r) for r in rows]
 
 
 def get_task_by_pueue_id(pueue_id: int) -> Optional[dict]:
-    """Get task_log entry by pueue_id. Returns dict with project_id, task_label, skill."""
-    with get_db() as conn:
+    """Get the latest task_log entry by pueue_id: id, project_id, task_label, skill, log_path."""
+    with read_db() as conn:
         row = conn.execute(
-            "SELECT project_id, task_label, skill FROM task_log "
+            "SELECT id, project_id, task_label, skill, log_path FROM task_log "
             "WHERE pueue_id = ? ORDER BY id DESC LIMIT 1",
             (pueue_id,),
         ).fetchone()
@@ -252,7 +899,7 @@ def save_finding(
 
 def get_new_findings(project_id: str) -> list[dict]:
     """Return findings with status='new' for a project."""
-    with get_db() as conn:
+    with read_db() as conn:
         rows = conn.execute(
             "SELECT * FROM night_findings WHERE project_id = ? AND status = 'new' ORDER BY id",
             (project_id,),
@@ -273,7 +920,7 @@ def update_finding_status(finding_id: int, status: str) -> None:
 
 def get_finding_by_id(finding_id: int) -> Optional[dict]:
     """Return a single finding by id, or None if not found."""
-    with get_db() as conn:
+    with read_db() as conn:
         row = conn.execute(
             "SELECT * FROM night_findings WHERE id = ?",
             (finding_id,),
@@ -283,7 +930,7 @@ def get_finding_by_id(finding_id: int) -> Optional[dict]:
 
 def get_all_findings(project_id: str, status: Optional[str] = None) -> list[dict]:
     """Return all findings for project, optionally filtered by status."""
-    with get_db() as conn:
+    with read_db() as conn:
         if status is not None:
             rows = conn.execute(
                 "SELECT * FROM night_findings WHERE project_id = ? AND status = ? ORDER BY id",
@@ -302,7 +949,7 @@ def get_projects_for_night_scan(project_ids: list[str]) -> list[dict]:
     if not project_ids:
         return []
     placeholders = ",".join("?" * len(project_ids))
-    with get_db() as conn:
+    with read_db() as conn:
         rows = conn.execute(
             f"SELECT * FROM project_state WHERE enabled = 1 AND project_id IN ({placeholders}) ORDER BY project_id",
             project_ids,
@@ -310,6 +957,880 @@ def get_projects_for_night_scan(project_ids: list[str]) -> list[dict]:
         return [dict(r) for r in rows]
 
 
+# --- bulk findings ingest (night reviewer) ---
+
+
+def finding_fingerprint(project_id: str, file: str, issue_type: str) -> str:
+    """SHA256 of project_id + file + issue_type (same bytes night-reviewer.sh hashed)."""
+    return hashlib.sha256(f"{project_id}{file}{issue_type}".encode()).hexdigest()
+
+
+def _field(finding: dict, key: str, default: str = "") -> str:
+    """jq `-r '.key // default'` semantics: null/false/missing -> default, scalars as text."""
+    value = finding.get(key)
+    if value is None or value is False:
+        return default
+    if isinstance(value, str):
+        return value
+    if value is True:
+        return "true"
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"))
+    return str(value)
+
+
+def ingest_findings(project_id: str, findings: list) -> list[dict]:
+    """Save many audit findings in one BEGIN IMMEDIATE transaction.
+
+    Each finding is a dict with file, issue_type, description, suggestion,
+    severity, confidence and line keys (all optional). Rows go in with one
+    executemany INSERT OR IGNORE, so an already-known fingerprint is a
+    duplicate rather than an error.
+
+    Returns one result per input, in order:
+    {"index", "fingerprint", "result": inserted|duplicate|invalid, "id"}.
+    """
+    results: list[dict] = []
+    rows: list[tuple] = []
+    for i, f in enumerate(findings):
+        if not isinstance(f, dict):
+            results.append({"index": i, "fingerprint": None, "result": "invalid", "id": None})
+            continue
+        fp = finding_fingerprint(project_id, _field(f, "file"), _field(f, "issue_type"))
+        results.append({"index": i, "fingerprint": fp, "result": None, "id": None})
+        rows.append(
+            (
+                project_id,
+                fp,
+                _field(f, "severity", "medium"),
+                _field(f, "confidence", "medium"),
+                _field(f, "file"),
+                _field(f, "line"),
+                _field(f, "description"),
+                _field(f, "suggestion"),
+            )
+        )
+    if not rows:
+        return results
+
+    fps = sorted({r[1] for r in rows})
+    with get_db(immediate=True) as conn:
+        known = _finding_ids(conn, project_id, fps)
+        conn.executemany(
+            "INSERT OR IGNORE INTO night_findings "
+            "(project_id, fingerprint, severity, confidence, file_path, line_range, summary, suggestion) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        ids = _finding_ids(conn, project_id, fps)
+
+    seen: set[str] = set()
+    for r in results:
+        fp = r["fingerprint"]
+        if fp is None:
+            continue
+        r["id"] = ids.get(fp)
+        r["result"] = "duplicate" if fp in known or fp in seen else "inserted"
+        seen.add(fp)
+    return results
+
+
+def _finding_ids(conn, project_id: str, fingerprints: list[str]) -> dict[str, int]:
+    ids: dict[str, int] = {}
+    # Stay well under SQLite's host-parameter limit.
+    for start in range(0, len(fingerprints), 500):
+        chunk = fingerprints[start : start + 500]
+        ids.update(
+            (r["fingerprint"], r["id"])
+            for r in conn.execute(
+                "SELECT id, fingerprint FROM night_findings WHERE project_id = ? "
+                f"AND fingerprint IN ({','.join('?' * len(chunk))})",
+                (project_id, *chunk),
+            )
+        )
+    return ids
+
+
+def parse_findings(text: str) -> list:
+    """Findings from a JSON array or NDJSON (one object per line; bad lines become None)."""
+    text = text.strip()
+    if not text:
+        return []
+    if text.startswith("["):
+        data = json.loads(text)
+        return data if isinstance(data, list) else []
+    findings = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            findings.append(json.loads(line))
+        except json.JSONDecodeError:
+            findings.append(None)
+    return findings
+
+
+# --- command server (db.py serve) ---
+
+
+def _opt(req: dict, key: str):
+    return req[key] if key in req else _UNSET
+
+
+SERVE_COMMANDS = {
+    "ping": lambda r: "pong",
+    "wal-stats": lambda r: wal_stats(),
+    "get-project": lambda r: get_project_state(r["project_id"]),
+    "update-phase": lambda r: update_project_phase(
+        r["project_id"], r["phase"], _opt(r, "current_task")
+    ),
+    "save-finding": lambda r: save_finding(
+        r["project_id"],
+        r["fingerprint"],
+        r.get("severity", "medium"),
+        r.get("confidence", "medium"),
+        r.get("file_path"),
+        r.get("line_range"),
+        r["summary"],
+        r.get("suggestion"),
+    ),
+    "get-new-findings": lambda r: get_new_findings(r["project_id"]),
+    "ingest-findings": lambda r: ingest_findings(r["project_id"], r["findings"]),
+}
+
+
+def handle_request(line: str) -> str:
+    """Answer one NDJSON request line: {"cmd": ..., <params>} -> {"ok", "result"|"error"}.
+
+    An "id" in the request is echoed back so pipelined clients can match replies.
+    """
+    req = None
+    try:
+        req = json.loads(line)
+        if not isinstance(req, dict):
+            raise ValueError("request must be a JSON object")
+        fn = SERVE_COMMANDS.get(req.get("cmd"))
+        if fn is None:
+            raise ValueError(f"unknown cmd: {req.get('cmd')!r}")
+        resp = {"ok": True, "result": fn(req)}
+    except KeyError as exc:
+        resp = {"ok": False, "error": f"missing field: {exc.args[0]}"}
+    except Exception as exc:
+        resp = {"ok": False, "error": str(exc)}
+    if isinstance(req, dict) and isinstance(req.get("id"), (str, int)):
+        resp["id"] = req["id"]
+    return json.dumps(resp)
+
+
+def serve_stream(infile, outfile) -> None:
+    """Coprocess mode: one reply line per request line until EOF."""
+    for line in infile:
+        if line.strip():
+            outfile.write(handle_request(line) + "\n")
+            outfile.flush()
+
+
+def serve_socket(path: str) -> None:
+    """Serve NDJSON on a Unix socket (one thread per client) until SIGTERM/SIGINT."""
+    import signal
+    import socketserver
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for raw in self.rfile:
+                line = raw.decode(errors="replace")
+                if line.strip():
+                    self.wfile.write((handle_request(line) + "\n").encode())
+                    self.wfile.flush()
+            close_db()
+
+    if os.path.exists(path):
+        os.unlink(path)  # stale socket from a previous run
+    server = socketserver.ThreadingUnixStreamServer(path, Handler)
+    server.daemon_threads = True
+    os.chmod(path, 0o600)
+
+    def stop(_signum, _frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    log.info("db server listening on %s", path)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        os.unlink(path)
+
+
+# --- task_log retention ---
+
+_TASK_LOG_COLUMNS = (
+    "id, project_id, task_label, skill, status, pueue_id, "
+    "started_at, finished_at, exit_code, output_summary, provider, log_path, run_started_at"
+)
+# Columns task_log gained by migration after the first archives were written.
+_ARCHIVE_ADDED_COLUMNS = {"provider": "TEXT", "log_path": "TEXT", "run_started_at": "TEXT"}
+
+
+def vacuum_pages() -> int:
+    """Most pages one archive pass hands back to the filesystem (write lock held meanwhile)."""
+    return int(os.environ.get("TASK_LOG_VACUUM_PAGES", "2000"))
+
+
+def _incremental_vacuum(conn: sqlite3.Connection, max_pages: Optional[int] = None) -> int:
+    """Return up to `max_pages` free pages to the filesystem. Returns pages freed.
+
+    `max_pages` defaults to vacuum_pages(). Never a full VACUUM: a
+    database still without auto_vacuum=INCREMENTAL (created by schema.sql)
+    is left alone until an operator runs `db.py archive --convert`; its
+    free pages are reused by new rows.
+    """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        log.info("incremental vacuum skipped: run `db.py archive --convert` once")
+        return 0
+    if max_pages is None:
+        max_pages = vacuum_pages()
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    conn.execute(f"PRAGMA incremental_vacuum({int(max_pages)})").fetchall()
+    return min(free, int(max_pages))
+
+
+def convert_auto_vacuum() -> int:
+    """One-time switch to auto_vacuum=INCREMENTAL (full VACUUM). Returns pages freed.
+
+    Rewrites the whole database under an exclusive lock — run it from
+    setup or with the orchestrator stopped, never from the poll loop.
+    No-op (0) when already converted.
+    """
+    conn = _connect()
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return 0
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        before = conn.execute("PRAGMA page_count").fetchone()[0]
+        conn.execute("VACUUM")
+        # Can grow a page or two: INCREMENTAL adds pointer-map pages.
+        return max(before - conn.execute("PRAGMA page_count").fetchone()[0], 0)
+    finally:
+        conn.close()
+
+
+def archive_task_log(days: int = 30, archive_dir: Optional[str] = None) -> dict:
+    """Move finished task_log rows older than `days` out of the hot database.
+
+    Rows are copied into <archive_dir>/task_log-YYYY-MM.db (by finished_at
+    month) through ATTACH, folded into task_log_rollup (runs, failures,
+    run time per month/project/skill/status), then deleted; up to
+    vacuum_pages() freed pages are released with incremental vacuum (after
+    convert_auto_vacuum()). Safe to re-run after a crash: archive
+    inserts are INSERT OR IGNORE, and the rollup commits together with the
+    delete in the main database.
+
+    Returns {"archived": rows moved, "months": [...], "freed_pages": n}.
+    """
+    archive_path = Path(
+        archive_dir or os.environ.get("TASK_LOG_ARCHIVE_DIR") or Path(DB_PATH).parent / "archive"
+    )
+    conn = _connect()
+    try:
+        cutoff = conn.execute(
+            "SELECT strftime('%Y-%m-%dT%H:%M:%SZ', 'now', ?)", (f"-{int(days)} days",)
+        ).fetchone()[0]
+        months = [
+            r[0]
+            for r in conn.execute(
+                "SELECT DISTINCT substr(finished_at, 1, 7) FROM task_log "
+                "WHERE finished_at IS NOT NULL AND finished_at < ? ORDER BY 1",
+                (cutoff,),
+            )
+        ]
+        if months:
+            archive_path.mkdir(parents=True, exist_ok=True)
+        where = "finished_at IS NOT NULL AND finished_at < ? AND substr(finished_at, 1, 7) = ?"
+        archived = 0
+        for month in months:
+            params = (cutoff, month)
+            conn.execute(
+                "ATTACH DATABASE ? AS archive", (str(archive_path / f"task_log-{month}.db"),)
+            )
+            try:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS archive.task_log ("
+                    "id INTEGER PRIMARY KEY, project_id TEXT NOT NULL, task_label TEXT NOT NULL, "
+                    "skill TEXT, status TEXT, pueue_id INTEGER, started_at TEXT, "
+                    "finished_at TEXT, exit_code INTEGER, output_summary TEXT, "
+                    "provider TEXT, log_path TEXT, run_started_at TEXT)"
+                )
+                # IF NOT EXISTS keeps an older archive's columns: add the new ones.
+                have = {r[1] for r in conn.execute("PRAGMA archive.table_info(task_log)")}
+                for column, decl in _ARCHIVE_ADDED_COLUMNS.items():
+                    if column not in have:
+                        conn.execute(f"ALTER TABLE archive.task_log ADD COLUMN {column} {decl}")
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.execute(
+                        f"INSERT OR IGNORE INTO archive.task_log ({_TASK_LOG_COLUMNS}) "
+                        f"SELECT {_TASK_LOG_COLUMNS} FROM main.task_log WHERE {where}",
+                        params,
+                    )
+                    conn.execute(
+                        "INSERT INTO main.task_log_rollup "
+                        "(month, project_id, skill, status, runs, failures, total_seconds) "
+                        "SELECT substr(finished_at, 1, 7), project_id, skill, status, COUNT(*), "
+                        "SUM(COALESCE(exit_code, 0) != 0), "
+                        "CAST(SUM(MAX(julianday(finished_at) "
+                        "- julianday(COALESCE(run_started_at, started_at)), 0) * 86400) "
+                        "AS INTEGER) "
+                        f"FROM main.task_log WHERE {where} GROUP BY 1, 2, 3, 4 "
+                        "ON CONFLICT(month, project_id, skill, status) DO UPDATE SET "
+                        "runs = runs + excluded.runs, "
+                        "failures = failures + excluded.failures, "
+                        "total_seconds = total_seconds + excluded.total_seconds",
+                        params,
+                    )
+                    archived += conn.execute(
+                        f"DELETE FROM main.task_log WHERE {where}", params
+                    ).rowcount
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+            finally:
+                conn.execute("DETACH DATABASE archive")
+        freed = _incremental_vacuum(conn) if archived else 0
+    finally:
+        conn.close()
+    if archived:
+        log.info("archived %d task_log rows (%s), freed %d pages", archived, months, freed)
+    return {"archived": archived, "months": months, "freed_pages": freed}
+
+
+# --- usage / cost ledger (claude-runner.py) ---
+
+
+def _running_task(conn, task_label: str) -> Optional[sqlite3.Row]:
+    """A runner's own task_log row: the latest unfinished one with its DLD_TASK_LABEL."""
+    return conn.execute(
+        "SELECT id, pueue_id FROM task_log WHERE task_label = ? AND finished_at IS NULL "
+        "ORDER BY id DESC LIMIT 1",
+        (task_label,),
+    ).fetchone()
+
+
+def record_log_path(task_label: str, log_path: str) -> bool:
+    """Store where a runner writes its result (task_log.log_path). False if no row matched.
+
+    callback.py then reads that file by pueue_id instead of globbing logs/.
+    """
+    with get_db() as conn:
+        task = _running_task(conn, task_label)
+        if task is None:
+            return False
+        conn.execute("UPDATE task_log SET log_path = ? WHERE id = ?", (log_path, task["id"]))
+        return True
+
+
+_USAGE_FIELDS = (
+    ("input_tokens", "inputTokens"),
+    ("output_tokens", "outputTokens"),
+    ("cache_read_input_tokens", "cacheReadInputTokens"),
+    ("cache_creation_input_tokens", "cacheCreationInputTokens"),
+    ("cost_usd", "costUSD"),
+)
+
+
+def _usage_row(data: dict) -> tuple:
+    """Token/cost values from a usage dict (snake_case or SDK camelCase keys)."""
+    values = []
+    for snake, camel in _USAGE_FIELDS:
+        raw = data.get(snake, data.get(camel, 0)) or 0
+        values.append(float(raw) if snake == "cost_usd" else int(raw))
+    return tuple(values)
+
+
+def record_usage(
+    project_id: Optional[str],
+    task_label: Optional[str],
+    skill: str,
+    usage: dict,
+    model_usage: Optional[dict] = None,
+    spec_id: Optional[str] = None,
+    project_dir: Optional[str] = None,
+) -> int:
+    """Write one run's token usage and cost to task_usage. Returns rows written.
+
+    One row per model in `model_usage` (the SDK's per-model breakdown);
+    without it, one row (model '') with the run totals from `usage`
+    (input_tokens, output_tokens, cache_*_input_tokens, cost_usd). The run
+    is tied to its task_log row / pueue_id through `task_label` (latest
+    unfinished row), and re-recording the same run replaces its rows.
+    project_id may be None when only `project_dir` is known (manual run).
+    """
+    with get_db(immediate=True) as conn:
+        if project_id is None and project_dir:
+            row = conn.execute(
+                "SELECT project_id FROM project_state WHERE path = ?", (project_dir,)
+            ).fetchone()
+            project_id = row["project_id"] if row else Path(project_dir).name
+        task = _running_task(conn, task_label) if task_label else None
+        task_log_id, pueue_id = (task["id"], task["pueue_id"]) if task else (None, None)
+        if task_log_id is not None:
+            conn.execute("DELETE FROM task_usage WHERE task_log_id = ?", (task_log_id,))
+        per_model = [
+            (m, _usage_row(d)) for m, d in (model_usage or {}).items() if isinstance(d, dict)
+        ]
+        if not per_model:
+            per_model = [("", _usage_row(usage))]
+        run_id = os.urandom(8).hex()
+        conn.executemany(
+            "INSERT INTO task_usage (run_id, task_log_id, pueue_id, project_id, task_label, "
+            "spec_id, skill, model, input_tokens, output_tokens, cache_read_input_tokens, "
+            "cache_creation_input_tokens, cost_usd) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (run_id, task_log_id, pueue_id, project_id, task_label, spec_id, skill, model)
+                + values
+                for model, values in per_model
+            ],
+        )
+        return len(per_model)
+
+
+_USAGE_GROUPS = {
+    "project": "project_id",
+    "spec": "COALESCE(spec_id, '')",
+    "skill": "COALESCE(skill, '')",
+    "model": "model",
+    "day": "substr(recorded_at, 1, 10)",
+}
+
+
+def usage_summary(
+    by: str = "project", since: Optional[str] = None, project_id: Optional[str] = None
+) -> list[dict]:
+    """Aggregate task_usage by project, spec, skill, model or day (UTC), costliest first.
+
+    since: ISO date/time lower bound on recorded_at. Each result has key,
+    runs, input/output/cache token sums and cost_usd.
+    """
+    if by not in _USAGE_GROUPS:
+        raise ValueError(f"by must be one of {sorted(_USAGE_GROUPS)}")
+    where, params = [], []
+    if since:
+        where.append("recorded_at >= ?")
+        params.append(since)
+    if project_id:
+        where.append("project_id = ?")
+        params.append(project_id)
+    clause = f"WHERE {' AND '.join(where)} " if where else ""
+    with read_db() as conn:
+        rows = conn.execute(
+            f"SELECT {_USAGE_GROUPS[by]} AS key, "
+            "COUNT(DISTINCT run_id) AS runs, "
+            "SUM(input_tokens) AS input_tokens, SUM(output_tokens) AS output_tokens, "
+            "SUM(cache_read_input_tokens) AS cache_read_input_tokens, "
+            "SUM(cache_creation_input_tokens) AS cache_creation_input_tokens, "
+            "ROUND(SUM(cost_usd), 4) AS cost_usd "
+            f"FROM task_usage {clause}GROUP BY 1 ORDER BY cost_usd DESC, key",
+            params,
+        ).fetchall()
+    return [dict(r) for r in rows]
+
+
+# --- task duration stats (task_stats rollups) ---
+
+_STATS_GROUPS = ("project_id", "skill", "provider")
+_GRAIN_LEN = {"hour": 13, "day": 10}
+
+
+def _percentile(hist: list[int], max_seconds: float, q: float) -> float:
+    """Approximate q-quantile from histogram counts (linear within a bin)."""
+    total = sum(hist)
+    if not total:
+        return 0.0
+    rank = q * total
+    lower, seen = 0.0, 0
+    for upper, count in zip(DURATION_BINS + (max_seconds,), hist):
+        upper = min(upper, max_seconds)
+        if count and seen + count >= rank:
+            return round(lower + (upper - lower) * (rank - seen) / count, 1)
+        seen += count
+        lower = upper
+    return round(max_seconds, 1)
+
+
+def task_stats(
+    grain: str = "day",
+    since: Optional[str] = None,
+    by: tuple = _STATS_GROUPS,
+    **filters: str,
+) -> list[dict]:
+    """Duration/success stats from the task_stats rollups, never from task_log.
+
+    grain: "hour" or "day" buckets (UTC); since: ISO date/time, compared at
+    the grain's resolution. by: any of project_id, skill, provider (empty =
+    one total row). filters: project_id= / skill= / provider= equality.
+    Each row: the `by` keys, runs, successes, success_rate, total_seconds,
+    slot_hours, avg_seconds, max_seconds and approximate p50/p90/p95/p99.
+    Durations run from the runner's first heartbeat to finish (see
+    _RUN_START); runs without a slot lease, and rows backfilled by
+    migration 5, count from when they were queued.
+    Cost is O(matching buckets), independent of task_log size.
+    """
+    if grain not in _GRAIN_LEN:
+        raise ValueError(f"grain must be one of {sorted(_GRAIN_LEN)}")
+    by = tuple(by)
+    unknown = (set(by) | set(filters)) - set(_STATS_GROUPS)
+    if unknown:
+        raise ValueError(f"unknown stats keys: {sorted(unknown)}")
+    where, params = ["grain = ?"], [grain]
+    if since:
+        where.append("bucket >= ?")
+        params.append(since[: _GRAIN_LEN[grain]])
+    for key, value in filters.items():
+        where.append(f"{key} = ?")
+        params.append(value)
+    keys = ", ".join(by)
+    with read_db() as conn:
+        rows = conn.execute(
+            f"SELECT {keys + ', ' if by else ''}SUM(runs) AS runs, SUM(successes) AS successes, "
+            "SUM(total_seconds) AS total_seconds, MAX(max_seconds) AS max_seconds, "
+            + ", ".join(f"SUM({c}) AS {c}" for c in _HIST_COLS)
+            + f" FROM task_stats WHERE {' AND '.join(where)}"
+            + (f" GROUP BY {keys} ORDER BY {keys}" if by else " HAVING SUM(runs) > 0"),
+            params,
+        ).fetchall()
+    result = []
+    for row in rows:
+        hist = [row[c] for c in _HIST_COLS]
+        runs, total = row["runs"], row["total_seconds"]
+        stats = {k: row[k] for k in by}
+        stats.update(
+            runs=runs,
+            successes=row["successes"],
+            success_rate=round(row["successes"] / runs, 4),
+            total_seconds=round(total, 1),
+            slot_hours=round(total / 3600, 2),
+            avg_seconds=round(total / runs, 1),
+            max_seconds=round(row["max_seconds"], 1),
+        )
+        for q in (50, 90, 95, 99):
+            stats[f"p{q}"] = _percentile(hist, row["max_seconds"], q / 100)
+        result.append(stats)
+    return result
+
+
+# --- callback job queue ---
+
+
+def enqueue_jobs(pueue_id: int, run: str, steps: list[tuple[str, dict]]) -> int:
+    """Queue callback post-processing steps in one transaction. Returns rows added.
+
+    Each (step, payload) gets the idempotency key "<run>:<step>", so a
+    repeated callback for the same run (hook retried, daemon fallback)
+    queues nothing twice.
+    """
+    with get_db(immediate=True) as conn:
+        added = 0
+        for step, payload in steps:
+            added += conn.execute(
+                "INSERT INTO callback_jobs (job_key, pueue_id, step, payload, max_attempts) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT(job_key) DO NOTHING",
+                (f"{run}:{step}", pueue_id, step, json.dumps(payload), job_attempts()),
+            ).rowcount
+        return added
+
+
+def coalesce_job(step: str, group: str, payload: dict, delay: float = 0) -> int:
+    """Merge `payload` into the queued `step` job of `group`, or queue a new one. Returns its id.
+
+    List values are appended (duplicates dropped), other values replaced.
+    A new job is due in `delay` seconds and merging keeps that time, so a
+    batch waits at most `delay` after its first item. Once a worker has
+    claimed the job, the next call starts a new batch.
+    """
+    prefix = f"{step}:{group}:"
+    with get_db(immediate=True) as conn:
+        row = conn.execute(
+            "SELECT id, payload FROM callback_jobs WHERE status = 'queued' AND step = ? "
+            "AND substr(job_key, 1, ?) = ? ORDER BY id LIMIT 1",
+            (step, len(prefix), prefix),
+        ).fetchone()
+        if row is None:
+            return conn.execute(
+                "INSERT INTO callback_jobs (job_key, step, payload, max_attempts, run_after) "
+                "VALUES (?, ?, ?, ?, strftime('%Y-%m-%dT%H:%M:%SZ','now', ?))",
+                (
+                    prefix + os.urandom(4).hex(),
+                    step,
+                    json.dumps(payload),
+                    job_attempts(),
+                    f"{int(delay):+d} seconds",
+                ),
+            ).lastrowid
+        merged = json.loads(row["payload"])
+        for key, value in payload.items():
+            if isinstance(value, list) and isinstance(merged.get(key), list):
+                merged[key] += [v for v in value if v not in merged[key]]
+            else:
+                merged[key] = value
+        conn.execute(
+            "UPDATE callback_jobs SET payload = ? WHERE id = ?", (json.dumps(merged), row["id"])
+        )
+        return row["id"]
+
+
+def set_job_payload(job_id: int, payload: dict) -> None:
+    """Replace a job's payload (progress a step keeps across its retries)."""
+    with get_db(immediate=True) as conn:
+        conn.execute(
+            "UPDATE callback_jobs SET payload = ? WHERE id = ?", (json.dumps(payload), job_id)
+        )
+
+
+def _step_filter(
+    steps: Optional[Sequence[str]], exclude: Optional[Sequence[str]]
+) -> tuple[str, list]:
+    """SQL condition (leading AND) + params limiting callback_jobs to / away from some steps."""
+    sql, params = "", []
+    if steps:
+        sql += f" AND step IN ({', '.join('?' * len(steps))})"
+        params += list(steps)
+    if exclude:
+        sql += f" AND step NOT IN ({', '.join('?' * len(exclude))})"
+        params += list(exclude)
+    return sql, params
+
+
+def claim_job(
+    steps: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+    flush: bool = False,
+) -> Optional[dict]:
+    """Take the oldest due job: status -> running, attempts + 1. None when nothing is due.
+
+    `steps` / `exclude` limit which steps are taken. `flush` also takes jobs
+    still waiting out their first delay (a coalesce_job batch window), but
+    never a failed job before its retry backoff is over.
+    """
+    where, params = _step_filter(steps, exclude)
+    with get_db(immediate=True) as conn:
+        rows = conn.execute(
+            "UPDATE callback_jobs SET status = 'running', attempts = attempts + 1, "
+            "started_at = strftime('%Y-%m-%dT%H:%M:%SZ','now') "
+            "WHERE id = (SELECT id FROM callback_jobs WHERE status = 'queued' "
+            "AND (run_after <= strftime('%Y-%m-%dT%H:%M:%SZ','now') OR (? AND attempts = 0))"
+            f"{where} ORDER BY run_after, id LIMIT 1) "
+            "RETURNING *",
+            [int(flush)] + params,
+        ).fetchall()
+    if not rows:
+        return None
+    job = dict(rows[0])
+    job["payload"] = json.loads(job["payload"])
+    return job
+
+
+def finish_job(job_id: int, duration_ms: int, error: Optional[str] = None) -> str:
+    """Record a claimed job's outcome and step time. Returns the new status.
+
+    Success -> 'done'. A failure goes back to 'queued' with exponential
+    backoff (job_backoff() * 2^(attempts-1) seconds) until max_attempts,
+    then 'dead' (kept for `db.py jobs`, requeued by retry_jobs()).
+    """
+    with get_db(immediate=True) as conn:
+        row = conn.execute(
+            "SELECT attempts, max_attempts FROM callback_jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return "missing"
+        if error is None:
+            status, delay = "done", 0
+        elif row["attempts"] >= row["max_attempts"]:
+            status, delay = "dead", 0
+        else:
+            status, delay = "queued", job_backoff() * 2 ** (row["attempts"] - 1)
+        conn.execute(
+            "UPDATE callback_jobs SET status = ?, duration_ms = ?, last_error = ?, "
+            "run_after = strftime('%Y-%m-%dT%H:%M:%SZ','now', ?), "
+            "finished_at = CASE WHEN ? = 'queued' THEN NULL "
+            "ELSE strftime('%Y-%m-%dT%H:%M:%SZ','now') END "
+            "WHERE id = ?",
+            (status, duration_ms, error, f"{int(delay):+d} seconds", status, job_id),
+        )
+        return status
+
+
+def requeue_stale_jobs(timeout: Optional[int] = None) -> int:
+    """Jobs 'running' for more than `timeout` seconds lost their worker: queue them again.
+
+    `timeout` defaults to job_timeout(). Counts as a failed attempt (dead
+    once max_attempts is used up). Returns the number of jobs touched.
+    """
+    if timeout is None:
+        timeout = job_timeout()
+    with get_db(immediate=True) as conn:
+        return conn.execute(
+            "UPDATE callback_jobs SET "
+            "status = CASE WHEN attempts >= max_attempts THEN 'dead' ELSE 'queued' END, "
+            "last_error = 'worker lost', "
+            "finished_at = CASE WHEN attempts >= max_attempts "
+            "THEN strftime('%Y-%m-%dT%H:%M:%SZ','now') END "
+            "WHERE status = 'running' AND started_at <= strftime('%Y-%m-%dT%H:%M:%SZ','now', ?)",
+            (f"{-int(timeout):+d} seconds",),
+        ).rowcount
+
+
+def next_job_delay(
+    steps: Optional[Sequence[str]] = None, exclude: Optional[Sequence[str]] = None
+) -> Optional[float]:
+    """Seconds until the next queued job is due (0 if overdue); None when the queue is empty.
+
+    `steps` / `exclude` as for claim_job().
+    """
+    where, params = _step_filter(steps, exclude)
+    with read_db() as conn:
+        delay = conn.execute(
+            "SELECT (julianday(min(run_after)) - julianday('now')) * 86400 "
+            f"FROM callback_jobs WHERE status = 'queued'{where}",
+            params,
+        ).fetchone()[0]
+    return None if delay is None else max(delay, 0.0)
+
+
+def retry_jobs(step: Optional[str] = None) -> int:
+    """Queue dead jobs (optionally one step only) again with fresh attempts. Returns count."""
+    where, params = "status = 'dead'", []
+    if step:
+        where, params = where + " AND step = ?", [step]
+    with get_db(immediate=True) as conn:
+        return conn.execute(
+            "UPDATE callback_jobs SET status = 'queued', attempts = 0, finished_at = NULL, "
+            f"run_after = strftime('%Y-%m-%dT%H:%M:%SZ','now') WHERE {where}",
+            params,
+        ).rowcount
+
+
+def prune_jobs(days: float = 7) -> int:
+    """Delete 'done' jobs finished more than `days` ago. Dead jobs are kept."""
+    with get_db() as conn:
+        return conn.execute(
+            "DELETE FROM callback_jobs WHERE status = 'done' "
+            "AND finished_at < strftime('%Y-%m-%dT%H:%M:%SZ','now', ?)",
+            (f"{-float(days) * 86400:+.0f} seconds",),
+        ).rowcount
+
+
+def job_stats(since: Optional[str] = None) -> list[dict]:
+    """Per step: jobs by status, retries and step time (avg/max ms of the last attempt)."""
+    where, params = "", []
+    if since:
+        where, params = "WHERE created_at >= ?", [since]
+    with read_db() as conn:
+        rows = conn.execute(
+            "SELECT step, count(*) AS jobs, "
+            "sum(status = 'queued') AS queued, sum(status = 'running') AS running, "
+            "sum(status = 'done') AS done, sum(status = 'dead') AS dead, "
+            "sum(max(attempts - 1, 0)) AS retries, "
+            "round(avg(duration_ms)) AS avg_ms, max(duration_ms) AS max_ms "
+            f"FROM callback_jobs {where} GROUP BY step ORDER BY step",
+            params,
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+
+# --- WAL checkpointing ---
+
+
+def _checkpoint(mode: str, busy_ms: int = 5000) -> tuple[int, int, int]:
+    """Run PRAGMA wal_checkpoint(mode) outside any transaction: (busy, frames, copied)."""
+    pooled = _pool_enabled()
+    conn = _pooled_connection() if pooled else _connect()
+    try:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        conn.execute(f"PRAGMA busy_timeout={int(busy_ms)}")
+        try:
+            return tuple(conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone())
+        finally:
+            conn.execute("PRAGMA busy_timeout=5000")
+    finally:
+        if not pooled:
+            conn.close()
+
+
+def wal_stats() -> dict:
+    """WAL size on disk plus the frames a PASSIVE checkpoint could not copy yet.
+
+    Returns {"wal_bytes", "wal_frames", "checkpointed", "lag_frames", "busy"}.
+    PASSIVE never waits on readers or writers, so this is safe to call
+    from anywhere, any time.
+    """
+    busy, frames, done = _checkpoint("PASSIVE")
+    wal = Path(DB_PATH + "-wal")
+    return {
+        "wal_bytes": wal.stat().st_size if wal.exists() else 0,
+        "wal_frames": max(frames, 0),
+        "checkpointed": max(done, 0),
+        "lag_frames": max(frames - done, 0),
+        "busy": bool(busy),
+    }
+
+
+class WalCheckpointer(threading.Thread):
+    """Background checkpoints so callbacks don't pay for them on commit.
+
+    Every `interval` seconds: PASSIVE checkpoint (copies what it can, never
+    blocks). When the WAL was fully copied and has not grown since the
+    previous tick (the database is idle), TRUNCATE resets the WAL file to
+    zero bytes so it cannot grow without bound across overlapping readers.
+    The TRUNCATE waits at most `busy_ms` for readers, then gives up until
+    the next idle tick.
+
+    metrics() returns the last wal_stats() plus "truncated_at" and
+    "checkpoint_age" (seconds since the WAL was last fully checkpointed).
+    """
+
+    def __init__(self, interval: float = 30.0, busy_ms: int = 100):
+        super().__init__(name="wal-checkpointer", daemon=True)
+        self.interval = interval
+        self.busy_ms = busy_ms
+        self._halt = threading.Event()
+        self._prev_frames: Optional[int] = None
+        self._clean_at = time.monotonic()
+        self._metrics: dict = {}
+
+    def tick(self) -> dict:
+        stats = wal_stats()
+        now = time.monotonic()
+        if stats["lag_frames"] == 0:
+            self._clean_at = now
+        idle = stats["wal_frames"] == self._prev_frames
+        if idle and stats["lag_frames"] == 0 and stats["wal_bytes"] > 0:
+            if not _checkpoint("TRUNCATE", self.busy_ms)[0]:
+                stats.update(wal_bytes=0, wal_frames=0, checkpointed=0)
+                self._metrics["truncated_at"] = time.time()
+        self._prev_frames = stats["wal_frames"]
+        stats["checkpoint_age"] = round(now - self._clean_at, 1)
+        self._metrics.update(stats)
+        return stats
+
+    def metrics(self) -> dict:
+        return dict(self._metrics)
+
+    def run(self) -> None:
+        while not self._halt.wait(self.interval):
+            try:
+                self.tick()
+            except sqlite3.Error as exc:
+                log.warning("wal checkpoint failed: %s", exc)
+        close_db()
+
+    def stop(self) -> None:
+        self._halt.set()
+
+
 if __name__ == "__main__":
     import sys
 
@@ -348,6 +1869,20 @@ if __name__ == "__main__":
         )
         print(fid if fid is not None else "duplicate")
 
+    elif cmd == "ingest-findings":
+        # Usage: <json array or NDJSON> | python3 db.py ingest-findings <project_id>
+        # Prints one JSON result line per finding (inserted / duplicate / invalid).
+        if len(sys.argv) != 3:
+            print("Usage: python3 db.py ingest-findings <project_id> < findings", file=sys.stderr)
+            sys.exit(1)
+        try:
+            findings = parse_findings(sys.stdin.read())
+        except json.JSONDecodeError as exc:
+            print(f"invalid findings JSON: {exc}", file=sys.stderr)
+            sys.exit(1)
+        for result in ingest_findings(sys.argv[2], findings):
+            print(json.dumps(result))
+
     elif cmd == "get-new-findings":
         import json
 
@@ -373,10 +1908,108 @@ if __name__ == "__main__":
         update_project_phase(sys.argv[2], sys.argv[3])
         print(f"phase: {sys.argv[2]} -> {sys.argv[3]}")
 
+    elif cmd == "archive":
+        # Usage: python3 db.py archive [days] | archive --convert
+        # --convert: one-time auto_vacuum=INCREMENTAL switch (full VACUUM; setup-vps.sh).
+        if sys.argv[2:3] == ["--convert"]:
+            print(json.dumps({"freed_pages": convert_auto_vacuum()}))
+            sys.exit(0)
+        days = (
+            int(sys.argv[2])
+            if len(sys.argv) > 2
+            else int(os.environ.get("TASK_LOG_RETENTION_DAYS", "30"))
+        )
+        print(json.dumps(archive_task_log(days)))
+
+    elif cmd == "serve":
+        # Usage: python3 db.py serve [--socket PATH]
+        # NDJSON requests in, NDJSON replies out (see SERVE_COMMANDS); stdin/stdout
+        # by default (bash coproc, see db-client.sh), or a Unix socket.
+        if len(sys.argv) == 4 and sys.argv[2] == "--socket":
+            serve_socket(sys.argv[3])
+        elif len(sys.argv) == 2:
+            serve_stream(sys.stdin, sys.stdout)
+        else:
+            print("Usage: python3 db.py serve [--socket PATH]", file=sys.stderr)
+            sys.exit(1)
+
+    elif cmd == "stats":
+        # Usage: python3 db.py stats [--grain hour|day] [--since ISO | --days N]
+        #        [--by project_id,skill,provider] [--project P] [--skill S] [--provider X]
+        # Reads only the task_stats rollups; one JSON object per group. Durations
+        # exclude pueue queue wait for runs holding a slot lease (run_started_at).
+        import argparse
+        from datetime import datetime, timedelta, timezone
+
+        ap = argparse.ArgumentParser(prog="db.py stats")
+        ap.add_argument("--grain", default="day", choices=sorted(_GRAIN_LEN))
+        ap.add_argument("--since")
+        ap.add_argument("--days", type=float)
+        ap.add_argument("--by", default=",".join(_STATS_GROUPS))
+        ap.add_argument("--project", dest="project_id")
+        ap.add_argument("--skill")
+        ap.add_argument("--provider")
+        args = ap.parse_args(sys.argv[2:])
+        since = args.since
+        if args.days is not None:
+            since = (datetime.now(timezone.utc) - timedelta(days=args.days)).strftime("%Y-%m-%dT%H")
+        filters = {k: v for k in _STATS_GROUPS if (v := getattr(args, k)) is not None}
+        by = tuple(k for k in args.by.split(",") if k)
+        for row in task_stats(args.grain, since, by, **filters):
+            print(json.dumps(row))
+
+    elif cmd == "usage":
+        # Usage: python3 db.py usage [project|spec|skill|model|day] [since]
+        by = sys.argv[2] if len(sys.argv) > 2 else "project"
+        since = sys.argv[3] if len(sys.argv) > 3 else None
+        for row in usage_summary(by, since):
+            print(json.dumps(row))
+
+    elif cmd == "heartbeat":
+        # Usage: python3 db.py heartbeat <slot_number> <lease_token> [pid]
+        # Exit 0 while the lease is held, 2 once it was reclaimed, 1 on any
+        # other failure (e.g. database is locked) — run-agent.sh keeps
+        # renewing on 1 and stops only on 2.
+        if len(sys.argv) < 4:
+            print(
+                "Usage: python3 db.py heartbeat <slot_number> <lease_token> [pid]", file=sys.stderr
+            )
+            sys.exit(1)
+        pid = int(sys.argv[4]) if len(sys.argv) > 4 else None
+        try:
+            held = heartbeat(int(sys.argv[2]), sys.argv[3], pid)
+        except sqlite3.Error as exc:
+            print(f"heartbeat failed: {exc}", file=sys.stderr)
+            sys.exit(1)
+        sys.exit(0 if held else 2)
+
+    elif cmd == "jobs":
+        # Usage: python3 db.py jobs [since] | jobs retry [step]
+        if sys.argv[2:3] == ["retry"]:
+            step = sys.argv[3] if len(sys.argv) > 3 else None
+            print(json.dumps({"requeued": retry_jobs(step)}))
+        else:
+            for row in job_stats(sys.argv[2] if len(sys.argv) > 2 else None):
+                print(json.dumps(row))
+
+    elif cmd == "wal-stats":
+        # Usage: python3 db.py wal-stats
+        print(json.dumps(wal_stats()))
+
+    elif cmd == "migrate":
+        # Usage: python3 db.py migrate
+        conn = sqlite3.connect(DB_PATH, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout=5000")
+        applied = migrate(conn)
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        conn.close()
+        print(f"schema version {version} (applied: {applied or 'none'})")
+
     else:
         print(
             "Usage: python3 db.py <seed|save-finding|get-new-findings"
-            "|update-finding-status|update-phase> [args...]",
+            "|ingest-findings|update-finding-status|update-phase|serve|migrate|archive"
+            "|wal-stats|heartbeat|usage|stats|jobs> [args...]",
             file=sys.stderr,
         )
         sys.exit(1)
@@ -8,7 +8,8 @@
 #
 # Module: night-reviewer
 # Role: Nightly /audit night scan per project; dedup findings via SQLite fingerprinting.
-# Uses: db.py (update-phase, save-finding, get-new-findings), event_writer.py, claude CLI, flock
+# Uses: db-client.sh (db.py serve: get-project, update-phase, ingest-findings,
+#       get-new-findings), event_writer.py, claude CLI, jq, flock
 # Used by: orchestrator.py (via pueue night-reviewer group)
 
 set -uo pipefail
@@ -19,6 +20,8 @@ SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 # Source environment
 [[ -f "${SCRIPT_DIR}/.env" ]] && set -a && source "${SCRIPT_DIR}/.env" && set +a
 [[ -d "${SCRIPT_DIR}/venv" ]] && export PATH="${SCRIPT_DIR}/venv/bin:$PATH"
+# shellcheck source=db-client.sh
+source "${SCRIPT_DIR}/db-client.sh"
 
 PID_FILE="/tmp/night-reviewer.pid"
 
@@ -38,6 +41,10 @@ fi
 
 echo $$ > "$PID_FILE"
 
+# One long-lived db.py for every DB call below (db_call falls back to a
+# one-shot process if it dies).
+db_start
+
 # ---------------------------------------------------------------------------
 # Track which projects entered night_reviewing (for cleanup trap)
 # ---------------------------------------------------------------------------
@@ -48,9 +55,10 @@ cleanup() {
     # Reset any still-processing projects to idle
     for pid in "${REVIEWING_PROJECTS[@]:-}"; do
         set +e
-        python3 "${SCRIPT_DIR}/db.py" update-phase "$pid" idle 2>/dev/null
+        [[ -n "$pid" ]] && db_call update-phase project_id="$pid" phase=idle >/dev/null
         set -e
     done
+    db_stop
     rm -f "$PID_FILE"
 }
 
@@ -66,15 +74,6 @@ log() {
         "$(date -u '+%Y-%m-%dT%H:%M:%SZ')" "$level" "$msg"
 }
 
-# ---------------------------------------------------------------------------
-# Compute SHA256 fingerprint for a finding
-# ---------------------------------------------------------------------------
-
-fingerprint() {
-    local project_id="$1" file="$2" issue_type="$3"
-    printf '%s%s%s' "$project_id" "$file" "$issue_type" | sha256sum | cut -d' ' -f1
-}
-
 # ---------------------------------------------------------------------------
 # Process a single project
 # ---------------------------------------------------------------------------
@@ -85,13 +84,7 @@ process_project() {
     # Look up project path from DB
     local PROJECT_PATH
     set +e
-    PROJECT_PATH=$(python3 -c "
-import sys
-sys.path.insert(0, '${SCRIPT_DIR}')
-import db
-s = db.get_project_state('${PROJECT_ID}')
-print(s['path'] if s else '')
-" 2>/dev/null)
+    PROJECT_PATH=$(db_call get-project project_id="${PROJECT_ID}" | jq -r '.result.path // ""' 2>/dev/null)
     set -e
 
     if [[ -z "$PROJECT_PATH" ]]; then
@@ -104,7 +97,7 @@ print(s['path'] if s else '')
     # Mark as reviewing (track for cleanup)
     REVIEWING_PROJECTS+=("$PROJECT_ID")
     set +e
-    python3 "${SCRIPT_DIR}/db.py" update-phase "${PROJECT_ID}" night_reviewing
+    db_call update-phase project_id="${PROJECT_ID}" phase=night_reviewing >/dev/null
     set -e
 
     # Run /audit night via claude with flock for OAuth safety
@@ -126,7 +119,7 @@ print(s['path'] if s else '')
         log "error" "claude exited ${claude_exit} for ${PROJECT_ID}: ${stderr_snippet}"
         rm -f /tmp/night-reviewer-claude-stderr-$$.txt
         set +e
-        python3 "${SCRIPT_DIR}/db.py" update-phase "${PROJECT_ID}" idle
+        db_call update-phase project_id="${PROJECT_ID}" phase=idle >/dev/null
         set -e
         # Remove from cleanup list since we already reset
         REVIEWING_PROJECTS=("${REVIEWING_PROJECTS[@]/$PROJECT_ID}")
@@ -138,14 +131,14 @@ print(s['path'] if s else '')
     # The audit night output is a JSON array embedded in the result field
     local findings_json
     set +e
-    findings_json=$(printf '%s' "$claude_output" | jq -r '.result' 2>/dev/null | jq '.' 2>/dev/null)
+    findings_json=$(printf '%s' "$claude_output" | jq -r '.result' 2>/dev/null | jq -c '.' 2>/dev/null)
     local jq_exit=$?
     set -e
 
     if (( jq_exit != 0 )) || [[ -z "$findings_json" ]] || [[ "$findings_json" == "null" ]]; then
         log "error" "failed to parse findings JSON for ${PROJECT_ID}"
         set +e
-        python3 "${SCRIPT_DIR}/db.py" update-phase "${PROJECT_ID}" idle
+        db_call update-phase project_id="${PROJECT_ID}" phase=idle >/dev/null
         set -e
         REVIEWING_PROJECTS=("${REVIEWING_PROJECTS[@]/$PROJECT_ID}")
         return
@@ -155,35 +148,20 @@ print(s['path'] if s else '')
     finding_count=$(printf '%s' "$findings_json" | jq 'length' 2>/dev/null || echo "0")
     log "info" "parsed ${finding_count} findings for ${PROJECT_ID}"
 
-    # Save each finding to SQLite (INSERT OR IGNORE dedup)
-    local i=0
-    while IFS= read -r finding_line; do
-        local file issue_type description suggestion severity confidence line_range fp
-        set +e
-        file=$(printf '%s' "$finding_line" | jq -r '.file // ""')
-        issue_type=$(printf '%s' "$finding_line" | jq -r '.issue_type // ""')
-        description=$(printf '%s' "$finding_line" | jq -r '.description // ""')
-        suggestion=$(printf '%s' "$finding_line" | jq -r '.suggestion // ""')
-        severity=$(printf '%s' "$finding_line" | jq -r '.severity // "medium"')
-        confidence=$(printf '%s' "$finding_line" | jq -r '.confidence // "medium"')
-        line_range=$(printf '%s' "$finding_line" | jq -r '.line // ""')
-        set -e
-
-        fp=$(fingerprint "${PROJECT_ID}" "${file}" "${issue_type}")
-
-        set +e
-        python3 "${SCRIPT_DIR}/db.py" save-finding \
-            "${PROJECT_ID}" "${fp}" "${severity}" "${confidence}" \
-            "${file}" "${line_range}" "${description}" "${suggestion}" 2>/dev/null
-        set -e
-
-        i=$((i + 1))
-    done < <(printf '%s' "$findings_json" | jq -c '.[]' 2>/dev/null)
+    # Save all findings in one transaction (fingerprint + INSERT OR IGNORE dedup)
+    local ingest_out inserted
+    set +e
+    ingest_out=$(db_call ingest-findings project_id="${PROJECT_ID}" findings:="${findings_json}")
+    inserted=$(printf '%s' "$ingest_out" \
+        | jq '[.result[]? | select(.result == "inserted")] | length' 2>/dev/null || echo "0")
+    set -e
+    log "info" "saved ${inserted} new of ${finding_count} findings for ${PROJECT_ID}"
 
     # Fetch new (unseen) findings and notify via Telegram
     local new_findings_json
     set +e
-    new_findings_json=$(python3 "${SCRIPT_DIR}/db.py" get-new-findings "${PROJECT_ID}" 2>/dev/null)
+    new_findings_json=$(db_call get-new-findings project_id="${PROJECT_ID}" \
+        | jq -c '.result // []' 2>/dev/null)
     set -e
 
     if [[ -z "$new_findings_json" ]] || [[ "$new_findings_json" == "[]" ]]; then
@@ -220,7 +198,7 @@ Suggestion: ${nf_sugg}"
 
     # Reset phase to idle
     set +e
-    python3 "${SCRIPT_DIR}/db.py" update-phase "${PROJECT_ID}" idle
+    db_call update-phase project_id="${PROJECT_ID}" phase=idle >/dev/null
     set -e
 
     # Remove from cleanup list — already handled
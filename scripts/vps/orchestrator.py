@@ -2,7 +2,8 @@
 """
 Module: orchestrator
 Role: Main poll loop daemon — scan inbox, scan backlog, dispatch via pueue.
-Uses: db (import), subprocess (pueue CLI), signal, threading
+Uses: db (import), pueue_state (import), spec_catalog (import), scheduler (import),
+      watcher (import), subprocess (pueue CLI), signal, threading
 Used by: systemd (dld-orchestrator.service)
 
 Replaces orchestrator.sh + inbox-processor.sh (ARCH-161).
@@ -17,6 +18,8 @@ import re
 import signal
 import subprocess
 import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from datetime import datetime, timezone
 from pathlib import Path
 from threading import Event
@@ -24,10 +27,31 @@ from threading import Event
 SCRIPT_DIR = Path(__file__).resolve().parent
 sys.path.insert(0, str(SCRIPT_DIR))
 import db  # noqa: E402
+import spec_catalog  # noqa: E402
+import watcher  # noqa: E402
+from pueue_state import PueueSnapshot  # noqa: E402
+from scheduler import FairScheduler, WorkItem  # noqa: E402
 
 log = logging.getLogger("orchestrator")
 _stop = Event()
+# Set by the file watcher (and on stop) to cut the inter-cycle sleep short.
+_wake = Event()
 _projects_mtime: float = 0.0
+# project_id → {"weight": float, "max_slots": int|None} from projects.json.
+_project_policy: dict[str, dict] = {}
+# Tuned from SCHED_HALF_LIFE / SCHED_AGING in main(), after .env is loaded.
+_scheduler = FairScheduler()
+
+# project_id → future of its latest process_project run (cycle deadline overrun guard).
+_in_flight: dict[str, Future] = {}
+# project_id → dispatchable WorkItems from its latest completed scan. Wakeup
+# cycles scan only changed projects; the rest compete with these.
+_pending: dict[str, list[WorkItem]] = {}
+# project_id → {inbox path: (inode, mtime_ns, size)} of files already classified
+# as not-new. Unchanged files are skipped without being read.
+_inbox_index: dict[str, dict[str, tuple[int, int, int]]] = {}
+# project_id → {"read": n, "skipped": n} from that project's latest scan_inbox.
+inbox_scan_stats: dict[str, dict[str, int]] = {}
 
 
 def _load_env() -> None:
@@ -70,6 +94,7 @@ def _setup_logging() -> None:
 def _signal_handler(signum: int, _frame) -> None:
     log.info("signal %d received, stopping", signum)
     _stop.set()
+    _wake.set()
 
 
 def _write_pid() -> None:
@@ -78,10 +103,14 @@ def _write_pid() -> None:
     atexit.register(lambda: pid_file.unlink(missing_ok=True))
 
 
+def _projects_json_path() -> str:
+    return os.environ.get("PROJECTS_JSON", str(SCRIPT_DIR / "projects.json"))
+
+
 def sync_projects() -> None:
     """Hot-reload projects.json into SQLite when mtime changes."""
     global _projects_mtime
-    projects_json = os.environ.get("PROJECTS_JSON", str(SCRIPT_DIR / "projects.json"))
+    projects_json = _projects_json_path()
     if not os.path.isfile(projects_json):
         log.warning("projects.json not found: %s", projects_json)
         return
@@ -92,43 +121,37 @@ def sync_projects() -> None:
     with open(projects_json) as f:
         projects = json.load(f)
     db.seed_projects_from_json(projects)
+    _project_policy.clear()
+    for p in projects:
+        _project_policy[p["project_id"]] = {
+            "weight": float(p.get("weight", 1.0)),
+            "max_slots": p.get("max_slots"),
+        }
     log.info("synced %d projects from %s", len(projects), projects_json)
 
 
-_LIVE_PUEUE_STATES = frozenset({"Running", "Locked", "Queued", "Stashed", "Paused"})
+# Per-cycle pueue snapshot. Set at the top of each poll cycle by main() and
+# cleared at the end, so every lookup inside one cycle shares a single
+# `pueue status --json` call.
+_pueue: PueueSnapshot | None = None
 
 
-def get_live_pueue_ids() -> set[int] | None:
-    """Return live pueue task IDs. None on failure (skip watchdog, no false release).
+def refresh_pueue_snapshot() -> PueueSnapshot:
+    """Fetch a fresh pueue snapshot and make it current for this cycle."""
+    global _pueue
+    _pueue = PueueSnapshot.fetch()
+    return _pueue
 
-    Modern pueue versions return `status` as a dict like `{"Queued": {...}}` or
-    `{"Running": {...}}`. Older versions may return a bare string. We handle both.
-    """
-    try:
-        r = subprocess.run(
-            ["pueue", "status", "--json"],
-            capture_output=True,
-            text=True,
-            timeout=10,
-        )
-        if r.returncode != 0:
-            log.warning("pueue status exit %d: %s", r.returncode, r.stderr[:200])
-            return None
-        data = json.loads(r.stdout)
-        live: set[int] = set()
-        for tid_str, task in data.get("tasks", {}).items():
-            st = task.get("status", "")
-            state_name: str = ""
-            if isinstance(st, dict):
-                state_name = next(iter(st.keys()), "")
-            elif isinstance(st, str):
-                state_name = st
-            if state_name in _LIVE_PUEUE_STATES:
-                live.add(int(tid_str))
-        return live
-    except Exception as exc:
-        log.warning("get_live_pueue_ids failed: %s", exc)
-        return None
+
+def pueue_snapshot() -> PueueSnapshot:
+    """Return the current cycle snapshot, or a one-off fetch outside a cycle."""
+    snap = _pueue
+    return snap if snap is not None else PueueSnapshot.fetch()
+
+
+def get_live_pueue_ids() -> set[int] | None:
+    """Return live pueue task IDs. None on failure (skip watchdog, no false release)."""
+    return pueue_snapshot().live_ids()
 
 
 def pueue_has_active_label(label: str) -> bool:
@@ -139,37 +162,30 @@ def pueue_has_active_label(label: str) -> bool:
     On failure returns False (fail-open — better to risk a duplicate than
     block all dispatches).
     """
-    try:
-        r = subprocess.run(
-            ["pueue", "status", "--json"],
-            capture_output=True,
-            text=True,
-            timeout=10,
-        )
-        if r.returncode != 0:
-            return False
-        data = json.loads(r.stdout)
-        for _tid, task in data.get("tasks", {}).items():
-            if task.get("label") != label:
-                continue
-            st = task.get("status", "")
-            state_name = next(iter(st.keys()), "") if isinstance(st, dict) else st
-            if state_name in _LIVE_PUEUE_STATES:
-                return True
-        return False
-    except Exception as exc:
-        log.warning("pueue_has_active_label check failed: %s", exc)
-        return False
+    return pueue_snapshot().has_active_label(label)
 
 
 def release_orphan_slots() -> int:
-    """Release slots whose pueue tasks are gone. 0 if pueue unreachable (BUG-162)."""
+    """Release slots whose pueue tasks are gone. 0 if pueue unreachable (BUG-162).
+
+    Also reclaims reservations never bound to a pueue task (orchestrator
+    died between reserve_slot and pueue add) and slots whose runner stopped
+    renewing its heartbeat lease; neither needs pueue.
+    """
+    expired = db.expire_reservations()
+    if expired:
+        log.warning("watchdog: reclaimed %d expired slot reservation(s)", expired)
+    lapsed = db.reclaim_expired_leases()
+    if lapsed:
+        log.warning("watchdog: reclaimed %d slot(s) with lapsed heartbeat lease", lapsed)
+    # Leased slots are handled above without pueue; only queued-but-not-started
+    # and lease-less tasks still need the pueue cross-check.
+    occupied = [s for s in db.get_occupied_slots() if not s.get("lease_expires_at")]
+    if not occupied:
+        return 0
     live_ids = get_live_pueue_ids()
     if live_ids is None:
         return 0
-    occupied = db.get_occupied_slots()
-    if not occupied:
-        return 0
     released = 0
     for slot in occupied:
         pueue_id = slot["pueue_id"]
@@ -190,30 +206,37 @@ def release_orphan_slots() -> int:
 
 def is_agent_running(project_id: str) -> bool:
     """Return True if a pueue task with this project's label prefix is Running."""
+    return pueue_snapshot().is_project_running(project_id)
+
+
+# project_id → {"ms": wall time of the latest git_pull, "outcome": what it did}
+pull_stats: dict[str, dict] = {}
+
+
+def _develop_unchanged(git) -> bool:
+    """True if remote develop == our origin/develop and HEAD already contains it.
+
+    One `ls-remote` round trip instead of diff + fetch + rebase. Any error
+    returns False so the caller falls through to the full pull.
+    """
     try:
-        r = subprocess.run(
-            ["pueue", "status", "--json"],
-            capture_output=True,
-            text=True,
-            timeout=10,
+        r = git("ls-remote", "origin", "refs/heads/develop", text=True, timeout=30)
+        if r.returncode != 0 or not r.stdout.strip():
+            return False
+        remote_sha = r.stdout.split()[0]
+        local = git(
+            "rev-parse", "-q", "--verify", "refs/remotes/origin/develop", text=True, timeout=10
         )
-        data = json.loads(r.stdout)
-        for task in data.get("tasks", {}).values():
-            label = task.get("label", "")
-            status = task.get("status", "")
-            if (
-                label.startswith(f"{project_id}:")
-                and isinstance(status, dict)
-                and "Running" in status
-            ):
-                return True
-    except Exception:
-        pass
-    return False
+        if local.returncode != 0 or local.stdout.strip() != remote_sha:
+            return False
+        return git("merge-base", "--is-ancestor", remote_sha, "HEAD", timeout=10).returncode == 0
+    except (subprocess.SubprocessError, OSError) as exc:  # e.g. hung remote: TimeoutExpired
+        log.warning("ls-remote check failed, doing a full pull: %s", exc)
+        return False
 
 
 def git_pull(project_id: str, project_dir: str) -> None:
-    """Pull develop branch. Skip if agent running or not a git repo."""
+    """Pull develop branch. Skip if agent running, not a git repo, or remote unchanged."""
     if not os.path.isdir(os.path.join(project_dir, ".git")):
         return
     if is_agent_running(project_id):
@@ -223,17 +246,29 @@ def git_pull(project_id: str, project_dir: str) -> None:
     def _git(*a, **kw):
         return subprocess.run(["git", "-C", project_dir] + list(a), capture_output=True, **kw)
 
+    started = time.monotonic()
+    outcome = "failed"
     try:
+        if _develop_unchanged(_git):
+            outcome = "unchanged"
+            return
         clean = _git("diff", "--quiet", timeout=30).returncode == 0
         staged = _git("diff", "--cached", "--quiet", timeout=30).returncode == 0
         if clean and staged:
             _git("pull", "--rebase", "origin", "develop", text=True, timeout=120, check=True)
+            outcome = "pulled"
         else:
             _git("fetch", "origin", "develop", timeout=60, check=True)
             _git("rebase", "--autostash", "origin/develop", text=True, timeout=120, check=True)
+            outcome = "rebased"
     except subprocess.CalledProcessError as exc:
         _git("rebase", "--abort", timeout=30)
         log.warning("git pull failed: %s — %s", project_dir, (exc.stderr or "")[:200])
+    finally:
+        ms = int((time.monotonic() - started) * 1000)
+        pull_stats[project_id] = {"ms": ms, "outcome": outcome}
+        if outcome != "unchanged":
+            log.info("git pull %s: %s in %dms", project_id, outcome, ms)
 
 
 def _parse_inbox_file(filepath: Path) -> dict:
@@ -284,18 +319,23 @@ _ROUTE_SKILL_MAP = {
 
 
 def _pueue_add(group: str, label: str, cmd: list, env: dict | None = None) -> int | None:
-    """Submit task to pueue group. Returns pueue task ID or None."""
+    """Submit task to pueue group. Returns pueue task ID or None.
+
+    The task sees DLD_TASK_LABEL=label (claude-runner.py ties its usage
+    record to the task_log row through it) plus any extra `env`.
+    """
     pueue_cmd = ["pueue", "add", "--group", group, "--label", label, "--print-task-id", "--"] + cmd
-    run_env = {**os.environ, **env} if env else None
+    run_env = {**os.environ, **(env or {}), "DLD_TASK_LABEL": label}
     try:
         r = subprocess.run(pueue_cmd, capture_output=True, text=True, timeout=30, env=run_env)
         for ln in r.stdout.strip().splitlines():
             ln = ln.strip()
-            if ln.isdigit():
-                return int(ln)
             m = re.search(r"(\d+)", ln)
             if m:
-                return int(m.group(1))
+                task_id = int(m.group(1))
+                if _pueue is not None:
+                    _pueue.note_added(task_id, label)
+                return task_id
         log.warning("pueue add: no task ID in output: %s", r.stdout[:200])
     except Exception as exc:
         log.error("pueue add failed: %s", exc)
@@ -310,39 +350,73 @@ def scan_inbox(project_id: str, project_dir: str) -> int:
 
     _inbox_new_re = re.compile(r"\*\*Status:\*\*\s*new", re.IGNORECASE)
 
+    with os.scandir(inbox_dir) as it:
+        entries = sorted(
+            (
+                e
+                for e in it
+                if e.name.endswith(".md") and not e.name.startswith(".") and e.is_file()
+            ),
+            key=lambda e: e.name,
+        )
+    known = _inbox_index.get(project_id, {})
+    index: dict[str, tuple[int, int, int]] = {}
+    read = skipped = 0
+
     count = 0
-    for inbox_file in sorted(inbox_dir.glob("*.md")):
+    for entry in entries:
+        st = entry.stat()
+        sig = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if known.get(entry.path) == sig:
+            index[entry.path] = sig
+            skipped += 1
+            continue
+        inbox_file = Path(entry.path)
         text = inbox_file.read_text(errors="replace")
+        read += 1
         if not _inbox_new_re.search(text):
+            index[entry.path] = sig
             continue
 
-        log.info("processing inbox: %s/%s", project_id, inbox_file.name)
         meta = _parse_inbox_file(inbox_file)
         skill = _ROUTE_SKILL_MAP.get(meta["route"], "spark")
+        provider = meta["provider"]
+        if not provider:
+            state = db.get_project_state(project_id)
+            provider = (state["provider"] if state else None) or "claude"
+        # Reserve before touching the file: without a slot the item stays
+        # `Status: new` (and out of the index) and is retried next cycle.
+        slot = db.reserve_slot(project_id, provider)
+        if slot is None:
+            log.info("inbox pending (no free %s slot): %s/%s", provider, project_id, entry.name)
+            continue
 
-        text = _inbox_new_re.sub("**Status:** processing", text)
-        inbox_file.write_text(text)
+        log.info("processing inbox: %s/%s slot=%d", project_id, inbox_file.name, slot)
         done_dir = inbox_dir / "done"
         done_dir.mkdir(exist_ok=True)
         done_file = done_dir / inbox_file.name
+        # Move out of ai/inbox/ before writing: a write there would wake the
+        # watcher for a change we made ourselves.
         inbox_file.rename(done_file)
-        provider = meta["provider"]
-        if not provider:
-            state = db.get_project_state(project_id)
-            provider = (state["provider"] if state else None) or "claude"
+        done_file.write_text(_inbox_new_re.sub("**Status:** processing", text))
         headless = f"[headless] Source: {meta['source']}."
         if meta["context"]:
             headless += f" Context: {meta['context']}."
         headless += f" {meta['idea_text']}"
         task_cmd = f"/{skill} {headless}"
         ts = datetime.now(tz=timezone.utc).strftime("%Y%m%d-%H%M%S")
-        task_file = SCRIPT_DIR / f".task-cmd-{ts}.txt"
+        task_file = SCRIPT_DIR / f".task-cmd-{project_id}-{ts}.txt"
         task_file.write_text(task_cmd)
         task_label = f"{project_id}:inbox-{ts}"
         if pueue_has_active_label(task_label):
             log.info("skip inbox dispatch: %s already in pueue", task_label)
+            db.cancel_reservation(slot, project_id)
             continue
-        pueue_env = {"CLAUDE_PROJECT_DIR": project_dir, "CLAUDE_CURRENT_SPEC_PATH": str(done_file)}
+        pueue_env = {
+            "CLAUDE_PROJECT_DIR": project_dir,
+            "CLAUDE_CURRENT_SPEC_PATH": str(done_file),
+            **db.lease_env(slot),
+        }
         pueue_id = _pueue_add(
             f"{provider}-runner",
             task_label,
@@ -350,77 +424,154 @@ def scan_inbox(project_id: str, project_dir: str) -> int:
             env=pueue_env,
         )
         if pueue_id is not None:
-            db.try_acquire_slot(project_id, provider, pueue_id)
-            db.log_task(project_id, task_label, skill, "queued", pueue_id)
-            db.update_project_phase(project_id, "processing_inbox", task_label)
+            db.dispatch_task(
+                project_id,
+                provider,
+                pueue_id,
+                task_label,
+                skill,
+                "queued",
+                phase="processing_inbox",
+                current_task=task_label,
+                reserved_slot=slot,
+            )
             log.info("inbox dispatched: %s label=%s pueue_id=%d", project_id, task_label, pueue_id)
         else:
+            db.cancel_reservation(slot, project_id)
             log.error("inbox dispatch failed: %s/%s", project_id, inbox_file.name)
         count += 1
+
+    # Rebuilt every scan, so deleted/moved files drop out of the index.
+    _inbox_index[project_id] = index
+    inbox_scan_stats[project_id] = {"read": read, "skipped": skipped}
+    if read:
+        log.info("inbox scan %s: read=%d skipped=%d", project_id, read, skipped)
     return count
 
 
-def scan_backlog(project_id: str, project_dir: str) -> bool:
-    """Find first queued spec and dispatch autopilot. Returns True if dispatched."""
-    backlog = Path(project_dir) / "ai" / "backlog.md"
-    if not backlog.is_file():
-        return False
+def _dispatch_cap(project_id: str) -> int:
+    """Max autopilot slots a project may hold at once in fill mode."""
+    policy = _project_policy.get(project_id) or {}
+    return int(policy.get("max_slots") or os.environ.get("MAX_SLOTS_PER_PROJECT", "2"))
 
-    spec_id = None
-    for line in backlog.read_text().splitlines():
-        if re.search(r"\|\s*(queued|resumed)\s*\|", line, re.IGNORECASE):
-            # NB: trailing `[a-z]*` captures sub-spec suffixes (ARCH-176a/b/c/d).
-            # Without it `\d+` stops at the letter and the parent spec id is
-            # extracted, causing infinite-loop dispatch of the parent (v3.15.8).
-            m = re.search(r"(TECH|FTR|BUG|ARCH)-\d+[a-z]*", line)
-            if m:
-                spec_id = m.group(0)
-                break
-    if not spec_id:
-        return False
 
-    state = db.get_project_state(project_id)
-    provider = (state["provider"] if state else None) or "claude"
+def collect_backlog(project_id: str, project_dir: str) -> list[WorkItem]:
+    """Return the project's dispatchable backlog specs as WorkItems, in backlog order.
 
-    features_dir = Path(project_dir) / "ai" / "features"
-    spec_files = list(features_dir.glob(f"{spec_id}*"))
-    if spec_files:
-        m = re.search(
-            r"^provider:\s+(\w+)", spec_files[0].read_text(errors="replace"), re.MULTILINE
-        )
-        if m and db.get_available_slots(m.group(1)) >= 0:
-            provider = m.group(1)
+    DISPATCH_MODE=single (default) yields at most the first queued spec, one
+    dispatch per project per cycle. DISPATCH_MODE=fill yields every queued
+    spec not already in pueue, up to the project's free concurrency cap, so
+    idle slots fill in one cycle instead of one per poll.
 
-    if db.get_available_slots(provider) < 1:
-        log.info("no slots for %s provider=%s", project_id, provider)
-        return False
+    Backlog rows and spec files come from the cached spec_catalog, so an
+    unchanged backlog costs two stat() calls instead of a full parse.
+    """
+    catalog = spec_catalog.catalog_for(project_dir)
+    if os.environ.get("DISPATCH_MODE", "single") == "fill":
+        rows = catalog.dispatchable()
+        limit = _dispatch_cap(project_id) - db.get_slots_by_project().get(project_id, 0)
+    else:
+        row = catalog.next_dispatchable()
+        rows, limit = ([row] if row else []), 1
+    if not rows or limit < 1:
+        return []
+
+    state = db.get_project_state(project_id)
+    default_provider = (state["provider"] if state else None) or "claude"
+    items: list[WorkItem] = []
+    seen: set[str] = set()
+    for row in rows:
+        if row.spec_id in seen:
+            continue
+        seen.add(row.spec_id)
+        provider = catalog.spec_provider(row.spec_id) or default_provider
+        item = WorkItem(project_id, project_dir, row.spec_id, provider)
+        if pueue_has_active_label(item.label):
+            log.info("skip dispatch: %s already in pueue", item.label)
+            continue
+        items.append(item)
+        if len(items) >= limit:
+            break
+    return items
 
-    task_label = f"{project_id}:{spec_id}"
+
+def dispatch_spec(item: WorkItem) -> bool:
+    """Submit autopilot for one WorkItem. Returns True if dispatched."""
+    project_id, spec_id, provider = item.project_id, item.spec_id, item.provider
+    task_label = item.label
     if pueue_has_active_label(task_label):
         log.info("skip dispatch: %s already in pueue", task_label)
         return False
+    slot = db.reserve_slot(project_id, provider)
+    if slot is None:
+        log.info("no slots for %s provider=%s", project_id, provider)
+        return False
     pueue_id = _pueue_add(
         f"{provider}-runner",
         task_label,
         [
             str(SCRIPT_DIR / "run-agent.sh"),
-            project_dir,
+            item.project_dir,
             provider,
             "autopilot",
             f"/autopilot {spec_id}",
         ],
+        env=db.lease_env(slot),
     )
     if pueue_id is None:
+        db.cancel_reservation(slot, project_id)
         log.error("pueue submission failed: %s/%s", project_id, spec_id)
         return False
+    db.dispatch_task(
+        project_id,
+        provider,
+        pueue_id,
+        task_label,
+        "autopilot",
+        "running",
+        phase="autopilot",
+        current_task=spec_id,
+        reserved_slot=slot,
+    )
 
-    db.try_acquire_slot(project_id, provider, pueue_id)
-    db.log_task(project_id, task_label, "autopilot", "running", pueue_id)
-    db.update_project_phase(project_id, "autopilot", spec_id)
     log.info("autopilot submitted: %s spec=%s pueue_id=%d", project_id, spec_id, pueue_id)
     return True
 
 
+def scan_backlog(project_id: str, project_dir: str) -> bool:
+    """Find first queued spec and dispatch autopilot, bypassing the scheduler."""
+    items = collect_backlog(project_id, project_dir)
+    return dispatch_spec(items[0]) if items else False
+
+
+def dispatch_scheduled(items: list[WorkItem]) -> int:
+    """Allocate free slots across projects with the fair scheduler, then dispatch.
+
+    Returns the number of specs dispatched.
+    """
+    if not items:
+        return 0
+    quotas = {pid: int(p["max_slots"]) for pid, p in _project_policy.items() if p["max_slots"]}
+    if os.environ.get("DISPATCH_MODE", "single") == "fill":
+        quotas.update({i.project_id: _dispatch_cap(i.project_id) for i in items})
+    _scheduler.configure({pid: p["weight"] for pid, p in _project_policy.items()}, quotas)
+    grants = _scheduler.allocate(items, db.get_free_slots_by_provider(), db.get_slots_by_project())
+    if len(grants) < len(items):
+        deferred = sorted({i.project_id for i in items} - {g.project_id for g in grants})
+        if deferred:
+            log.info("scheduler: no slot this cycle for %s", ",".join(deferred))
+    dispatched = 0
+    for item in grants:
+        if _stop.is_set():
+            break
+        if dispatch_spec(item):
+            _scheduler.charge(item.project_id)
+            if item in _pending.get(item.project_id, ()):
+                _pending[item.project_id].remove(item)
+            dispatched += 1
+    return dispatched
+
+
 def dispatch_night_review() -> None:
     """Check .review-trigger and dispatch night reviewer if present."""
     trigger = SCRIPT_DIR / ".review-trigger"
@@ -438,19 +589,120 @@ def dispatch_night_review() -> None:
     )
 
 
-def process_project(project_id: str, project_dir: str) -> None:
-    """Process one project: git pull, inbox, backlog, invariant check."""
+# monotonic time of the last task_log archive run (0 = not yet this process)
+_last_archive: float = 0.0
+ARCHIVE_EVERY = 24 * 3600
+
+
+def maybe_archive_task_log() -> None:
+    """Once a day, move finished task_log rows past retention into monthly archives.
+
+    TASK_LOG_RETENTION_DAYS (default 30) sets the age; 0 disables archival.
+    """
+    global _last_archive
+    days = int(os.environ.get("TASK_LOG_RETENTION_DAYS", "30"))
+    if days <= 0 or (_last_archive and time.monotonic() - _last_archive < ARCHIVE_EVERY):
+        return
+    _last_archive = time.monotonic()
+    try:
+        db.archive_task_log(days)
+    except Exception:
+        log.exception("task_log archive failed")
+
+
+def process_project(project_id: str, project_dir: str) -> list[WorkItem]:
+    """Process one project: git pull, inbox, backlog scan, invariant check.
+
+    Backlog work is returned rather than dispatched so that the scheduler
+    can share contended slots fairly across projects.
+    """
     git_pull(project_id, project_dir)
     scan_inbox(project_id, project_dir)
-    scan_backlog(project_id, project_dir)
+    items = collect_backlog(project_id, project_dir)
     state = db.get_project_state(project_id)
     if state and state.get("phase") == "qa_pending" and not state.get("current_task"):
         log.warning("qa_pending invariant: resetting %s to idle", project_id)
         db.update_project_phase(project_id, "idle", None)
+    return items
+
+
+def _process_project_isolated(project_id: str, project_dir: str) -> list[WorkItem]:
+    """Worker body: one project's failure must not affect the others."""
+    if _stop.is_set():
+        return []
+    try:
+        return process_project(project_id, project_dir) or []
+    except Exception:
+        log.exception("project error: %s", project_id)
+        return []
+
+
+def process_all_projects(
+    pool: ThreadPoolExecutor,
+    projects: list[dict],
+    deadline: float,
+    work: list[WorkItem] | None = None,
+) -> int:
+    """Fan process_project out over the worker pool and wait up to `deadline` seconds.
+
+    Projects still running when the deadline passes keep running in the
+    background; the next cycle skips them instead of stacking a second run.
+    WorkItems from projects that finished in time replace their entry in
+    _pending (see pending_work) and are appended to `work`.
+    Returns the number of projects still in flight at the deadline.
+    """
+    futures = []
+    for proj in projects:
+        if _stop.is_set():
+            break
+        pid, pdir = proj["project_id"], proj["path"]
+        trigger = SCRIPT_DIR / f".run-now-{pid}"
+        if trigger.is_file():
+            trigger.unlink(missing_ok=True)
+            log.info("run-now trigger: %s", pid)
+        prev = _in_flight.get(pid)
+        if prev is not None and not prev.done():
+            log.warning("skip %s — previous cycle still in flight", pid)
+            continue
+        fut = pool.submit(_process_project_isolated, pid, pdir)
+        _in_flight[pid] = fut
+        futures.append(fut)
+    if not futures:
+        return 0
+    done, pending = wait(futures, timeout=deadline)
+    for pid, fut in _in_flight.items():
+        if fut in done:
+            _pending[pid] = fut.result()
+    if work is not None:
+        # Keep submission (project) order so per-project priority is preserved.
+        work.extend(item for fut in futures if fut in done for item in fut.result())
+    if pending:
+        log.warning("cycle deadline %ds hit: %d project(s) still running", deadline, len(pending))
+    return len(pending)
+
+
+def pending_work(projects: list[dict]) -> list[WorkItem]:
+    """Every project's dispatchable items from its latest scan, in project order.
+
+    On a wakeup cycle the projects that were not rescanned still compete
+    for slots, so the fair scheduler always weighs all of them.
+    """
+    live = {p["project_id"] for p in projects}
+    for pid in set(_pending) - live:
+        del _pending[pid]
+    return [item for p in projects for item in _pending.get(p["project_id"], [])]
+
+
+def select_projects(projects: list[dict], changed: set[str], full: bool) -> list[dict]:
+    """Projects to process this cycle: all on a full cycle, else only those that changed."""
+    if full:
+        return projects
+    return [p for p in projects if p["project_id"] in changed]
 
 
 def main() -> None:
-    """Main entry point — poll loop."""
+    """Main entry point — poll loop with file-change wakeups."""
+    global _pueue
     _load_env()
     _setup_logging()
     _write_pid()
@@ -458,27 +710,68 @@ def main() -> None:
     signal.signal(signal.SIGINT, _signal_handler)
 
     poll_interval = int(os.environ.get("POLL_INTERVAL", "300"))
-    log.info("orchestrator starting pid=%d poll=%ds", os.getpid(), poll_interval)
-
+    max_parallel = int(os.environ.get("MAX_PARALLEL_PROJECTS", "4"))
+    cycle_deadline = int(os.environ.get("CYCLE_DEADLINE", str(max(poll_interval - 30, 60))))
+    debounce = float(os.environ.get("WATCH_DEBOUNCE", "1"))
+    _scheduler.half_life = float(os.environ.get("SCHED_HALF_LIFE", "3600"))
+    _scheduler.aging = float(os.environ.get("SCHED_AGING", "1.0"))
+    changes = watcher.ChangeWatcher(
+        _wake,
+        mode=os.environ.get("WATCH_MODE", "auto"),
+        poll_interval=float(os.environ.get("WATCH_POLL_INTERVAL", "5")),
+    )
+    log.info(
+        "orchestrator starting pid=%d poll=%ds parallel=%d deadline=%ds watch=%s",
+        os.getpid(),
+        poll_interval,
+        max_parallel,
+        cycle_deadline,
+        changes.backend,
+    )
+    pool = ThreadPoolExecutor(max_workers=max(1, max_parallel), thread_name_prefix="project")
+    changes.start()
+    checkpoint_every = float(os.environ.get("DB_CHECKPOINT_INTERVAL", "30"))
+    checkpointer = db.WalCheckpointer(checkpoint_every) if checkpoint_every > 0 else None
+    if checkpointer:
+        checkpointer.start()
+
+    next_full = 0.0
     while not _stop.is_set():
+        changed = changes.drain()
+        full = time.monotonic() >= next_full or watcher.GLOBAL in changed
         try:
-            release_orphan_slots()  # BUG-162: clean stale slots before dispatch
+            refresh_pueue_snapshot()
+            if full:
+                release_orphan_slots()  # BUG-162: clean stale slots before dispatch
             sync_projects()
             dispatch_night_review()
-            for proj in db.get_all_projects():
-                if _stop.is_set():
-                    break
-                pid, pdir = proj["project_id"], proj["path"]
-                trigger = SCRIPT_DIR / f".run-now-{pid}"
-                if trigger.is_file():
-                    trigger.unlink(missing_ok=True)
-                    log.info("run-now trigger: %s", pid)
-                process_project(pid, pdir)
+            projects = db.get_all_projects()
+            changes.watch(watcher.build_targets(projects, SCRIPT_DIR, Path(_projects_json_path())))
+            selected = select_projects(projects, changed, full)
+            if not full:
+                log.info("wakeup: %s", ",".join(sorted(p["project_id"] for p in selected)))
+            process_all_projects(pool, selected, cycle_deadline)
+            dispatch_scheduled(pending_work(projects))
+            if full:
+                maybe_archive_task_log()
+                if checkpointer:
+                    log.info("wal: %s", checkpointer.metrics())
         except Exception:
             log.exception("cycle error")
-        log.info("cycle complete, sleeping %ds", poll_interval)
-        _stop.wait(poll_interval)
-
+        finally:
+            _pueue = None
+        if full:
+            next_full = time.monotonic() + poll_interval
+            log.info("cycle complete, sleeping %ds", poll_interval)
+        _wake.wait(max(0.0, next_full - time.monotonic()))
+        _wake.clear()
+        if not _stop.is_set() and time.monotonic() < next_full:
+            _stop.wait(debounce)  # coalesce a burst of writes into one wakeup
+
+    changes.stop()
+    if checkpointer:
+        checkpointer.stop()
+    pool.shutdown(wait=False, cancel_futures=True)
     log.info("orchestrator stopped")
 
 
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Module: pueue_state
+Role: Point-in-time `pueue status --json` snapshot, indexed for O(1) lookups.
+Uses: subprocess (pueue CLI), json
+Used by: orchestrator.py (one snapshot per poll cycle),
+         callback.py (PueueView: one lazy snapshot per callback run)
+
+One `pueue status --json` call parses the full task history (multi-MB on a
+busy VPS). The snapshot does that once and answers every "is this label /
+task / project live?" question from in-memory indexes.
+"""
+
+import json
+import logging
+import subprocess
+from threading import Lock
+
+log = logging.getLogger("pueue_state")
+
+LIVE_STATES = frozenset({"Running", "Locked", "Queued", "Stashed", "Paused"})
+
+
+def state_name(status) -> str:
+    """Normalize a pueue task status to its state name.
+
+    Modern pueue versions return `status` as a dict like `{"Queued": {...}}` or
+    `{"Running": {...}}`. Older versions may return a bare string. We handle both.
+    """
+    if isinstance(status, dict):
+        return next(iter(status.keys()), "")
+    if isinstance(status, str):
+        return status
+    return ""
+
+
+class PueueSnapshot:
+    """Indexed view of pueue tasks at one point in time.
+
+    `ok` is False when pueue could not be queried — callers decide whether
+    that means fail-open (dedup guards) or skip (orphan watchdog).
+    """
+
+    def __init__(self, tasks: dict | None):
+        self.ok = tasks is not None
+        self._lock = Lock()
+        self._tasks: dict[int, dict] = {}
+        self._live_ids: set[int] = set()
+        self._live_labels: set[str] = set()
+        self._running_prefixes: set[str] = set()
+        for tid_str, task in (tasks or {}).items():
+            try:
+                tid = int(tid_str)
+            except (TypeError, ValueError):
+                continue
+            self._index(tid, task)
+
+    def _index(self, tid: int, task: dict) -> None:
+        self._tasks[tid] = task
+        state = state_name(task.get("status", ""))
+        if state not in LIVE_STATES:
+            return
+        self._live_ids.add(tid)
+        label = task.get("label") or ""
+        if label:
+            self._live_labels.add(label)
+        if state == "Running" and ":" in label:
+            self._running_prefixes.add(label.partition(":")[0])
+
+    @classmethod
+    def fetch(cls, timeout: int = 10) -> "PueueSnapshot":
+        """Run `pueue status --json` once. Returns a snapshot with ok=False on failure."""
+        try:
+            r = subprocess.run(
+                ["pueue", "status", "--json"],
+                capture_output=True,
+                text=True,
+                timeout=timeout,
+            )
+            if r.returncode != 0:
+                log.warning("pueue status exit %d: %s", r.returncode, (r.stderr or "")[:200])
+                return cls(None)
+            return cls(json.loads(r.stdout).get("tasks", {}))
+        except Exception as exc:
+            log.warning("pueue status failed: %s", exc)
+            return cls(None)
+
+    def task(self, task_id: int) -> dict | None:
+        """Raw pueue task record by id, or None."""
+        return self._tasks.get(int(task_id))
+
+    def live_ids(self) -> set[int] | None:
+        """IDs of tasks in a live state. None if pueue was unreachable."""
+        if not self.ok:
+            return None
+        with self._lock:
+            return set(self._live_ids)
+
+    def has_active_label(self, label: str) -> bool:
+        """True if a live task carries exactly this label."""
+        return label in self._live_labels
+
+    def is_project_running(self, project_id: str) -> bool:
+        """True if a task labelled `<project_id>:...` is Running."""
+        return project_id in self._running_prefixes
+
+    def note_added(self, task_id: int, label: str) -> None:
+        """Record a task we just submitted with `pueue add` (starts Queued).
+
+        Keeps the snapshot current for the rest of the cycle without
+        re-running `pueue status`.
+        """
+        with self._lock:
+            self._index(int(task_id), {"label": label, "status": {"Queued": {}}})
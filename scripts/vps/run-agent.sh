@@ -54,16 +54,51 @@ case "$PROVIDER" in
         # Agent SDK only. No CLI fallback.
         VENV_PY="${SCRIPT_DIR}/venv/bin/python3"
         [[ -x "$VENV_PY" ]] || { echo '{"error":"venv python not found"}' >&2; exit 1; }
-        exec "$VENV_PY" "${SCRIPT_DIR}/claude-runner.py" "$PROJECT_DIR" "$TASK" "$SKILL"
+        RUNNER=("$VENV_PY" "${SCRIPT_DIR}/claude-runner.py" "$PROJECT_DIR" "$TASK" "$SKILL")
         ;;
     codex)
-        exec "${SCRIPT_DIR}/codex-runner.sh" "$PROJECT_DIR" "$TASK" "$SKILL"
+        RUNNER=("${SCRIPT_DIR}/codex-runner.sh" "$PROJECT_DIR" "$TASK" "$SKILL")
         ;;
     gemini)
-        exec "${SCRIPT_DIR}/gemini-runner.sh" "$PROJECT_DIR" "$TASK" "$SKILL"
+        RUNNER=("${SCRIPT_DIR}/gemini-runner.sh" "$PROJECT_DIR" "$TASK" "$SKILL")
         ;;
     *)
         jq -n --arg provider "$PROVIDER" '{"error":"unknown_provider","provider":$provider}' >&2
         exit 1
         ;;
 esac
+
+# No slot lease (submitted without a free slot): nothing to renew.
+[[ -z "${DLD_SLOT_NUMBER:-}" || -z "${DLD_LEASE_TOKEN:-}" ]] && exec "${RUNNER[@]}"
+
+# Slot lease: renew it while the runner lives. If this process dies, the
+# heartbeats stop and db.reclaim_expired_leases frees the slot within
+# SLOT_LEASE_TTL seconds — no pueue status needed.
+heartbeat() {
+    python3 "${SCRIPT_DIR}/db.py" heartbeat "$DLD_SLOT_NUMBER" "$DLD_LEASE_TOKEN" "$$" 2>/dev/null
+}
+# db.py heartbeat: 0 renewed, 2 lease gone (reclaimed), 1 transient error
+# (e.g. database is locked) — keep renewing on 1, the lease outlives a few misses.
+hb=0
+heartbeat || hb=$?
+if (( hb == 2 )); then echo '{"warning":"slot lease not held"}' >&2; fi
+(
+    while sleep "${SLOT_HEARTBEAT_INTERVAL:-30}"; do
+        kill -0 "$$" 2>/dev/null || break  # parent SIGKILLed: let the lease lapse
+        hb=0
+        heartbeat || hb=$?
+        if (( hb == 2 )); then
+            echo '{"warning":"slot lease lost"}' >&2
+            break
+        fi
+        (( hb == 0 )) || echo '{"warning":"slot heartbeat failed, retrying"}' >&2
+    done
+) &
+HEARTBEAT_PID=$!
+trap 'kill "$HEARTBEAT_PID" 2>/dev/null || true' EXIT
+trap 'exit 143' TERM
+trap 'exit 130' INT
+
+rc=0
+"${RUNNER[@]}" || rc=$?
+exit "$rc"
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Module: scheduler
+Role: Weighted fair allocation of free compute slots across projects.
+Uses: time, collections (stdlib)
+Used by: orchestrator.py (between backlog scan and dispatch)
+
+Every cycle the orchestrator collects dispatchable WorkItems from all
+projects, then asks FairScheduler which of them get the free slots.
+Each grant goes to the eligible project with the lowest normalized share:
+
+    (decayed recent usage + slots held now + 1) / weight
+
+Recent usage decays exponentially (`half_life` seconds), so a burst from one
+project fades instead of penalizing it forever. Projects that had work but
+got nothing age: every such cycle divides their share by (1 + aging * n),
+so even a tiny weight is eventually served (starvation-free). A project
+left out of a call keeps its count until it is served. Quotas cap how
+many slots a project may hold at once.
+"""
+
+import time
+from collections import deque
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class WorkItem:
+    """One dispatchable unit of work (autopilot for a backlog spec)."""
+
+    project_id: str
+    project_dir: str
+    spec_id: str
+    provider: str
+
+    @property
+    def label(self) -> str:
+        return f"{self.project_id}:{self.spec_id}"
+
+
+class FairScheduler:
+    """Stateful weighted fair queuing across projects (lives for the process)."""
+
+    def __init__(self, half_life: float = 3600.0, aging: float = 1.0):
+        self.half_life = half_life
+        self.aging = aging
+        self.weights: dict[str, float] = {}
+        self.quotas: dict[str, int] = {}
+        self._usage: dict[str, tuple[float, float]] = {}  # project → (score, as_of)
+        self._waiting: dict[str, int] = {}  # project → cycles with work but no grant
+
+    def configure(self, weights: dict[str, float], quotas: dict[str, int]) -> None:
+        """Set per-project weights (default 1.0) and max concurrent slots (default none)."""
+        self.weights = dict(weights)
+        self.quotas = dict(quotas)
+
+    def usage(self, project_id: str, now: float | None = None) -> float:
+        """Decayed slot usage for a project as of `now`."""
+        now = time.time() if now is None else now
+        score, as_of = self._usage.get(project_id, (0.0, now))
+        if self.half_life <= 0:
+            return score
+        return score * 0.5 ** (max(0.0, now - as_of) / self.half_life)
+
+    def charge(self, project_id: str, amount: float = 1.0, now: float | None = None) -> None:
+        """Record that a project was granted (and used) a slot."""
+        now = time.time() if now is None else now
+        self._usage[project_id] = (self.usage(project_id, now) + amount, now)
+
+    def _share(self, project_id: str, held: int, now: float) -> float:
+        weight = max(self.weights.get(project_id, 1.0), 1e-6)
+        boost = 1.0 + self.aging * self._waiting.get(project_id, 0)
+        return (self.usage(project_id, now) + held + 1) / weight / boost
+
+    def allocate(
+        self,
+        items: list[WorkItem],
+        free: dict[str, int],
+        running: dict[str, int],
+        now: float | None = None,
+    ) -> list[WorkItem]:
+        """Pick which items get the `free` slots (per provider), in grant order.
+
+        items: candidates in per-project priority order (backlog order).
+        free: provider → free slot count.
+        running: project_id → slots currently held (counts toward share and quota).
+        Projects with no items here keep their aging count.
+        """
+        now = time.time() if now is None else now
+        queues: dict[str, deque] = {}
+        for item in items:
+            queues.setdefault(item.project_id, deque()).append(item)
+        free = dict(free)
+        held = dict(running)
+        grants: list[WorkItem] = []
+
+        while True:
+            best: tuple | None = None
+            for pid, queue in queues.items():
+                quota = self.quotas.get(pid)
+                if quota is not None and held.get(pid, 0) >= quota:
+                    continue
+                item = next((i for i in queue if free.get(i.provider, 0) > 0), None)
+                if item is None:
+                    continue
+                # Lower share wins; ties go to the longer-waiting project.
+                key = (self._share(pid, held.get(pid, 0), now), -self._waiting.get(pid, 0), pid)
+                if best is None or key < best[0]:
+                    best = (key, pid, item)
+            if best is None:
+                break
+            _key, pid, item = best
+            queues[pid].remove(item)
+            free[item.provider] -= 1
+            held[pid] = held.get(pid, 0) + 1
+            grants.append(item)
+
+        # Age only projects that were denied for lack of share, not by their own quota.
+        granted = {g.project_id for g in grants}
+        for pid in queues:
+            quota = self.quotas.get(pid)
+            capped = quota is not None and held.get(pid, 0) >= quota
+            if pid in granted or capped:
+                self._waiting.pop(pid, None)
+            else:
+                self._waiting[pid] = self._waiting.get(pid, 0) + 1
+        return grants
@@ -89,7 +89,10 @@ if [[ "${1:-}" == "--phase3" ]]; then
     DB_PATH="${DB_PATH:-${SCRIPT_DIR}/orchestrator.db}"
     if [[ -f "${SCRIPT_DIR}/schema.sql" ]]; then
         sqlite3 "$DB_PATH" < "${SCRIPT_DIR}/schema.sql"
-        ok "Schema updated (gemini slot seeded)"
+        DB_PATH="$DB_PATH" python3 "${SCRIPT_DIR}/db.py" migrate
+        # One-time auto_vacuum=INCREMENTAL switch (full VACUUM); no-op once converted.
+        DB_PATH="$DB_PATH" python3 "${SCRIPT_DIR}/db.py" archive --convert >/dev/null
+        ok "Schema updated (gemini slot seeded, migrations applied)"
     fi
 
     echo ""
@@ -223,7 +226,8 @@ ok "Pueue groups configured (claude-runner=2, codex-runner=1, night-reviewer=1)"
 PUEUE_CONFIG_DIR="${HOME}/.config/pueue"
 mkdir -p "$PUEUE_CONFIG_DIR"
 PUEUE_CONFIG="${PUEUE_CONFIG_DIR}/pueue.yml"
-CALLBACK_LINE="${SCRIPT_DIR}/venv/bin/python3 ${SCRIPT_DIR}/callback.py {{ id }} '{{ group }}' '{{ result }}'"
+# Thin client: hands the task to dld-callback.service (falls back to in-process callback.py)
+CALLBACK_LINE="${SCRIPT_DIR}/venv/bin/python3 ${SCRIPT_DIR}/callback_client.py {{ id }} '{{ group }}' '{{ result }}'"
 
 if [[ -f "$PUEUE_CONFIG" ]]; then
     # Patch existing file — update callback line if present, otherwise append to daemon section
@@ -266,6 +270,9 @@ echo "--- SQLite setup ---"
 DB_PATH="${DB_PATH:-${SCRIPT_DIR}/orchestrator.db}"
 if [[ -f "${SCRIPT_DIR}/schema.sql" ]]; then
     sqlite3 "$DB_PATH" < "${SCRIPT_DIR}/schema.sql"
+    DB_PATH="$DB_PATH" python3 "${SCRIPT_DIR}/db.py" migrate
+    # One-time auto_vacuum=INCREMENTAL switch (full VACUUM); no-op once converted.
+    DB_PATH="$DB_PATH" python3 "${SCRIPT_DIR}/db.py" archive --convert >/dev/null
     ok "SQLite database initialized: ${DB_PATH}"
 else
     warn "schema.sql not found at ${SCRIPT_DIR}/schema.sql — database not initialized"
@@ -384,6 +391,28 @@ SyslogIdentifier=dld-orchestrator
 WantedBy=default.target
 EOF
 
+cat > "${SYSTEMD_DIR}/dld-callback.service" << EOF
+[Unit]
+Description=DLD Pueue Callback Daemon
+After=network.target
+
+[Service]
+Type=simple
+ExecStart=${SCRIPT_DIR}/venv/bin/python3 ${SCRIPT_DIR}/callback.py serve
+WorkingDirectory=${SCRIPT_DIR}
+EnvironmentFile=${SCRIPT_DIR}/.env
+KillMode=mixed
+TimeoutStopSec=120s
+Restart=always
+RestartSec=1s
+StandardOutput=journal
+StandardError=journal
+SyslogIdentifier=dld-callback
+
+[Install]
+WantedBy=default.target
+EOF
+
 systemctl --user daemon-reload 2>/dev/null \
     && ok "systemd units installed and daemon reloaded" \
     || warn "systemctl daemon-reload failed — units written but not loaded (no systemd?)"
@@ -396,8 +425,9 @@ echo "  1. Fill in .env:       ${SCRIPT_DIR}/.env"
 echo "  2. Fill in projects:   ${SCRIPT_DIR}/projects.json"
 echo ""
 echo "Enable services:"
-echo "  systemctl --user enable --now dld-orchestrator"
+echo "  systemctl --user enable --now dld-orchestrator dld-callback"
 echo ""
 echo "Check status:"
 echo "  systemctl --user status dld-orchestrator"
 echo "  journalctl --user -u dld-orchestrator -f"
+echo "  journalctl --user -u dld-callback -f"
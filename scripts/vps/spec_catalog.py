@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Module: spec_catalog
+Role: Parsed, mtime-invalidated view of ai/backlog.md and ai/features/ per project.
+Uses: re, pathlib (stdlib)
+Used by: orchestrator.py (scan_backlog), callback.py (verify_status_sync, resolve_spec_id)
+
+The backlog table is parsed once into BacklogRow records and re-parsed only
+when backlog.md's (mtime, size) changes. Spec files are indexed by exact
+spec id (ARCH-176 and ARCH-176a are different keys), re-listed only when
+the features directory changes. `provider:` overrides are cached per file.
+"""
+
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+
+# `[a-z]*` captures sub-spec suffixes (ARCH-176a/b/c/d). Without it `\d+`
+# stops at the letter and the parent spec id is extracted, causing
+# infinite-loop dispatch of the parent (v3.15.8).
+SPEC_ID_RE = re.compile(r"(TECH|FTR|BUG|ARCH)-\d+[a-z]*")
+
+_DISPATCHABLE_RE = re.compile(r"\|\s*(queued|resumed)\s*\|", re.IGNORECASE)
+_PROVIDER_RE = re.compile(r"^provider:\s+(\w+)", re.MULTILINE)
+_STATUSES = frozenset({"draft", "queued", "in_progress", "blocked", "resumed", "done", "split"})
+
+
+@dataclass(frozen=True)
+class BacklogRow:
+    """One backlog table line that mentions a spec id."""
+
+    spec_id: str
+    status: str  # first cell that is a known status, lowercased ("" if none)
+    line_no: int
+    line: str
+    dispatchable: bool  # line has a `| queued |` / `| resumed |` cell
+
+
+def _sig(path: Path) -> tuple[int, int] | None:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class SpecCatalog:
+    """Backlog rows + spec file index for one project directory."""
+
+    def __init__(self, project_dir: str):
+        self.project_dir = Path(project_dir)
+        self.backlog_path = self.project_dir / "ai" / "backlog.md"
+        self.features_dir = self.project_dir / "ai" / "features"
+        self._lock = Lock()
+        self._backlog_sig: tuple | None = None
+        self._rows: list[BacklogRow] = []
+        self._by_id: dict[str, list[BacklogRow]] = {}
+        self._dispatchable: list[BacklogRow] = []
+        self._features_sig: tuple | None = None
+        self._spec_files: dict[str, Path] = {}
+        self._providers: dict[Path, tuple[tuple | None, str | None]] = {}
+
+    # --- backlog ------------------------------------------------------------
+
+    def _refresh_backlog(self) -> None:
+        sig = _sig(self.backlog_path)
+        if sig == self._backlog_sig:
+            return
+        rows: list[BacklogRow] = []
+        by_id: dict[str, list[BacklogRow]] = {}
+        text = self.backlog_path.read_text(errors="replace") if sig else ""
+        for n, line in enumerate(text.splitlines(), 1):
+            m = SPEC_ID_RE.search(line)
+            if not m:
+                continue
+            cells = [c.strip() for c in line.split("|")[1:-1]]
+            status = next((c.lower() for c in cells if c.lower() in _STATUSES), "")
+            row = BacklogRow(m.group(0), status, n, line, bool(_DISPATCHABLE_RE.search(line)))
+            rows.append(row)
+            # Index by every cell that is exactly a spec id (`| FTR-1 |`), the
+            # same shape callback's status regexes anchor on.
+            for cell in cells:
+                if SPEC_ID_RE.fullmatch(cell):
+                    by_id.setdefault(cell, []).append(row)
+        self._rows = rows
+        self._by_id = by_id
+        self._dispatchable = [r for r in rows if r.dispatchable]
+        self._backlog_sig = sig
+
+    def rows(self) -> list[BacklogRow]:
+        with self._lock:
+            self._refresh_backlog()
+            return list(self._rows)
+
+    def dispatchable(self) -> list[BacklogRow]:
+        """Queued/resumed rows in backlog order."""
+        with self._lock:
+            self._refresh_backlog()
+            return list(self._dispatchable)
+
+    def next_dispatchable(self) -> BacklogRow | None:
+        """First queued/resumed row, or None."""
+        with self._lock:
+            self._refresh_backlog()
+            return self._dispatchable[0] if self._dispatchable else None
+
+    def has_status(self, spec_id: str, status: str) -> bool:
+        """True if a `| spec_id | ... | status |` backlog line exists."""
+        pattern = re.compile(
+            rf"\|\s*{re.escape(spec_id)}\s*\|.*?\|\s*{re.escape(status)}\s*\|", re.IGNORECASE
+        )
+        with self._lock:
+            self._refresh_backlog()
+            return any(pattern.search(r.line) for r in self._by_id.get(spec_id, ()))
+
+    # --- features -----------------------------------------------------------
+
+    def _refresh_features(self) -> None:
+        sig = _sig(self.features_dir)
+        if sig == self._features_sig:
+            return
+        files: dict[str, Path] = {}
+        if sig:
+            for f in sorted(self.features_dir.glob("*.md")):
+                m = SPEC_ID_RE.match(f.name)
+                if m:
+                    files.setdefault(m.group(0), f)
+        self._spec_files = files
+        self._features_sig = sig
+
+    def spec_file(self, spec_id: str) -> Path | None:
+        """Spec markdown for exactly this id, or None."""
+        with self._lock:
+            self._refresh_features()
+            return self._spec_files.get(spec_id)
+
+    def spec_provider(self, spec_id: str) -> str | None:
+        """`provider:` override from the spec file, or None."""
+        path = self.spec_file(spec_id)
+        if path is None:
+            return None
+        sig = _sig(path)
+        with self._lock:
+            cached = self._providers.get(path)
+            if cached and cached[0] == sig:
+                return cached[1]
+            m = _PROVIDER_RE.search(path.read_text(errors="replace")) if sig else None
+            provider = m.group(1) if m else None
+            self._providers[path] = (sig, provider)
+            return provider
+
+
+_catalogs: dict[str, SpecCatalog] = {}
+_catalogs_lock = Lock()
+
+
+def catalog_for(project_dir: str) -> SpecCatalog:
+    """Process-wide catalog for a project directory (created on first use)."""
+    key = str(project_dir)
+    with _catalogs_lock:
+        cat = _catalogs.get(key)
+        if cat is None:
+            cat = _catalogs[key] = SpecCatalog(key)
+        return cat
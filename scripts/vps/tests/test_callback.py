@@ -1,5 +1,8 @@
 # scripts/vps/tests/test_callback.py
-"""Tests for callback.verify_status_sync (status auto-fix guards).
+"""Tests for callback.verify_status_sync (status auto-fix guards), pueue
+skill detection (PueueView), log lookup, the callback job queue (critical path vs
+queued steps), batched git commit/push of status fixes and the callback
+daemon (serve mode).
 
 The two guards are symmetric:
   * target=done + spec=blocked  → skip (autopilot says blocked, respect it).
@@ -8,7 +11,11 @@ The two guards are symmetric:
 """
 
 import json
+import socket
+import sqlite3
+import subprocess
 import sys
+import threading
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
@@ -19,6 +26,7 @@ if VPS_DIR not in sys.path:
     sys.path.insert(0, VPS_DIR)
 
 import callback  # noqa: E402
+import db  # noqa: E402
 
 
 @pytest.fixture
@@ -235,6 +243,38 @@ class TestSkillFromPueueCommand:
         assert skill == ""
 
 
+class TestPueueView:
+    """One `pueue status --json` per callback run, however many steps ask."""
+
+    CMD = "/x/run-agent.sh /p claude autopilot /autopilot FTR-1"
+
+    def test_fetched_once_for_label_skill_and_dedup(self):
+        status = _mock_pueue_status("12", self.CMD, "2026-04-26T17:26:08+03:00")
+        with patch("callback.subprocess.run", return_value=status) as run:
+            view = callback.PueueView()
+            with patch("callback.db.get_task_by_pueue_id", return_value=None):
+                assert callback.resolve_label("12", view) == "proj:SPEC-1"
+            skill, start_ts = callback._skill_from_pueue_command("12", view)
+            assert callback.is_already_queued("proj:SPEC-1", view)
+            assert not callback.is_already_queued("proj:qa-SPEC-1", view)
+        assert run.call_count == 1
+        assert skill == "autopilot" and start_ts > 0
+        assert view.task("12")["state"] == "Running"
+
+    def test_lazy_and_notes_own_additions(self):
+        view = callback.PueueView()
+        view.note_added(40, "proj:qa-SPEC-1")  # nothing fetched yet: no-op
+        with patch("callback.subprocess.run", return_value=_mock_pueue_status("1", "x")) as run:
+            assert not view.has_active_label("proj:qa-SPEC-1")
+            view.note_added(40, "proj:qa-SPEC-1")
+            assert view.has_active_label("proj:qa-SPEC-1")
+        assert run.call_count == 1
+
+    def test_unknown_task_is_empty_record(self):
+        with patch("callback.subprocess.run", return_value=_mock_pueue_status("1", "x")):
+            assert callback.PueueView().task(99) == {}
+
+
 class TestFindLogFileFiltersStale:
     """Verify _find_log_file refuses logs older than the task's own start_ts.
 
@@ -280,3 +320,368 @@ class TestFindLogFileFiltersStale:
         monkeypatch.setattr(callback, "SCRIPT_DIR", tmp_path)
         result = callback._find_log_file("proj")
         assert result == f
+
+
+class TestRunnerLogLookup:
+    """claude-runner.py records task_log.log_path; the callback reads it by pueue id."""
+
+    def test_recorded_path_used_without_scanning_logs(self, seed_project, tmp_path):
+        _seed_run()
+        log_file = tmp_path / "test-project-20260101-000000-42.log"
+        log_file.write_text(json.dumps({"skill": "autopilot", "result_preview": "ok"}))
+        assert db.record_log_path("testproject:FTR-1", str(log_file))
+        with patch("callback._find_log_file") as scan:
+            assert callback._runner_log("7", "testproject") == log_file
+            with patch("callback._skill_from_pueue_command", return_value=("", 0.0)):
+                assert callback.extract_agent_output("7", "testproject") == ("autopilot", "ok")
+        scan.assert_not_called()
+
+    def test_recorded_but_unwritten_means_no_log(self, seed_project, tmp_path):
+        """Runner killed before writing: never fall back to a neighbour's log."""
+        _seed_run()
+        db.record_log_path("testproject:FTR-1", str(tmp_path / "never-written.log"))
+        with patch("callback._find_log_file") as scan:
+            assert callback._runner_log("7", "testproject") is None
+        scan.assert_not_called()
+
+    def test_unrecorded_falls_back_to_scan(self, seed_project):
+        _seed_run()
+        with patch("callback._find_log_file", return_value=None) as scan:
+            assert callback._runner_log("7", "testproject", after_ts=5.0) is None
+        scan.assert_called_once_with("test-project", after_ts=5.0)
+
+
+def _git(repo, *args):
+    return subprocess.run(
+        ["git", "-C", str(repo), *args], capture_output=True, text=True, check=True
+    ).stdout
+
+
+def _clone(remote, path):
+    subprocess.run(["git", "clone", "-q", "-b", "develop", str(remote), str(path)], check=True)
+    _git(path, "config", "user.email", "t@example.com")
+    _git(path, "config", "user.name", "t")
+    return path
+
+
+@pytest.fixture
+def repos(tmp_path):
+    """Bare origin with a develop branch plus two clones (ours, someone else's)."""
+    remote = tmp_path / "origin.git"
+    subprocess.run(["git", "init", "-q", "--bare", "-b", "develop", str(remote)], check=True)
+    seed = tmp_path / "seed"
+    subprocess.run(["git", "init", "-q", "-b", "develop", str(seed)], check=True)
+    _git(seed, "config", "user.email", "t@example.com")
+    _git(seed, "config", "user.name", "t")
+    (seed / "ai").mkdir()
+    (seed / "ai" / "backlog.md").write_text("| FTR-1 | t | queued |\n")
+    _git(seed, "add", ".")
+    _git(seed, "commit", "-q", "-m", "init")
+    _git(seed, "push", "-q", str(remote), "develop")
+    return _clone(remote, tmp_path / "ours"), _clone(remote, tmp_path / "theirs")
+
+
+class TestGitBatching:
+    def test_fixes_within_window_share_one_job(self, isolated_db, tmp_path):
+        callback._git_commit_push(str(tmp_path / "a"), "FTR-1", "done", ["ai/backlog.md"])
+        callback._git_commit_push(str(tmp_path / "a"), "FTR-2", "blocked", ["ai/x.md"])
+        callback._git_commit_push(str(tmp_path / "b"), "FTR-3", "done", ["ai/backlog.md"])
+        with db.read_db() as conn:
+            rows = conn.execute("SELECT payload FROM callback_jobs ORDER BY id").fetchall()
+        assert len(rows) == 2
+        first = json.loads(rows[0]["payload"])
+        assert first["files"] == ["ai/backlog.md", "ai/x.md"]
+        assert first["marks"] == ["FTR-1 as done", "FTR-2 as blocked"]
+
+    def test_one_commit_one_push_per_batch(self, isolated_db, repos, monkeypatch):
+        ours, _ = repos
+        monkeypatch.setenv("CALLBACK_GIT_WINDOW", "0")
+        (ours / "ai" / "backlog.md").write_text("| FTR-1 | t | done |\n")
+        (ours / "ai" / "spec.md").write_text("**Status:** done\n")
+        callback._git_commit_push(str(ours), "FTR-1", "done", ["ai/backlog.md"])
+        callback._git_commit_push(str(ours), "FTR-2", "done", ["ai/spec.md"])
+        conn = sqlite3.connect(db.DB_PATH)
+        conn.execute("UPDATE callback_jobs SET run_after = '2000-01-01T00:00:00Z'")
+        conn.commit()
+        conn.close()
+        assert callback.drain_jobs() == 1
+        assert _git(ours, "log", "--format=%s", "origin/develop", "-1") == (
+            "docs: mark FTR-1 as done, FTR-2 as done (callback auto-fix)\n"
+        )
+        assert _git(ours, "status", "--porcelain") == ""
+
+    def test_retry_commits_only_new_marks(self, isolated_db, repos, monkeypatch):
+        ours, _ = repos
+        monkeypatch.setenv("CALLBACK_GIT_WINDOW", "0")
+        (ours / "ai" / "backlog.md").write_text("| FTR-1 | t | done |\n")
+        callback._git_commit_push(str(ours), "FTR-1", "done", ["ai/backlog.md"])
+        real_run = subprocess.run
+
+        def no_push(cmd, *args, **kwargs):
+            if "push" in cmd:
+                return subprocess.CompletedProcess(cmd, 1, "", "fatal: unable to access")
+            return real_run(cmd, *args, **kwargs)
+
+        with patch("callback.subprocess.run", side_effect=no_push):
+            assert callback.drain_jobs() == 1
+        # Queued for retry: a new fix joins the same batch.
+        (ours / "ai" / "spec.md").write_text("**Status:** done\n")
+        callback._git_commit_push(str(ours), "FTR-2", "done", ["ai/spec.md"])
+        conn = sqlite3.connect(db.DB_PATH)
+        conn.execute("UPDATE callback_jobs SET run_after = '2000-01-01T00:00:00Z'")
+        conn.commit()
+        conn.close()
+        assert callback.drain_jobs() == 1
+        assert _git(ours, "log", "--format=%s", "origin/develop", "-2").splitlines() == [
+            "docs: mark FTR-2 as done (callback auto-fix)",
+            "docs: mark FTR-1 as done (callback auto-fix)",
+        ]
+
+    def test_commit_leaves_other_staged_work_alone(self, isolated_db, repos, monkeypatch):
+        ours, _ = repos
+        monkeypatch.setenv("CALLBACK_GIT_WINDOW", "0")
+        (ours / "agent.py").write_text("wip\n")
+        _git(ours, "add", "agent.py")  # an agent's staged, uncommitted work
+        (ours / "ai" / "backlog.md").write_text("| FTR-1 | t | done |\n")
+        callback._git_commit_push(str(ours), "FTR-1", "done", ["ai/backlog.md"])
+        assert callback.drain_jobs() == 1
+        assert _git(ours, "show", "--name-only", "--format=", "origin/develop") == "ai/backlog.md\n"
+        assert _git(ours, "diff", "--cached", "--name-only") == "agent.py\n"
+
+    def test_failed_commit_raises(self, isolated_db, repos, monkeypatch):
+        ours, _ = repos
+        monkeypatch.setenv("CALLBACK_GIT_WINDOW", "0")
+        (ours / "ai" / "backlog.md").write_text("| FTR-1 | t | done |\n")
+        (ours / ".git" / "hooks" / "pre-commit").write_text("#!/bin/sh\nexit 1\n")
+        (ours / ".git" / "hooks" / "pre-commit").chmod(0o755)
+        callback._git_commit_push(str(ours), "FTR-1", "done", ["ai/backlog.md"])
+        callback.drain_jobs()
+        with db.read_db() as conn:
+            job = conn.execute("SELECT status, last_error FROM callback_jobs").fetchone()
+        assert job["status"] == "queued" and "git commit failed" in job["last_error"]
+
+    def test_in_process_callback_pushes_open_batch(self, isolated_db, repos):
+        ours, _ = repos
+        (ours / "ai" / "backlog.md").write_text("| FTR-1 | t | done |\n")
+        callback._git_commit_push(str(ours), "FTR-1", "done", ["ai/backlog.md"])
+        with patch("callback.accept_callback", return_value=0):
+            callback.handle_callback("7", "claude-runner", "Success")
+        assert _git(ours, "log", "--format=%s", "origin/develop", "-1") == (
+            "docs: mark FTR-1 as done (callback auto-fix)\n"
+        )
+
+    @pytest.fixture
+    def rejected(self, isolated_db, repos, monkeypatch):
+        """Someone else pushed first; our batch for FTR-1 is queued and due."""
+        ours, theirs = repos
+        monkeypatch.setenv("CALLBACK_GIT_WINDOW", "0")
+        db.seed_projects_from_json([{"project_id": "ours", "path": str(ours), "topic_id": 5}])
+        (theirs / "other.txt").write_text("x")
+        _git(theirs, "add", ".")
+        _git(theirs, "commit", "-q", "-m", "someone else")
+        _git(theirs, "push", "-q", "origin", "develop")
+        (ours / "ai" / "backlog.md").write_text("| FTR-1 | t | done |\n")
+        callback._git_commit_push(str(ours), "FTR-1", "done", ["ai/backlog.md"])
+        return ours
+
+    @staticmethod
+    def _pueue(tasks):
+        return patch.object(
+            callback.PueueView, "snapshot", return_value=callback.PueueSnapshot(tasks)
+        )
+
+    def test_non_fast_forward_pushed_from_scratch_worktree(self, rejected):
+        ours = rejected
+        with self._pueue({}):
+            assert callback.drain_jobs() == 1
+        with db.read_db() as conn:
+            job = conn.execute("SELECT status, attempts FROM callback_jobs").fetchone()
+        assert (job["status"], job["attempts"]) == ("done", 1)
+        log = _git(ours, "log", "--format=%s", "origin/develop")
+        assert log.splitlines()[:2] == [
+            "docs: mark FTR-1 as done (callback auto-fix)",
+            "someone else",
+        ]
+        # Live checkout untouched: git_pull catches it up later.
+        assert "someone else" not in _git(ours, "log", "--format=%s", "HEAD")
+        assert _git(ours, "worktree", "list").count("\n") == 1
+
+    def test_non_fast_forward_waits_while_agent_runs(self, rejected):
+        ours = rejected
+        (ours / "ai" / "notes.md").write_text("agent edit\n")
+        running = {"3": {"label": "ours:FTR-9", "status": {"Running": {}}}}
+        with self._pueue(running):
+            assert callback.drain_jobs() == 1
+        with db.read_db() as conn:
+            job = conn.execute("SELECT status, last_error FROM callback_jobs").fetchone()
+        assert job["status"] == "queued" and "agent running in ours" in job["last_error"]
+        assert "someone else" not in _git(ours, "log", "--format=%s", "origin/develop")
+        assert _git(ours, "status", "--porcelain") == "?? ai/notes.md\n"
+
+
+# --- callback daemon (callback.py serve) ---
+
+
+def _seed_run(pueue_id=7, label="testproject:FTR-1", skill="autopilot"):
+    res = db.dispatch_task("testproject", "claude", pueue_id, label, skill, "running")
+    assert res.slot_number is not None
+    return res
+
+
+def _jobs():
+    with db.read_db() as conn:
+        return {
+            r["step"]: dict(r)
+            for r in conn.execute("SELECT step, status, attempts, job_key FROM callback_jobs")
+        }
+
+
+class TestCallbackJobs:
+    def test_critical_path_frees_slot_and_queues_the_rest(self, seed_project):
+        _seed_run()
+        assert callback.accept_callback("7", "claude-runner", "Success") == 2
+        assert db.get_occupied_slots() == []
+        assert db.get_task_by_pueue_id(7)["id"]
+        with db.read_db() as conn:
+            assert conn.execute("SELECT status FROM task_log").fetchone()[0] == "done"
+        assert set(_jobs()) == {"phase", "output"}
+        # Hook retried / daemon fallback: nothing queued twice.
+        assert callback.accept_callback("7", "claude-runner", "Success") == 0
+
+    def test_night_reviewer_queues_nothing(self, seed_project):
+        assert callback.accept_callback("7", "night-reviewer", "Success") == 0
+        assert _jobs() == {}
+
+    def test_autopilot_done_runs_all_steps_once(self, seed_project):
+        _seed_run()
+        callback.accept_callback("7", "claude-runner", "Success")
+        with (
+            patch("callback.extract_agent_output", return_value=("autopilot", "")) as extract,
+            patch("callback.write_event_for_skill") as event,
+            patch("callback.dispatch_qa", return_value=True) as qa,
+            patch("callback.dispatch_reflect", return_value=True) as reflect,
+            patch("callback.verify_status_sync") as sync,
+        ):
+            assert callback.drain_jobs() == 6
+            assert callback.drain_jobs() == 0
+        assert {j["status"] for j in _jobs().values()} == {"done"}
+        assert db.get_project_state("testproject")["phase"] == "qa_pending"
+        event.assert_called_once_with("/tmp/test-project", "autopilot", "done", "FTR-1")
+        assert qa.call_args.args[:4] == ("testproject", "/tmp/test-project", "FTR-1", "claude")
+        # One PueueView for the whole run: skill lookup and both dedup checks.
+        view = extract.call_args.args[2]
+        assert isinstance(view, callback.PueueView)
+        assert qa.call_args.args[4] is view and reflect.call_args.args[4] is view
+        sync.assert_called_once_with("/tmp/test-project", "FTR-1", "done")
+
+    def test_failed_step_is_retried_later_not_lost(self, seed_project):
+        _seed_run()
+        callback.accept_callback("7", "claude-runner", "Success")
+        with (
+            patch("callback.extract_agent_output", return_value=("autopilot", "")),
+            patch("callback.write_event_for_skill"),
+            patch("callback.dispatch_qa", return_value=False),
+            patch("callback.dispatch_reflect", return_value=True),
+            patch("callback.verify_status_sync") as sync,
+        ):
+            callback.drain_jobs()
+        jobs = _jobs()
+        assert jobs["qa"]["status"] == "queued" and jobs["qa"]["attempts"] == 1
+        sync.assert_called_once()  # later steps are not held up
+        with db.read_db() as conn:
+            err = conn.execute("SELECT last_error FROM callback_jobs WHERE step = 'qa'")
+            assert "QA dispatch failed" in err.fetchone()[0]
+
+    def test_in_process_path_requeues_stale_jobs(self, seed_project):
+        _seed_run()
+        callback.accept_callback("7", "claude-runner", "Success")
+        lost = db.claim_job()
+        conn = sqlite3.connect(db.DB_PATH)
+        conn.execute(
+            "UPDATE callback_jobs SET started_at = strftime('%Y-%m-%dT%H:%M:%SZ', 'now', ?) "
+            "WHERE id = ?",
+            (f"-{db.job_timeout() + 1} seconds", lost["id"]),
+        )
+        conn.commit()
+        conn.close()
+        with patch("callback.extract_agent_output", return_value=("", "")):
+            callback.handle_callback("8", "claude-runner", "Success")
+        assert _jobs()[lost["step"]]["status"] == "done"
+
+    def test_in_process_path_never_raises(self, seed_project):
+        with patch("callback.accept_callback", side_effect=RuntimeError("db gone")):
+            with patch("callback.drain_jobs", side_effect=RuntimeError("db gone")):
+                callback.handle_callback("1", "g", "Success")
+
+
+class TestCallbackDaemon:
+    @pytest.fixture
+    def daemon(self, seed_project, tmp_path):
+        wake = threading.Event()
+        path = str(tmp_path / "cb.sock")
+        server = callback.make_server(path, wake)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        yield path, wake
+        server.shutdown()
+        server.server_close()
+
+    def _ask(self, path, line):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(path)
+            sock.sendall(line.encode() + b"\n")
+            return json.loads(sock.makefile("rb").readline())
+
+    def test_acked_after_slot_released_and_jobs_committed(self, daemon):
+        path, wake = daemon
+        _seed_run()
+        req = {"pueue_id": 7, "group": "claude-runner", "result": "Success"}
+        assert self._ask(path, json.dumps(req)) == {"ok": True, "queued": 2}
+        assert wake.is_set()
+        assert db.get_occupied_slots() == []
+        assert set(_jobs()) == {"phase", "output"}
+
+    def test_bad_request_rejected(self, daemon):
+        path, wake = daemon
+        reply = self._ask(path, '{"group": "x"}')
+        assert reply["ok"] is False and "pueue_id" in reply["error"]
+        assert self._ask(path, "not json")["ok"] is False
+        assert self._ask(path, '{"pueue_id": "abc"}')["ok"] is False
+        assert not wake.is_set() and _jobs() == {}
+
+    def test_worker_drains_queue_until_stopped(self, seed_project):
+        _seed_run()
+        callback.accept_callback("7", "claude-runner", "Failed")
+        stop, wake = threading.Event(), threading.Event()
+        worker = threading.Thread(target=callback._work, args=(stop, wake))
+        with patch("callback.extract_agent_output", return_value=("", "")):
+            worker.start()
+            for _ in range(200):
+                if {j["status"] for j in _jobs().values()} == {"done"}:
+                    break
+                threading.Event().wait(0.01)
+            stop.set()
+            wake.set()
+            worker.join(timeout=5)
+        assert not worker.is_alive()
+        assert {j["status"] for j in _jobs().values()} == {"done"}
+        assert db.get_project_state("testproject")["phase"] == "failed"
+
+    def test_worker_requeues_stale_jobs_between_prunes(self, seed_project, monkeypatch):
+        monkeypatch.setenv("CALLBACK_POLL_INTERVAL", "0.01")  # read when the worker starts
+        stop, wake = threading.Event(), threading.Event()
+        calls = []
+
+        def requeue():
+            calls.append(1)
+            if len(calls) == 2:
+                stop.set()
+            return 0
+
+        with (
+            patch.object(callback, "_stale_check_interval", return_value=0),
+            patch("callback.db.requeue_stale_jobs", side_effect=requeue),
+            patch("callback.db.prune_jobs") as prune,
+        ):
+            callback._work(stop, wake)
+        assert len(calls) == 2
+        assert prune.call_count == 1
@@ -0,0 +1,71 @@
+# scripts/vps/tests/test_callback_client.py
+"""Tests for callback_client.py (pueue hook → callback daemon, in-process fallback).
+
+Covers: send() ack handling, fallback to callback.main when the daemon is
+down, and the always-exit-0 invariant.
+"""
+
+import json
+import socket
+import sys
+import threading
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+VPS_DIR = str(Path(__file__).resolve().parent.parent)
+if VPS_DIR not in sys.path:
+    sys.path.insert(0, VPS_DIR)
+
+import callback  # noqa: E402
+import callback_client  # noqa: E402
+
+
+@pytest.fixture
+def daemon(tmp_path, monkeypatch):
+    """Minimal stand-in for `callback.py serve`: acks every request line."""
+    path = str(tmp_path / "cb.sock")
+    srv = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    srv.bind(path)
+    srv.listen()
+    received = []
+
+    def accept():
+        conn, _ = srv.accept()
+        with conn:
+            line = conn.makefile("rb").readline()
+            received.append(json.loads(line))
+            conn.sendall(b'{"ok": true, "queued": 1}\n')
+
+    threading.Thread(target=accept, daemon=True).start()
+    monkeypatch.setenv("CALLBACK_SOCKET", path)
+    yield received
+    srv.close()
+
+
+def _run_main(argv):
+    with patch.object(sys, "argv", ["callback_client.py", *argv]):
+        with pytest.raises(SystemExit) as exc:
+            callback_client.main()
+    return exc.value.code
+
+
+class TestCallbackClient:
+    def test_handed_to_daemon(self, daemon):
+        with patch.object(callback, "main") as inline:
+            assert _run_main(["42", "claude-runner", "Success"]) == 0
+        inline.assert_not_called()
+        assert daemon == [{"pueue_id": "42", "group": "claude-runner", "result": "Success"}]
+
+    def test_falls_back_in_process_when_daemon_down(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("CALLBACK_SOCKET", str(tmp_path / "missing.sock"))
+        assert callback_client.send("1", "g", "Success") is False
+        with patch.object(callback, "main", side_effect=SystemExit(0)) as inline:
+            assert _run_main(["1", "g", "Success"]) == 0
+        inline.assert_called_once()
+
+    def test_always_exits_zero(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("CALLBACK_SOCKET", str(tmp_path / "missing.sock"))
+        with patch.object(callback, "main", side_effect=RuntimeError("boom")):
+            assert _run_main([]) == 0
@@ -3,13 +3,28 @@
 
 Covers: seed_projects_from_json, log_task, finish_task, try_acquire_slot,
 release_slot, get_available_slots, get_project_state, update_project_phase,
-callback CLI mode, save_finding, get_new_findings.
+dispatch_task, reserve_slot / cancel_reservation / expire_reservations,
+slot leases (heartbeat / reclaim_expired_leases),
+task_usage ledger (record_usage / usage_summary), record_log_path, task_stats rollups,
+callback job queue (enqueue/coalesce/claim/finish_job, retries, stale requeue),
+connection pool, read_db (read-only connections), PRAGMA profile + WAL
+checkpointing, migrations + query plans, archive_task_log, ingest_findings,
+serve (NDJSON command server) + db-client.sh, callback CLI mode, save_finding,
+get_new_findings.
 """
 
+import io
+import json
+import os
+import socket
 import sqlite3
+import subprocess
 import sys
+import threading
+import time
 from pathlib import Path
 
+import pytest
 
 VPS_DIR = str(Path(__file__).resolve().parent.parent)
 if VPS_DIR not in sys.path:
@@ -200,4 +215,946 @@ class TestProjectState:
         assert state["current_task"] == "task-label-1"
 
 
+# --- dispatch_task: slot + task_log + phase in one transaction ---
+
+
+class TestDispatchTask:
+    def test_records_everything_atomically(self, seed_project):
+        res = db.dispatch_task(
+            "testproject",
+            "claude",
+            70,
+            "testproject:FTR-1",
+            "autopilot",
+            "running",
+            phase="autopilot",
+            current_task="FTR-1",
+        )
+        assert isinstance(res, db.DispatchResult)
+        assert res.slot_number == 1
+        assert db.get_slots_by_project() == {"testproject": 1}
+        state = db.get_project_state("testproject")
+        assert (state["phase"], state["current_task"]) == ("autopilot", "FTR-1")
+        conn = sqlite3.connect(db.DB_PATH)
+        row = conn.execute(
+            "SELECT id, task_label, pueue_id FROM task_log WHERE id = ?", (res.task_log_id,)
+        ).fetchone()
+        conn.close()
+        assert row[1:] == ("testproject:FTR-1", 70)
+
+    def test_logs_task_when_no_slot_free(self, seed_project):
+        db.dispatch_task("testproject", "gemini", 71, "l1", "qa", "running")
+        res = db.dispatch_task("testproject", "gemini", 72, "l2", "qa", "running")
+        assert res.slot_number is None
+        assert res.task_log_id > 0
+        assert db.get_project_state("testproject")["phase"] == "idle"
+
+    def test_rolls_back_on_failure(self, seed_project, monkeypatch):
+        def boom(*args, **kwargs):
+            raise sqlite3.OperationalError("disk I/O error")
+
+        monkeypatch.setattr(db, "_set_phase", boom)
+        with pytest.raises(sqlite3.OperationalError):
+            db.dispatch_task("testproject", "claude", 73, "l", "spark", "queued", phase="x")
+        assert db.get_slots_by_project() == {}
+        conn = sqlite3.connect(db.DB_PATH)
+        assert conn.execute("SELECT COUNT(*) FROM task_log").fetchone()[0] == 0
+        conn.close()
+
+
+# --- slot reservations (reserve → bind / cancel / expire) ---
+
+
+class TestSlotReservations:
+    def test_reservation_blocks_slot_until_bound(self, seed_project):
+        slot = db.reserve_slot("testproject", "gemini")
+        assert slot == 4
+        assert db.reserve_slot("other", "gemini") is None
+        assert db.get_occupied_slots() == []  # unbound: invisible to the orphan watchdog
+        res = db.dispatch_task(
+            "testproject", "gemini", 80, "l", "qa", "running", reserved_slot=slot
+        )
+        assert res.slot_number == slot
+        assert db.get_occupied_slots()[0]["pueue_id"] == 80
+
+    def test_cancel_reservation(self, seed_project):
+        slot = db.reserve_slot("testproject", "gemini")
+        assert db.cancel_reservation(slot, "other") is False
+        assert db.cancel_reservation(slot, "testproject") is True
+        assert db.get_available_slots("gemini") == 1
+
+    def test_expired_reservation_is_reclaimed(self, seed_project):
+        slot = db.reserve_slot("testproject", "gemini")
+        conn = sqlite3.connect(db.DB_PATH)
+        conn.execute(
+            "UPDATE compute_slots SET acquired_at = '2020-01-01T00:00:00Z' WHERE slot_number = ?",
+            (slot,),
+        )
+        conn.commit()
+        conn.close()
+        assert db.expire_reservations(ttl=60) == 1
+        assert db.reserve_slot("testproject", "gemini") == slot
+
+    def test_bind_after_expiry_falls_back_to_free_slot(self, seed_project):
+        slot = db.reserve_slot("testproject", "claude")
+        db.cancel_reservation(slot, "testproject")  # as if it had expired
+        db.try_acquire_slot("testproject", "claude", pueue_id=99)  # someone else took it
+        res = db.dispatch_task(
+            "testproject", "claude", 81, "l", "qa", "running", reserved_slot=slot
+        )
+        assert res.slot_number == 2
+
+
+# --- slot leases (runner heartbeats) ---
+
+
+def _lease(slot):
+    return db.lease_env(slot)["DLD_LEASE_TOKEN"]
+
+
+class TestSlotLeases:
+    def test_reservation_gets_fresh_token(self, seed_project):
+        slot = db.reserve_slot("testproject", "gemini")
+        env = db.lease_env(slot)
+        assert env["DLD_SLOT_NUMBER"] == str(slot) and len(env["DLD_LEASE_TOKEN"]) == 16
+        db.cancel_reservation(slot, "testproject")
+        assert db.lease_env(slot) == {}
+        assert db.lease_env(None) == {}
+        assert _lease(db.reserve_slot("testproject", "gemini")) != env["DLD_LEASE_TOKEN"]
+
+    def test_heartbeat_renews_and_records_pid(self, seed_project):
+        slot = db.reserve_slot("testproject", "gemini")
+        db.dispatch_task("testproject", "gemini", 70, "l", "qa", "running", reserved_slot=slot)
+        assert db.heartbeat(slot, _lease(slot), pid=4242) is True
+        assert db.heartbeat(slot, "not-the-token") is False
+        row = db.get_occupied_slots()[0]
+        assert row["lease_expires_at"] is not None
+        with db.read_db() as conn:
+            assert (
+                conn.execute("SELECT pid FROM compute_slots WHERE slot_number = 4").fetchone()[0]
+                == 4242
+            )
+
+    def test_lapsed_lease_reclaimed(self, seed_project):
+        slot = db.reserve_slot("testproject", "gemini")
+        token = _lease(slot)
+        db.dispatch_task("testproject", "gemini", 71, "l", "qa", "running", reserved_slot=slot)
+        db.heartbeat(slot, token, ttl=-1)  # as if the runner died a while ago
+        assert db.reclaim_expired_leases() == 1
+        assert db.get_available_slots("gemini") == 1
+        assert db.heartbeat(slot, token) is False  # stale runner cannot take it back
+
+    def test_lease_ttl_read_after_import(self, seed_project, monkeypatch):
+        slot = db.reserve_slot("testproject", "gemini")
+        db.dispatch_task("testproject", "gemini", 74, "l", "qa", "running", reserved_slot=slot)
+        monkeypatch.setenv("SLOT_LEASE_TTL", "-1")  # as if .env was loaded after `import db`
+        db.heartbeat(slot, _lease(slot))
+        assert db.reclaim_expired_leases() == 1
+
+    def test_reserve_reclaims_lapsed_lease_inline(self, seed_project):
+        slot = db.reserve_slot("testproject", "gemini")
+        db.dispatch_task("testproject", "gemini", 72, "l", "qa", "running", reserved_slot=slot)
+        db.heartbeat(slot, _lease(slot), ttl=-1)
+        assert db.reserve_slot("testproject", "gemini") == slot
+
+    def test_live_lease_survives(self, seed_project):
+        slot = db.reserve_slot("testproject", "gemini")
+        db.heartbeat(slot, _lease(slot))  # runner started before dispatch_task bound it
+        conn = sqlite3.connect(db.DB_PATH)
+        conn.execute("UPDATE compute_slots SET acquired_at = '2020-01-01T00:00:00Z'")
+        conn.commit()
+        conn.close()
+        assert db.expire_reservations(ttl=60) == 0
+        assert db.reclaim_expired_leases() == 0
+        assert db.reserve_slot("testproject", "gemini") is None
+
+    def test_release_clears_lease(self, seed_project):
+        slot = db.reserve_slot("testproject", "gemini")
+        db.dispatch_task("testproject", "gemini", 73, "l", "qa", "running", reserved_slot=slot)
+        db.heartbeat(slot, _lease(slot), pid=1)
+        db.release_slot(73)
+        assert db.lease_env(slot) == {}
+        assert db.get_available_slots("gemini") == 1
+
+    def test_heartbeat_cli_exit_codes(self, seed_project):
+        slot = db.reserve_slot("testproject", "gemini")
+        cli = [sys.executable, str(Path(VPS_DIR) / "db.py"), "heartbeat", str(slot)]
+        env = {**os.environ, "DB_PATH": db.DB_PATH}
+        assert subprocess.run(cli + [_lease(slot), "123"], env=env).returncode == 0
+        assert subprocess.run(cli + ["stale"], env=env).returncode == 2  # lease lost
+        # DB error (unopenable path stands in for "database is locked"): transient, not lost.
+        broken = {**env, "DB_PATH": str(Path(db.DB_PATH).parent)}
+        r = subprocess.run(cli + [_lease(slot)], env=broken, capture_output=True, text=True)
+        assert r.returncode == 1 and "heartbeat failed" in r.stderr
+
+
+# --- connection pool ---
+
+
+class TestConnectionPool:
+    def test_connection_reused_within_thread(self, isolated_db):
+        with db.get_db() as a:
+            pass
+        with db.get_db(immediate=True) as b:
+            assert b.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+        assert a is b
+
+    def test_threads_get_own_connections(self, isolated_db):
+        seen = []
+
+        def worker():
+            with db.get_db() as conn:
+                seen.append(conn)
+            db.close_db()
+
+        t = threading.Thread(target=worker)
+        t.start()
+        t.join()
+        with db.get_db() as mine:
+            assert seen[0] is not mine
+
+    def test_db_path_change_reconnects(self, isolated_db, tmp_path, monkeypatch):
+        with db.get_db() as first:
+            pass
+        monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "other.db"))
+        with db.get_db() as second:
+            assert second is not first
+
+    def test_failed_block_rolls_back_and_connection_stays_usable(self, seed_project):
+        with pytest.raises(RuntimeError):
+            with db.get_db(immediate=True) as conn:
+                db._set_phase(conn, "testproject", "broken")
+                raise RuntimeError("boom")
+        assert db.get_project_state("testproject")["phase"] == "idle"
+
+    def test_pool_disabled(self, isolated_db, monkeypatch):
+        monkeypatch.setenv("DB_POOL", "0")
+        with db.get_db() as a:
+            pass
+        with db.get_db() as b:
+            pass
+        assert a is not b
+
+
+# --- read-only connections ---
+
+
+class TestReadOnlyConnections:
+    def test_writes_rejected(self, seed_project):
+        with db.read_db() as conn:
+            with pytest.raises(sqlite3.OperationalError, match="readonly|query_only"):
+                conn.execute("UPDATE project_state SET phase = 'x'")
+        assert db.get_project_state("testproject")["phase"] == "idle"
+
+    def test_separate_from_writer_and_reused(self, isolated_db):
+        with db.get_db() as rw:
+            pass
+        with db.read_db() as a:
+            pass
+        with db.read_db() as b:
+            assert not b.in_transaction
+        assert a is b and a is not rw
+
+    def test_sees_committed_writes(self, seed_project):
+        assert db.get_project_state("testproject")["phase"] == "idle"
+        db.update_project_phase("testproject", "running")
+        assert db.get_project_state("testproject")["phase"] == "running"
+
+    def test_read_does_not_block_writer(self, seed_project):
+        """A reader mid-query must not stop another connection from committing."""
+        with db.read_db() as conn:
+            cur = conn.execute("SELECT project_id FROM project_state")
+            cur.fetchone()
+            other = sqlite3.connect(db.DB_PATH, timeout=0)
+            other.execute("UPDATE project_state SET phase = 'busy'")
+            other.commit()
+            other.close()
+        assert db.get_project_state("testproject")["phase"] == "busy"
+
+    def test_pool_disabled(self, isolated_db, monkeypatch):
+        monkeypatch.setenv("DB_POOL", "0")
+        with db.read_db() as a:
+            pass
+        with db.read_db() as b:
+            pass
+        assert a is not b
+
+
+# --- task_stats rollups ---
+
+
+def _run_for(pueue_id, seconds, exit_code=0, skill="autopilot", provider=None):
+    """Dispatch-like task_log row that started `seconds` ago, then finish_task it."""
+    task_id = db.log_task("testproject", f"testproject:t{pueue_id}", skill, "running", pueue_id)
+    conn = sqlite3.connect(db.DB_PATH)
+    conn.execute(
+        "UPDATE task_log SET provider = ?, "
+        "started_at = strftime('%Y-%m-%dT%H:%M:%SZ', 'now', ?) WHERE id = ?",
+        (provider, f"-{seconds} seconds", task_id),
+    )
+    conn.commit()
+    conn.close()
+    db.finish_task(pueue_id, "done" if exit_code == 0 else "failed", exit_code)
+
+
+class TestTaskStats:
+    def test_finish_task_updates_hour_and_day_buckets(self, seed_project):
+        _run_for(1, 100)
+        _run_for(2, 300, exit_code=1)
+        with db.read_db() as conn:
+            rows = conn.execute(
+                "SELECT grain, length(bucket) AS n, runs, successes, provider FROM task_stats "
+                "ORDER BY grain"
+            ).fetchall()
+        assert [(r["grain"], r["n"], r["runs"], r["successes"]) for r in rows] == [
+            ("day", 10, 2, 1),
+            ("hour", 13, 2, 1),
+        ]
+        assert rows[0]["provider"] == "claude"  # project default when the row has none
+
+    def test_finish_task_twice_counts_once(self, seed_project):
+        _run_for(1, 60)
+        db.finish_task(1, "done", 0)
+        assert db.task_stats(by=())[0]["runs"] == 1
+
+    def test_stats_percentiles_and_slot_hours(self, seed_project):
+        for i in range(1, 101):
+            _run_for(i, i * 60, skill="qa" if i % 2 else "autopilot", provider="codex")
+        (total,) = db.task_stats(by=())
+        assert total["runs"] == 100 and total["success_rate"] == 1.0
+        assert total["slot_hours"] == pytest.approx(84.17, abs=0.1)  # 60 * 5050 s
+        assert 2700 <= total["p50"] <= 3300  # exact: 3030 s
+        assert 5400 <= total["p95"] <= 6000  # exact: 5730 s
+        assert total["max_seconds"] == pytest.approx(6000, abs=2)
+        by_skill = {r["skill"]: r for r in db.task_stats("hour", by=("skill",))}
+        assert by_skill["qa"]["runs"] == by_skill["autopilot"]["runs"] == 50
+        assert db.task_stats(by=("provider",))[0]["provider"] == "codex"
+        assert db.task_stats(by=(), skill="qa", provider="codex")[0]["runs"] == 50
+        assert db.task_stats(by=(), since="2999-01-01") == []
+
+    def test_duration_starts_at_first_heartbeat(self, seed_project):
+        slot = db.reserve_slot("testproject", "gemini")
+        db.dispatch_task("testproject", "gemini", 80, "l", "qa", "running", reserved_slot=slot)
+        assert db.heartbeat(slot, _lease(slot)) is True
+        conn = sqlite3.connect(db.DB_PATH)
+        conn.execute(  # queued for an hour, running for five minutes
+            "UPDATE task_log SET started_at = strftime('%Y-%m-%dT%H:%M:%SZ', 'now', '-3600 seconds'), "
+            "run_started_at = strftime('%Y-%m-%dT%H:%M:%SZ', 'now', '-300 seconds')"
+        )
+        conn.commit()
+        conn.close()
+        db.heartbeat(slot, _lease(slot))  # later heartbeats keep the first stamp
+        db.finish_task(80, "done", 0)
+        assert db.task_stats(by=())[0]["avg_seconds"] == pytest.approx(300, abs=2)
+
+    def test_invalid_arguments(self, isolated_db):
+        with pytest.raises(ValueError):
+            db.task_stats("week")
+        with pytest.raises(ValueError):
+            db.task_stats(by=("task_label",))
+
+    def test_migration_backfills_history(self, seed_project):
+        _insert_finished("testproject", "old", "2026-01-05T10:00:00Z", "2026-01-05T10:20:00Z")
+        conn = sqlite3.connect(db.DB_PATH, isolation_level=None)
+        conn.execute("PRAGMA user_version = 4")
+        assert db.migrate(conn)[0] == 5
+        conn.close()
+        (row,) = db.task_stats(by=("project_id",))
+        assert row["runs"] == 1 and row["avg_seconds"] == pytest.approx(1200, abs=1)
+
+    def test_stats_read_only_rollups(self, isolated_db):
+        plan = _plan(
+            "SELECT SUM(runs) FROM task_stats WHERE grain = ? AND bucket >= ? AND project_id = ?",
+            ("day", "2026-10-01", "p"),
+        )
+        assert "task_log" not in plan and "PRIMARY KEY" in plan
+
+    def test_stats_cli(self, seed_project):
+        _run_for(1, 90, skill="qa")
+        out = subprocess.run(
+            [sys.executable, str(Path(VPS_DIR) / "db.py"), "stats", "--days", "7", "--by", "skill"],
+            env={**os.environ, "DB_PATH": db.DB_PATH},
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        (row,) = [json.loads(line) for line in out.splitlines()]
+        assert row["skill"] == "qa" and row["runs"] == 1
+
+
+# --- usage / cost ledger ---
+
+MODEL_USAGE = {
+    "claude-opus": {
+        "inputTokens": 100,
+        "outputTokens": 50,
+        "cacheReadInputTokens": 900,
+        "cacheCreationInputTokens": 10,
+        "costUSD": 1.25,
+    },
+    "claude-haiku": {"inputTokens": 20, "outputTokens": 5, "costUSD": 0.05},
+}
+
+
+class TestTaskUsage:
+    def test_per_model_rows_tied_to_task_log(self, seed_project):
+        db.log_task("testproject", "testproject:FTR-1", "autopilot", "running", 31)
+        assert (
+            db.record_usage(
+                "testproject", "testproject:FTR-1", "autopilot", {}, MODEL_USAGE, spec_id="FTR-1"
+            )
+            == 2
+        )
+        with db.read_db() as conn:
+            rows = conn.execute(
+                "SELECT model, pueue_id, task_log_id, input_tokens, cost_usd FROM task_usage "
+                "ORDER BY model"
+            ).fetchall()
+        assert [r["model"] for r in rows] == ["claude-haiku", "claude-opus"]
+        assert {r["pueue_id"] for r in rows} == {31} and rows[0]["task_log_id"] is not None
+        assert rows[1]["input_tokens"] == 100 and rows[1]["cost_usd"] == 1.25
+
+    def test_rerecord_replaces_run(self, seed_project):
+        db.log_task("testproject", "testproject:FTR-1", "autopilot", "running", 32)
+        db.record_usage("testproject", "testproject:FTR-1", "autopilot", {}, MODEL_USAGE)
+        db.record_usage("testproject", "testproject:FTR-1", "autopilot", {}, MODEL_USAGE)
+        assert db.usage_summary("project")[0]["runs"] == 1
+
+    def test_totals_row_without_model_breakdown(self, seed_project):
+        usage = {"input_tokens": 7, "output_tokens": 3, "cost_usd": 0.5}
+        assert db.record_usage(None, None, "spark", usage, project_dir="/tmp/test-project") == 1
+        (row,) = db.usage_summary("project")
+        assert row["key"] == "testproject"
+        assert (row["input_tokens"], row["output_tokens"], row["cost_usd"]) == (7, 3, 0.5)
+
+    def test_summaries(self, seed_project):
+        for i, (skill, spec) in enumerate([("autopilot", "FTR-1"), ("qa", "FTR-1"), ("qa", None)]):
+            label = f"testproject:run-{i}"
+            db.log_task("testproject", label, skill, "running", 40 + i)
+            db.record_usage("testproject", label, skill, {}, MODEL_USAGE, spec_id=spec)
+        by_skill = {r["key"]: r for r in db.usage_summary("skill")}
+        assert by_skill["qa"]["runs"] == 2 and by_skill["qa"]["cost_usd"] == 2.6
+        assert {r["key"]: r["runs"] for r in db.usage_summary("spec")} == {"FTR-1": 2, "": 1}
+        assert db.usage_summary("model")[0]["key"] == "claude-opus"
+        (day,) = db.usage_summary("day")
+        assert day["runs"] == 3 and len(day["key"]) == 10
+        assert db.usage_summary("project", since="2999-01-01") == []
+        with pytest.raises(ValueError):
+            db.usage_summary("provider")
+
+    def test_summary_by_project_uses_index(self, isolated_db):
+        plan = _plan(
+            "SELECT SUM(cost_usd) FROM task_usage WHERE project_id = ? AND recorded_at >= ?",
+            ("p", "2026-01-01"),
+        )
+        assert "idx_task_usage_project_time" in plan
+
+
+# --- PRAGMA profile + WAL checkpointing ---
+
+
+class TestPragmaProfile:
+    def test_defaults_applied(self, isolated_db):
+        with db.get_db() as conn:
+            assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+            assert conn.execute("PRAGMA cache_size").fetchone()[0] == -16000
+            assert conn.execute("PRAGMA wal_autocheckpoint").fetchone()[0] == 1000
+
+    def test_env_overrides(self, isolated_db, monkeypatch):
+        monkeypatch.setenv("DB_SYNCHRONOUS", "full")
+        monkeypatch.setenv("DB_CACHE_SIZE", "-2000")
+        monkeypatch.setenv("DB_WAL_AUTOCHECKPOINT", "0")
+        db.close_db()
+        with db.get_db() as conn:
+            assert conn.execute("PRAGMA synchronous").fetchone()[0] == 2
+            assert conn.execute("PRAGMA cache_size").fetchone()[0] == -2000
+            assert conn.execute("PRAGMA wal_autocheckpoint").fetchone()[0] == 0
+        with db.read_db() as conn:
+            assert conn.execute("PRAGMA cache_size").fetchone()[0] == -2000
+
+    def test_invalid_synchronous_falls_back(self, monkeypatch):
+        monkeypatch.setenv("DB_SYNCHRONOUS", "sometimes")
+        assert db.pragma_profile()["synchronous"] == "NORMAL"
+
+
+class TestWalCheckpointer:
+    def _write(self, n=50):
+        for i in range(n):
+            db.log_task("testproject", f"t{i}", "autopilot", "running", i)
+
+    def test_wal_stats_reports_lag_while_reader_pins_snapshot(self, seed_project):
+        reader = sqlite3.connect(db.DB_PATH)
+        reader.execute("BEGIN")
+        reader.execute("SELECT COUNT(*) FROM task_log").fetchone()
+        self._write()
+        stats = db.wal_stats()
+        assert stats["wal_bytes"] > 0 and stats["lag_frames"] > 0
+        reader.rollback()
+        reader.close()
+        assert db.wal_stats()["lag_frames"] == 0
+
+    def test_truncate_only_when_idle(self, seed_project):
+        self._write()
+        cp = db.WalCheckpointer(interval=3600)
+        first = cp.tick()  # copies everything, but the WAL just grew: not idle yet
+        assert first["lag_frames"] == 0 and first["wal_bytes"] > 0
+        cp.tick()  # unchanged since last tick: idle -> TRUNCATE
+        assert Path(db.DB_PATH + "-wal").stat().st_size == 0
+        assert cp.metrics()["wal_bytes"] == 0 and "truncated_at" in cp.metrics()
+
+    def test_truncate_skipped_while_reader_active(self, seed_project):
+        self._write()
+        reader = sqlite3.connect(db.DB_PATH)
+        reader.execute("BEGIN")
+        reader.execute("SELECT COUNT(*) FROM task_log").fetchone()  # snapshot in the WAL
+        cp = db.WalCheckpointer(interval=3600, busy_ms=10)
+        cp.tick()
+        cp.tick()
+        assert "truncated_at" not in cp.metrics()
+        assert Path(db.DB_PATH + "-wal").stat().st_size > 0
+        reader.rollback()
+        reader.close()
+
+    def test_thread_stops(self, isolated_db):
+        cp = db.WalCheckpointer(interval=0.01)
+        cp.start()
+        time.sleep(0.05)
+        cp.stop()
+        cp.join(timeout=2)
+        assert not cp.is_alive() and "wal_bytes" in cp.metrics()
+
+
+class TestRecordLogPath:
+    def test_tied_to_latest_unfinished_run_of_label(self, seed_project):
+        db.log_task("testproject", "testproject:FTR-1", "autopilot", "done", 10)
+        db.finish_task(10, "done", 0)
+        db.log_task("testproject", "testproject:FTR-1", "autopilot", "running", 11)
+        assert db.record_log_path("testproject:FTR-1", "/logs/p-1.log")
+        assert db.get_task_by_pueue_id(11)["log_path"] == "/logs/p-1.log"
+        assert db.get_task_by_pueue_id(10)["log_path"] is None
+
+    def test_no_running_task(self, seed_project):
+        assert db.record_log_path("testproject:nope", "/logs/x.log") is False
+
+
+# --- callback job queue ---
+
+
+def _age_job(job_id, column, seconds):
+    """Move a callback_jobs timestamp `seconds` into the past."""
+    conn = sqlite3.connect(db.DB_PATH)
+    conn.execute(
+        f"UPDATE callback_jobs SET {column} = strftime('%Y-%m-%dT%H:%M:%SZ', 'now', ?) "
+        "WHERE id = ?",
+        (f"-{seconds} seconds", job_id),
+    )
+    conn.commit()
+    conn.close()
+
+
+class TestCallbackJobs:
+    def test_enqueue_is_idempotent_per_run_and_step(self, isolated_db):
+        steps = [("phase", {"status": "done"}), ("output", {})]
+        assert db.enqueue_jobs(7, "7.1", steps) == 2
+        assert db.enqueue_jobs(7, "7.1", steps) == 0
+        assert db.enqueue_jobs(7, "7.2", steps[:1]) == 1  # same pueue id, new run
+
+    def test_claim_oldest_first_with_payload(self, isolated_db):
+        db.enqueue_jobs(7, "7.1", [("phase", {"status": "done"}), ("output", {})])
+        job = db.claim_job()
+        assert (job["step"], job["status"], job["attempts"]) == ("phase", "running", 1)
+        assert job["payload"] == {"status": "done"} and job["job_key"] == "7.1:phase"
+        assert db.claim_job()["step"] == "output"
+        assert db.claim_job() is None
+
+    def test_failure_backs_off_then_dies(self, isolated_db, monkeypatch):
+        monkeypatch.setenv("CALLBACK_JOB_ATTEMPTS", "2")
+        db.enqueue_jobs(7, "7.1", [("qa", {})])
+        job = db.claim_job()
+        assert db.finish_job(job["id"], 12, "boom") == "queued"
+        assert db.claim_job() is None  # not due yet
+        assert 0 < db.next_job_delay() <= db.job_backoff()
+        _age_job(job["id"], "run_after", db.job_backoff())
+        job = db.claim_job()
+        assert job["attempts"] == 2
+        assert db.finish_job(job["id"], 15, "boom") == "dead"
+        assert db.next_job_delay() is None
+        assert db.retry_jobs("qa") == 1
+        assert db.claim_job()["attempts"] == 1
+
+    def test_coalesce_merges_into_queued_batch_only(self, isolated_db):
+        first = db.coalesce_job("git_push", "/r", {"files": ["a"], "repo": "/r"}, delay=60)
+        assert db.coalesce_job("git_push", "/r", {"files": ["a", "b"]}) == first
+        other = db.coalesce_job("git_push", "/r2", {"files": ["c"]})
+        assert other != first
+        assert db.next_job_delay() == 0  # /r2 due now, /r keeps its window
+        assert db.claim_job()["payload"] == {"files": ["c"]}
+        _age_job(first, "run_after", 60)
+        job = db.claim_job()
+        assert job["id"] == first and job["payload"] == {"files": ["a", "b"], "repo": "/r"}
+        # Claimed: the next fix starts a new batch.
+        assert db.coalesce_job("git_push", "/r", {"files": ["d"]}) not in (first, other)
+
+    def test_claim_by_step_and_flush_window(self, isolated_db):
+        batch = db.coalesce_job("git_push", "/r", {"files": ["a"]}, delay=60)
+        db.enqueue_jobs(7, "7.1", [("phase", {})])
+        assert db.claim_job(steps=("git_push",)) is None  # batch window still open
+        assert db.next_job_delay(steps=("git_push",)) > 0
+        assert db.next_job_delay(exclude=("git_push",)) == 0
+        assert db.claim_job(steps=("git_push",), flush=True)["id"] == batch
+        db.finish_job(batch, 5, "push failed")
+        assert db.claim_job(steps=("git_push",), flush=True) is None  # backoff still applies
+        assert db.claim_job(exclude=("git_push",))["step"] == "phase"
+
+    def test_stale_running_job_requeued(self, isolated_db):
+        db.enqueue_jobs(7, "7.1", [("output", {})])
+        job = db.claim_job()
+        assert db.requeue_stale_jobs() == 0
+        _age_job(job["id"], "started_at", db.job_timeout() + 1)
+        assert db.requeue_stale_jobs() == 1
+        assert db.claim_job()["attempts"] == 2
+
+    def test_stats_and_prune(self, isolated_db):
+        db.enqueue_jobs(7, "7.1", [("phase", {}), ("qa", {})])
+        db.finish_job(db.claim_job()["id"], 40)
+        db.finish_job(db.claim_job()["id"], 900, "boom")
+        stats = {r["step"]: r for r in db.job_stats()}
+        assert stats["phase"]["done"] == 1 and stats["phase"]["avg_ms"] == 40
+        assert stats["qa"]["queued"] == 1 and stats["qa"]["max_ms"] == 900
+        assert db.prune_jobs(days=1) == 0
+        _age_job(1, "finished_at", 2 * 86400)
+        assert db.prune_jobs(days=1) == 1
+        assert [r["step"] for r in db.job_stats()] == ["qa"]
+
+
+# --- schema migrations (PRAGMA user_version) + query plans ---
+
+
+def _plan(sql: str, params=()) -> str:
+    with db.get_db() as conn:
+        rows = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    return " | ".join(r["detail"] for r in rows)
+
+
+class TestMigrations:
+    def test_first_connection_migrates_to_latest(self, isolated_db):
+        with db.get_db() as conn:
+            assert conn.execute("PRAGMA user_version").fetchone()[0] == db.SCHEMA_VERSION
+
+    def test_migrate_is_idempotent(self, isolated_db):
+        conn = db._connect()
+        assert db.migrate(conn) == []
+        conn.close()
+
+    def test_applies_pending_only(self, isolated_db):
+        conn = sqlite3.connect(str(isolated_db), isolation_level=None)
+        conn.execute("PRAGMA user_version = 0")
+        conn.execute("DROP INDEX IF EXISTS idx_task_log_pueue_id")
+        assert db.migrate(conn) == [v for v, _n, _s in db.MIGRATIONS]
+        assert conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'idx_task_log_pueue_id'"
+        ).fetchone()
+        conn.close()
+
+    def test_skips_db_without_base_schema(self, tmp_path):
+        conn = sqlite3.connect(str(tmp_path / "empty.db"), isolation_level=None)
+        assert db.migrate(conn) == []
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == 0
+        conn.close()
+
+    def test_lease_reclaim_uses_index(self, isolated_db):
+        plan = _plan(
+            "UPDATE compute_slots SET project_id = NULL WHERE lease_expires_at < ?",
+            ("2026-01-01T00:00:00Z",),
+        )
+        assert "idx_compute_slots_lease" in plan
+
+    def test_job_claim_uses_due_index(self, isolated_db):
+        plan = _plan(
+            "SELECT id FROM callback_jobs WHERE status = 'queued' AND run_after <= ? "
+            "ORDER BY run_after, id LIMIT 1",
+            ("2026-01-01T00:00:00Z",),
+        )
+        assert "idx_callback_jobs_due" in plan
+
+    def test_release_slot_uses_pueue_index(self, isolated_db):
+        plan = _plan("SELECT slot_number, project_id FROM compute_slots WHERE pueue_id = ?", (1,))
+        assert "idx_compute_slots_pueue_id" in plan
+
+    def test_task_log_pueue_lookups_use_index(self, isolated_db):
+        plan = _plan(
+            "SELECT project_id, task_label, skill FROM task_log "
+            "WHERE pueue_id = ? ORDER BY id DESC LIMIT 1",
+            (1,),
+        )
+        assert "idx_task_log_pueue_id" in plan
+        assert "TEMP B-TREE" not in plan
+        plan = _plan(
+            "UPDATE task_log SET status = 'done' WHERE pueue_id = ? AND finished_at IS NULL", (1,)
+        )
+        assert "idx_task_log_pueue_id" in plan
+
+    def test_new_findings_use_project_status_index(self, isolated_db):
+        plan = _plan(
+            "SELECT * FROM night_findings WHERE project_id = ? AND status = 'new' ORDER BY id",
+            ("p",),
+        )
+        assert "idx_night_findings_project_status" in plan
+        assert "TEMP B-TREE" not in plan
+
+
+# --- task_log archival ---
+
+
+def _insert_finished(project_id, label, started, finished, exit_code=0, summary="x"):
+    conn = sqlite3.connect(db.DB_PATH)
+    conn.execute(
+        "INSERT INTO task_log (project_id, task_label, skill, status, started_at, finished_at, "
+        "exit_code, output_summary) VALUES (?, ?, 'autopilot', 'done', ?, ?, ?, ?)",
+        (project_id, label, started, finished, exit_code, summary),
+    )
+    conn.commit()
+    conn.close()
+
+
+class TestArchiveTaskLog:
+    @pytest.fixture
+    def history(self, seed_project):
+        _insert_finished("testproject", "a", "2025-01-10T10:00:00Z", "2025-01-10T10:10:00Z")
+        _insert_finished("testproject", "b", "2025-01-20T10:00:00Z", "2025-01-20T10:05:00Z", 1)
+        _insert_finished("testproject", "c", "2025-02-01T00:00:00Z", "2025-02-01T00:01:00Z")
+        db.log_task("testproject", "running", "autopilot", "running", pueue_id=5)
+        db.log_task("testproject", "recent", "autopilot", "running", pueue_id=6)
+        db.finish_task(6, "done", 0)
+        return seed_project
+
+    def _labels(self, path):
+        conn = sqlite3.connect(str(path))
+        labels = sorted(r[0] for r in conn.execute("SELECT task_label FROM task_log"))
+        conn.close()
+        return labels
+
+    def test_moves_old_finished_rows_to_monthly_archives(self, history, tmp_path):
+        archive = tmp_path / "archive"
+        stats = db.archive_task_log(days=30, archive_dir=str(archive))
+        assert stats["archived"] == 3
+        assert stats["months"] == ["2025-01", "2025-02"]
+        assert self._labels(archive / "task_log-2025-01.db") == ["a", "b"]
+        assert self._labels(archive / "task_log-2025-02.db") == ["c"]
+        assert self._labels(db.DB_PATH) == ["recent", "running"]
+
+    def test_archive_keeps_provider_and_log_path(self, history, tmp_path):
+        archive = tmp_path / "archive"
+        archive.mkdir()
+        old = sqlite3.connect(str(archive / "task_log-2025-01.db"))  # pre-migration layout
+        old.execute(
+            "CREATE TABLE task_log (id INTEGER PRIMARY KEY, project_id TEXT NOT NULL, "
+            "task_label TEXT NOT NULL, skill TEXT, status TEXT, pueue_id INTEGER, "
+            "started_at TEXT, finished_at TEXT, exit_code INTEGER, output_summary TEXT)"
+        )
+        old.close()
+        conn = sqlite3.connect(db.DB_PATH)
+        conn.execute(
+            "UPDATE task_log SET provider = 'claude', log_path = '/l/a.log' WHERE task_label = 'a'"
+        )
+        conn.commit()
+        conn.close()
+        db.archive_task_log(days=30, archive_dir=str(archive))
+        conn = sqlite3.connect(str(archive / "task_log-2025-01.db"))
+        row = conn.execute(
+            "SELECT provider, log_path FROM task_log WHERE task_label = 'a'"
+        ).fetchone()
+        conn.close()
+        assert row == ("claude", "/l/a.log")
+
+    def test_rollup_keeps_summary(self, history, tmp_path):
+        db.archive_task_log(days=30, archive_dir=str(tmp_path / "archive"))
+        with db.get_db() as conn:
+            row = conn.execute(
+                "SELECT runs, failures, total_seconds FROM task_log_rollup WHERE month = '2025-01'"
+            ).fetchone()
+        assert tuple(row) == (2, 1, 900)
+
+    def test_rerun_is_noop(self, history, tmp_path):
+        db.archive_task_log(days=30, archive_dir=str(tmp_path / "archive"))
+        again = db.archive_task_log(days=30, archive_dir=str(tmp_path / "archive"))
+        assert again == {"archived": 0, "months": [], "freed_pages": 0}
+        with db.get_db() as conn:
+            assert conn.execute("SELECT SUM(runs) FROM task_log_rollup").fetchone()[0] == 3
+
+    def _auto_vacuum(self):
+        conn = sqlite3.connect(db.DB_PATH)
+        try:
+            return conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_archive_never_runs_full_vacuum(self, history, tmp_path):
+        stats = db.archive_task_log(days=30, archive_dir=str(tmp_path / "archive"))
+        assert stats["freed_pages"] == 0 and self._auto_vacuum() == 0
+
+    def test_explicit_convert_then_bounded_incremental_vacuum(self, history, tmp_path):
+        assert db.convert_auto_vacuum() >= 0
+        assert self._auto_vacuum() == 2
+        assert db.convert_auto_vacuum() == 0  # already converted
+        with db.get_db() as conn:
+            conn.executemany(
+                "INSERT INTO task_log (project_id, task_label, output_summary) VALUES (?, ?, ?)",
+                [("testproject", f"big{i}", "x" * 4000) for i in range(50)],
+            )
+            conn.execute("DELETE FROM task_log WHERE task_label LIKE 'big%'")
+        conn = db._connect()
+        try:
+            assert db._incremental_vacuum(conn, max_pages=5) == 5
+            assert conn.execute("PRAGMA freelist_count").fetchone()[0] > 0
+        finally:
+            conn.close()
+
+
+# --- bulk findings ingest ---
+
+FINDINGS = [
+    {"file": "a.py", "issue_type": "sql", "description": "d1", "severity": "high", "line": 12},
+    {"file": "b.py", "issue_type": "xss", "description": "d2", "suggestion": "escape"},
+    {"file": "a.py", "issue_type": "sql", "description": "same fingerprint as #0"},
+]
+
+
+class TestIngestFindings:
+    def test_fingerprint_matches_shell_hash(self):
+        shell = subprocess.run(
+            "printf '%s%s%s' p a.py sql | sha256sum | cut -d' ' -f1",
+            shell=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+        assert db.finding_fingerprint("p", "a.py", "sql") == shell
+
+    def test_inserts_once_and_reports_duplicates(self, seed_project):
+        results = db.ingest_findings("testproject", FINDINGS)
+        assert [r["result"] for r in results] == ["inserted", "inserted", "duplicate"]
+        assert results[0]["id"] == results[2]["id"]
+        again = db.ingest_findings("testproject", FINDINGS[:2])
+        assert [r["result"] for r in again] == ["duplicate", "duplicate"]
+        rows = db.get_new_findings("testproject")
+        assert len(rows) == 2
+        assert rows[0]["line_range"] == "12" and rows[0]["severity"] == "high"
+        assert rows[1]["confidence"] == "medium" and rows[1]["suggestion"] == "escape"
+
+    def test_invalid_entries_reported(self, seed_project):
+        results = db.ingest_findings("testproject", [None, "x", FINDINGS[0]])
+        assert [r["result"] for r in results] == ["invalid", "invalid", "inserted"]
+
+    def test_parse_array_and_ndjson(self):
+        assert db.parse_findings(json.dumps(FINDINGS)) == FINDINGS
+        ndjson = "\n".join(json.dumps(f) for f in FINDINGS[:2]) + "\n{broken\n\n"
+        assert db.parse_findings(ndjson) == FINDINGS[:2] + [None]
+        assert db.parse_findings("  ") == []
+
+    def test_cli_streams_results(self, seed_project, isolated_db):
+        script = Path(VPS_DIR) / "db.py"
+        r = subprocess.run(
+            [sys.executable, str(script), "ingest-findings", "testproject"],
+            input=json.dumps(FINDINGS),
+            capture_output=True,
+            text=True,
+            env={**os.environ, "DB_PATH": str(isolated_db)},
+        )
+        assert r.returncode == 0, r.stderr
+        lines = [json.loads(line) for line in r.stdout.splitlines()]
+        assert [x["result"] for x in lines] == ["inserted", "inserted", "duplicate"]
+
+
+# --- command server (db.py serve) + db-client.sh ---
+
+
+class TestCommandServer:
+    def _call(self, **req):
+        return json.loads(db.handle_request(json.dumps(req)))
+
+    def test_commands(self, seed_project):
+        assert self._call(cmd="ping") == {"ok": True, "result": "pong"}
+        assert self._call(cmd="update-phase", project_id="testproject", phase="night")["ok"]
+        project = self._call(cmd="get-project", project_id="testproject", id=7)
+        assert project["id"] == 7 and project["result"]["phase"] == "night"
+        saved = self._call(
+            cmd="save-finding", project_id="testproject", fingerprint="fp1", summary="s"
+        )
+        assert saved["result"] == 1
+        new = self._call(cmd="get-new-findings", project_id="testproject")["result"]
+        assert [f["fingerprint"] for f in new] == ["fp1"]
+        ingested = self._call(cmd="ingest-findings", project_id="testproject", findings=FINDINGS)
+        assert [r["result"] for r in ingested["result"]] == ["inserted", "inserted", "duplicate"]
+
+    def test_update_phase_current_task_optional(self, seed_project):
+        db.update_project_phase("testproject", "autopilot", "FTR-1")
+        self._call(cmd="update-phase", project_id="testproject", phase="qa")
+        assert db.get_project_state("testproject")["current_task"] == "FTR-1"
+        self._call(cmd="update-phase", project_id="testproject", phase="idle", current_task=None)
+        assert db.get_project_state("testproject")["current_task"] is None
+
+    def test_errors_are_replies(self, isolated_db):
+        assert self._call(cmd="nope")["ok"] is False
+        assert self._call(cmd="get-project") == {"ok": False, "error": "missing field: project_id"}
+        assert json.loads(db.handle_request("{not json"))["ok"] is False
+
+    def test_serve_stream(self, seed_project):
+        out = io.StringIO()
+        db.serve_stream(io.StringIO('{"cmd": "ping"}\n\n{"cmd": "ping", "id": "a"}\n'), out)
+        replies = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert replies == [
+            {"ok": True, "result": "pong"},
+            {"ok": True, "result": "pong", "id": "a"},
+        ]
+
+    def test_serve_socket(self, seed_project, isolated_db, tmp_path):
+        sock_path = str(tmp_path / "db.sock")
+        proc = subprocess.Popen(
+            [sys.executable, str(Path(VPS_DIR) / "db.py"), "serve", "--socket", sock_path],
+            env={**os.environ, "DB_PATH": str(isolated_db)},
+        )
+        try:
+            for _ in range(100):
+                if os.path.exists(sock_path):
+                    break
+                time.sleep(0.05)
+            with socket.socket(socket.AF_UNIX) as sock:
+                sock.connect(sock_path)
+                f = sock.makefile("rw")
+                f.write('{"cmd": "get-project", "project_id": "testproject"}\n')
+                f.flush()
+                assert json.loads(f.readline())["result"]["project_id"] == "testproject"
+        finally:
+            proc.terminate()
+            proc.wait(timeout=5)
+        assert not os.path.exists(sock_path)
+
+    def test_shell_client(self, seed_project, isolated_db):
+        script = """
+            source "$VPS_DIR/db-client.sh"
+            db_start
+            db_call update-phase project_id=testproject phase='a "quoted"
+            phase' >/dev/null
+            path=$(db_call get-project project_id=testproject)
+            echo "$path"
+            db_call ingest-findings project_id=testproject findings:='[{"file": "x"}]'
+            db_call nope >/dev/null || echo "nope failed"
+            db_stop
+            db_call ping
+        """
+        r = subprocess.run(
+            ["bash", "-c", script],
+            capture_output=True,
+            text=True,
+            env={**os.environ, "DB_PATH": str(isolated_db), "VPS_DIR": VPS_DIR},
+            timeout=30,
+        )
+        assert r.returncode == 0, r.stderr
+        lines = r.stdout.splitlines()
+        assert json.loads(lines[0])["result"]["phase"] == 'a "quoted"\n            phase'
+        assert json.loads(lines[1])["result"][0]["result"] == "inserted"
+        assert lines[2] == "nope failed"
+        assert json.loads(lines[3]) == {"ok": True, "result": "pong"}  # one-shot fallback
+
+
 # --- Note: callback CLI removed in ARCH-161 (moved to standalone callback.py) ---
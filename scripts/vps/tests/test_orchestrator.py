@@ -1,14 +1,22 @@
 # scripts/vps/tests/test_orchestrator.py
 """Unit tests for orchestrator watchdog functions (BUG-162).
 
-Covers: get_live_pueue_ids, release_orphan_slots, get_occupied_slots (db.py).
+Covers: get_live_pueue_ids, release_orphan_slots (incl. lapsed slot leases),
+get_occupied_slots (db.py),
+per-cycle PueueSnapshot (pueue_state.py), process_all_projects worker pool,
+scan_inbox change index, git_pull remote fast path.
 """
 
 import json
+import subprocess
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 
+import pytest
+
 
 VPS_DIR = str(Path(__file__).resolve().parent.parent)
 if VPS_DIR not in sys.path:
@@ -16,6 +24,9 @@ if VPS_DIR not in sys.path:
 
 import db
 import orchestrator
+from pueue_state import PueueSnapshot
+from scheduler import WorkItem
+import watcher
 
 
 # --- EC-7: get_occupied_slots returns correct data ---
@@ -300,6 +311,26 @@ class TestReleaseOrphanSlots:
             released = orchestrator.release_orphan_slots()
         assert released == 0
 
+    def test_lapsed_lease_reclaimed_without_pueue(self, seed_project):
+        """Runner stopped heartbeating → slot freed even while pueue is unreachable."""
+        slot = db.reserve_slot("testproject", "claude")
+        db.dispatch_task("testproject", "claude", 60, "l", "qa", "running", reserved_slot=slot)
+        assert db.heartbeat(slot, db.lease_env(slot)["DLD_LEASE_TOKEN"], ttl=-1)
+        with patch("orchestrator.get_live_pueue_ids", return_value=None):
+            orchestrator.release_orphan_slots()
+        assert db.get_occupied_slots() == []
+
+    def test_live_lease_not_checked_against_pueue(self, seed_project):
+        """A heartbeating task is trusted even if the pueue view misses it."""
+        slot = db.reserve_slot("testproject", "claude")
+        db.dispatch_task("testproject", "claude", 61, "l", "qa", "running", reserved_slot=slot)
+        db.heartbeat(slot, db.lease_env(slot)["DLD_LEASE_TOKEN"])
+        with patch("orchestrator.get_live_pueue_ids", return_value=set()) as live:
+            released = orchestrator.release_orphan_slots()
+        assert released == 0
+        live.assert_not_called()
+        assert db.get_occupied_slots()[0]["pueue_id"] == 61
+
 
 # --- EC-8: Integration test (no mocks for DB) ---
 
@@ -316,3 +347,338 @@ class TestWatchdogIntegration:
             released = orchestrator.release_orphan_slots()
         assert released == 1
         assert db.get_available_slots("claude") == initial_available
+
+
+# --- Per-cycle pueue snapshot ---
+
+
+class TestPueueSnapshot:
+    def _status(self, tasks: dict) -> MagicMock:
+        m = MagicMock()
+        m.returncode = 0
+        m.stdout = json.dumps({"tasks": tasks})
+        return m
+
+    def test_one_pueue_call_per_cycle(self, monkeypatch):
+        """All lookups within a cycle share one `pueue status --json`."""
+        tasks = {
+            "1": {"status": {"Running": {}}, "label": "alpha:FTR-1"},
+            "2": {"status": {"Queued": {}}, "label": "beta:inbox-1"},
+            "3": {"status": {"Done": {"result": "Success"}}, "label": "gamma:BUG-2"},
+        }
+        with patch("orchestrator.subprocess.run", return_value=self._status(tasks)) as run:
+            orchestrator.refresh_pueue_snapshot()
+            try:
+                assert orchestrator.get_live_pueue_ids() == {1, 2}
+                assert orchestrator.is_agent_running("alpha") is True
+                assert orchestrator.is_agent_running("beta") is False  # queued, not running
+                assert orchestrator.pueue_has_active_label("beta:inbox-1") is True
+                assert orchestrator.pueue_has_active_label("gamma:BUG-2") is False
+            finally:
+                monkeypatch.setattr(orchestrator, "_pueue", None)
+        assert run.call_count == 1
+
+    def test_pueue_add_updates_snapshot(self, monkeypatch):
+        """A task submitted by the orchestrator is visible without re-fetching."""
+        add = MagicMock()
+        add.stdout = "17\n"
+        with patch("orchestrator.subprocess.run", return_value=self._status({})):
+            orchestrator.refresh_pueue_snapshot()
+        try:
+            with patch("orchestrator.subprocess.run", return_value=add) as run:
+                assert orchestrator._pueue_add("claude-runner", "proj:FTR-9", ["true"]) == 17
+                assert orchestrator.pueue_has_active_label("proj:FTR-9") is True
+                assert 17 in orchestrator.get_live_pueue_ids()
+            assert run.call_count == 1  # only the `pueue add`
+        finally:
+            monkeypatch.setattr(orchestrator, "_pueue", None)
+
+    def test_unreachable_snapshot(self):
+        """Failed fetch → live_ids None (watchdog skips), label check fails open."""
+        with patch("orchestrator.subprocess.run", side_effect=OSError("no pueue")):
+            snap = PueueSnapshot.fetch()
+        assert snap.ok is False
+        assert snap.live_ids() is None
+        assert snap.has_active_label("proj:X") is False
+        assert snap.is_project_running("proj") is False
+
+
+# --- Parallel per-project processing ---
+
+
+class TestProcessAllProjects:
+    @pytest.fixture(autouse=True)
+    def _reset(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(orchestrator, "_in_flight", {})
+        monkeypatch.setattr(orchestrator, "SCRIPT_DIR", tmp_path)
+
+    def _projects(self, *ids):
+        return [{"project_id": p, "path": f"/tmp/{p}"} for p in ids]
+
+    def test_slow_project_does_not_block_others(self):
+        """A stuck project hits the deadline; the rest finish independently."""
+        release = threading.Event()
+        done = []
+
+        def fake_process(pid, _pdir):
+            if pid == "slow":
+                release.wait(5)
+            done.append(pid)
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            with patch("orchestrator.process_project", side_effect=fake_process):
+                pending = orchestrator.process_all_projects(
+                    pool, self._projects("slow", "b", "c"), deadline=0.5
+                )
+                assert pending == 1
+                assert sorted(done) == ["b", "c"]
+                # Next cycle skips the project that is still in flight
+                pending = orchestrator.process_all_projects(
+                    pool, self._projects("slow", "b"), deadline=2
+                )
+                assert pending == 0
+                assert done.count("b") == 2
+                release.set()
+
+    def test_project_exception_is_isolated(self):
+        """One project raising does not prevent the others from running."""
+        done = []
+
+        def fake_process(pid, _pdir):
+            if pid == "bad":
+                raise RuntimeError("boom")
+            done.append(pid)
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            with patch("orchestrator.process_project", side_effect=fake_process):
+                pending = orchestrator.process_all_projects(
+                    pool, self._projects("a", "bad", "z"), deadline=5
+                )
+        assert pending == 0
+        assert sorted(done) == ["a", "z"]
+
+    def test_run_now_trigger_consumed(self, tmp_path):
+        (tmp_path / ".run-now-a").write_text("")
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            with patch("orchestrator.process_project"):
+                orchestrator.process_all_projects(pool, self._projects("a"), deadline=5)
+        assert not (tmp_path / ".run-now-a").exists()
+
+
+# --- Incremental inbox scanning ---
+
+
+class TestInboxScanIndex:
+    @pytest.fixture(autouse=True)
+    def _reset(self, monkeypatch):
+        monkeypatch.setattr(orchestrator, "_inbox_index", {})
+        monkeypatch.setattr(orchestrator, "inbox_scan_stats", {})
+
+    @pytest.fixture
+    def inbox(self, tmp_path):
+        d = tmp_path / "ai" / "inbox"
+        d.mkdir(parents=True)
+        for i in range(3):
+            (d / f"2026010{i}-idea.md").write_text(f"# idea {i}\n**Status:** processing\n")
+        return d
+
+    def test_unchanged_files_are_not_read(self, inbox, tmp_path):
+        assert orchestrator.scan_inbox("proj", str(tmp_path)) == 0
+        assert orchestrator.inbox_scan_stats["proj"] == {"read": 3, "skipped": 0}
+
+        with patch.object(Path, "read_text", side_effect=AssertionError("read")):
+            assert orchestrator.scan_inbox("proj", str(tmp_path)) == 0
+        assert orchestrator.inbox_scan_stats["proj"] == {"read": 0, "skipped": 3}
+
+    def test_modified_file_is_reread(self, inbox, tmp_path):
+        orchestrator.scan_inbox("proj", str(tmp_path))
+        (inbox / "20260101-idea.md").write_text("# idea 1 (edited)\n**Status:** done\n")
+        orchestrator.scan_inbox("proj", str(tmp_path))
+        assert orchestrator.inbox_scan_stats["proj"] == {"read": 1, "skipped": 2}
+
+    def test_deleted_file_drops_out_of_index(self, inbox, tmp_path):
+        orchestrator.scan_inbox("proj", str(tmp_path))
+        (inbox / "20260102-idea.md").unlink()
+        orchestrator.scan_inbox("proj", str(tmp_path))
+        assert len(orchestrator._inbox_index["proj"]) == 2
+
+    def test_new_file_is_dispatched_not_indexed(self, inbox, tmp_path, seed_project, monkeypatch):
+        monkeypatch.setattr(orchestrator, "SCRIPT_DIR", tmp_path)
+        orchestrator.scan_inbox("testproject", str(tmp_path))
+        (inbox / "20260109-new.md").write_text("**Status:** new\n**Route:** spark\n---\nBuild X\n")
+        with (
+            patch("orchestrator.pueue_has_active_label", return_value=False),
+            patch("orchestrator._pueue_add", return_value=321) as add,
+        ):
+            assert orchestrator.scan_inbox("testproject", str(tmp_path)) == 1
+        add.assert_called_once()
+        assert orchestrator.inbox_scan_stats["testproject"] == {"read": 1, "skipped": 3}
+        assert not any(p.endswith("-new.md") for p in orchestrator._inbox_index["testproject"])
+        assert (inbox / "done" / "20260109-new.md").is_file()
+
+    @pytest.mark.parametrize("mode", ["poll", "inotify"])
+    def test_processing_an_item_does_not_wake_the_watcher(
+        self, inbox, tmp_path, seed_project, monkeypatch, mode
+    ):
+        monkeypatch.setattr(orchestrator, "SCRIPT_DIR", tmp_path)
+        (inbox / "20260109-new.md").write_text("**Status:** new\n**Route:** spark\n---\nBuild X\n")
+        changes = watcher.ChangeWatcher(threading.Event(), mode=mode, poll_interval=0.05)
+        if changes.backend != mode:
+            pytest.skip(f"{mode} not available")
+        changes.watch({str(inbox): [lambda name: "testproject" if name.endswith(".md") else None]})
+        changes.poll_once()  # polling baseline (no-op for inotify)
+        changes.start()
+        with (
+            patch("orchestrator.pueue_has_active_label", return_value=False),
+            patch("orchestrator._pueue_add", return_value=321),
+        ):
+            assert orchestrator.scan_inbox("testproject", str(tmp_path)) == 1
+        threading.Event().wait(0.3)
+        changes.stop()
+        assert changes.drain() == set()
+        assert "processing" in (inbox / "done" / "20260109-new.md").read_text()
+
+
+# --- reserve-then-submit: no pueue task without a slot ---
+
+
+class TestSlotReservation:
+    @pytest.fixture
+    def inbox(self, tmp_path, seed_project, monkeypatch):
+        monkeypatch.setattr(orchestrator, "_inbox_index", {})
+        monkeypatch.setattr(orchestrator, "inbox_scan_stats", {})
+        monkeypatch.setattr(orchestrator, "SCRIPT_DIR", tmp_path)
+        d = tmp_path / "ai" / "inbox"
+        d.mkdir(parents=True)
+        for i in range(3):
+            (d / f"2026020{i}-idea.md").write_text(f"**Status:** new\n---\nIdea {i}\n")
+        return d
+
+    def test_inbox_burst_bounded_by_slots(self, inbox, tmp_path):
+        ids = iter(range(900, 999))
+        with (
+            patch("orchestrator.pueue_has_active_label", return_value=False),
+            patch("orchestrator._pueue_add", side_effect=lambda *a, **k: next(ids)) as add,
+        ):
+            assert orchestrator.scan_inbox("testproject", str(tmp_path)) == 2
+        # schema.sql seeds two claude slots; the third item stays pending and unindexed
+        assert add.call_count == 2
+        pending = inbox / "20260202-idea.md"
+        assert "**Status:** new" in pending.read_text()
+        assert str(pending) not in orchestrator._inbox_index["testproject"]
+        assert {s["pueue_id"] for s in db.get_occupied_slots()} == {900, 901}
+
+    def test_failed_submission_returns_reservation(self, inbox, tmp_path):
+        with (
+            patch("orchestrator.pueue_has_active_label", return_value=False),
+            patch("orchestrator._pueue_add", return_value=None),
+        ):
+            orchestrator.scan_inbox("testproject", str(tmp_path))
+        assert db.get_slots_by_project() == {}
+
+    def test_dispatch_spec_without_slot_does_not_submit(self, seed_project):
+        db.reserve_slot("testproject", "claude")
+        db.reserve_slot("testproject", "claude")
+        item = WorkItem("testproject", "/tmp/test-project", "FTR-1", "claude")
+        with (
+            patch("orchestrator.pueue_has_active_label", return_value=False),
+            patch("orchestrator._pueue_add") as add,
+        ):
+            assert orchestrator.dispatch_spec(item) is False
+        add.assert_not_called()
+
+
+# --- git_pull fast path (local bare repo stands in for the remote) ---
+
+
+def _git(cwd, *args):
+    return subprocess.run(
+        ["git", "-C", str(cwd), *args], capture_output=True, text=True, check=True
+    ).stdout.strip()
+
+
+@pytest.fixture
+def git_remote(tmp_path, monkeypatch):
+    """Bare `origin` with a develop branch, a project clone and a second pusher clone."""
+    for k, v in {
+        "GIT_AUTHOR_NAME": "t",
+        "GIT_AUTHOR_EMAIL": "t@t",
+        "GIT_COMMITTER_NAME": "t",
+        "GIT_COMMITTER_EMAIL": "t@t",
+        "GIT_CONFIG_GLOBAL": "/dev/null",
+    }.items():
+        monkeypatch.setenv(k, v)
+    origin = tmp_path / "origin.git"
+    subprocess.run(["git", "init", "-q", "--bare", str(origin)], check=True)
+    seed = tmp_path / "seed"
+    subprocess.run(["git", "init", "-q", "-b", "develop", str(seed)], check=True)
+    (seed / "README.md").write_text("v1\n")
+    _git(seed, "add", ".")
+    _git(seed, "commit", "-q", "-m", "v1")
+    _git(seed, "remote", "add", "origin", str(origin))
+    _git(seed, "push", "-q", "origin", "develop")
+    project = tmp_path / "project"
+    subprocess.run(["git", "clone", "-q", "-b", "develop", str(origin), str(project)], check=True)
+    monkeypatch.setattr(orchestrator, "pull_stats", {})
+    monkeypatch.setattr(orchestrator, "is_agent_running", lambda _pid: False)
+    return seed, project
+
+
+class TestGitPullFastPath:
+    def test_unchanged_remote_skips_pull(self, git_remote):
+        _seed, project = git_remote
+        real_run = subprocess.run
+        calls = []
+
+        def spy(cmd, *a, **kw):
+            calls.append(cmd[3] if cmd[:1] == ["git"] else cmd[0])
+            return real_run(cmd, *a, **kw)
+
+        with patch("orchestrator.subprocess.run", side_effect=spy):
+            orchestrator.git_pull("proj", str(project))
+        assert orchestrator.pull_stats["proj"]["outcome"] == "unchanged"
+        assert "pull" not in calls and "diff" not in calls and "rebase" not in calls
+
+    def test_remote_advance_is_pulled(self, git_remote):
+        seed, project = git_remote
+        (seed / "README.md").write_text("v2\n")
+        _git(seed, "commit", "-qam", "v2")
+        _git(seed, "push", "-q", "origin", "develop")
+
+        orchestrator.git_pull("proj", str(project))
+        assert orchestrator.pull_stats["proj"]["outcome"] == "pulled"
+        assert _git(project, "rev-parse", "HEAD") == _git(seed, "rev-parse", "HEAD")
+        assert orchestrator.pull_stats["proj"]["ms"] >= 0
+
+        # Second cycle: nothing moved → fast path
+        orchestrator.git_pull("proj", str(project))
+        assert orchestrator.pull_stats["proj"]["outcome"] == "unchanged"
+
+    def test_dirty_tree_rebases_with_autostash(self, git_remote):
+        seed, project = git_remote
+        (seed / "other.txt").write_text("x\n")
+        _git(seed, "add", ".")
+        _git(seed, "commit", "-qm", "other")
+        _git(seed, "push", "-q", "origin", "develop")
+        (project / "README.md").write_text("local edit\n")
+
+        orchestrator.git_pull("proj", str(project))
+        assert orchestrator.pull_stats["proj"]["outcome"] == "rebased"
+        assert (project / "other.txt").is_file()
+        assert (project / "README.md").read_text() == "local edit\n"
+
+    def test_hung_ls_remote_falls_back_to_full_pull(self, git_remote):
+        seed, project = git_remote
+        (seed / "README.md").write_text("v2\n")
+        _git(seed, "commit", "-qam", "v2")
+        _git(seed, "push", "-q", "origin", "develop")
+        real_run = subprocess.run
+
+        def hung(cmd, *a, **kw):
+            if "ls-remote" in cmd:
+                raise subprocess.TimeoutExpired(cmd, kw.get("timeout"))
+            return real_run(cmd, *a, **kw)
+
+        with patch("orchestrator.subprocess.run", side_effect=hung):
+            orchestrator.git_pull("proj", str(project))
+        assert orchestrator.pull_stats["proj"]["outcome"] == "pulled"
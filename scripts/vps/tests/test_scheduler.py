@@ -0,0 +1,219 @@
+# scripts/vps/tests/test_scheduler.py
+"""Unit tests for scripts/vps/scheduler.py (weighted fair slot allocation).
+
+Covers: weighted shares, per-project quotas, starvation freedom (aging),
+usage decay, rotation without alphabetical bias, orchestrator.dispatch_scheduled,
+DISPATCH_MODE=fill multi-dispatch.
+"""
+
+import sys
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+VPS_DIR = str(Path(__file__).resolve().parent.parent)
+if VPS_DIR not in sys.path:
+    sys.path.insert(0, VPS_DIR)
+
+import db
+import orchestrator
+from pueue_state import PueueSnapshot
+from scheduler import FairScheduler, WorkItem
+
+
+def _item(pid: str, spec: str = "FTR-1", provider: str = "claude") -> WorkItem:
+    return WorkItem(pid, f"/tmp/{pid}", spec, provider)
+
+
+def _simulate(sched: FairScheduler, pids: list[str], cycles: int, step: float = 60.0) -> Counter:
+    """One free claude slot per cycle; every project always has work; tasks finish in-cycle."""
+    wins: Counter = Counter()
+    for n in range(cycles):
+        now = n * step
+        grants = sched.allocate([_item(p) for p in pids], {"claude": 1}, {}, now)
+        for g in grants:
+            sched.charge(g.project_id, now=now)
+            wins[g.project_id] += 1
+    return wins
+
+
+class TestFairScheduler:
+    def test_weights_split_slots_proportionally(self):
+        sched = FairScheduler(half_life=0, aging=0)
+        sched.configure({"big": 2.0, "small": 1.0}, {})
+        wins = _simulate(sched, ["big", "small"], 300)
+        assert wins["big"] == 200
+        assert wins["small"] == 100
+
+    def test_equal_weights_rotate_without_alphabetical_bias(self):
+        sched = FairScheduler(half_life=0, aging=0)
+        wins = _simulate(sched, ["zeta", "alpha", "mid"], 30)
+        assert wins == Counter({"zeta": 10, "alpha": 10, "mid": 10})
+
+    def test_quota_caps_held_slots(self):
+        sched = FairScheduler()
+        sched.configure({}, {"greedy": 1})
+        items = [_item("greedy", "FTR-1"), _item("greedy", "FTR-2")]
+        grants = sched.allocate(items, {"claude": 2}, {}, now=0)
+        assert [g.spec_id for g in grants] == ["FTR-1"]
+        assert sched.allocate(items, {"claude": 2}, {"greedy": 1}, now=0) == []
+
+    def test_quota_does_not_waste_slots_others_can_use(self):
+        sched = FairScheduler()
+        sched.configure({}, {"greedy": 1})
+        items = [_item("greedy", "FTR-1"), _item("greedy", "FTR-2"), _item("other")]
+        grants = sched.allocate(items, {"claude": 2}, {}, now=0)
+        assert sorted(g.project_id for g in grants) == ["greedy", "other"]
+
+    def test_low_weight_project_is_not_starved(self):
+        sched = FairScheduler(half_life=0, aging=1.0)
+        sched.configure({"heavy": 100.0, "tiny": 0.01}, {})
+        wins = _simulate(sched, ["heavy", "tiny"], 200)
+        assert wins["tiny"] > 0
+
+    def test_absent_project_keeps_its_aging(self):
+        sched = FairScheduler(half_life=0, aging=1.0)
+        sched.allocate([_item("a"), _item("b")], {"claude": 1}, {}, now=0)
+        (waiting,) = sched._waiting
+        for n in range(1, 4):  # wakeups that only rescanned the served project
+            served = "a" if waiting == "b" else "b"
+            sched.allocate([_item(served)], {"claude": 1}, {}, now=n)
+        assert sched._waiting == {waiting: 1}
+        grants = sched.allocate([_item("a"), _item("b")], {"claude": 1}, {}, now=5)
+        assert grants[0].project_id == waiting
+
+    def test_usage_decays_with_half_life(self):
+        sched = FairScheduler(half_life=100)
+        sched.charge("p", 8.0, now=0)
+        assert sched.usage("p", now=0) == 8.0
+        assert abs(sched.usage("p", now=100) - 4.0) < 1e-9
+        assert abs(sched.usage("p", now=300) - 1.0) < 1e-9
+
+    def test_burst_fades_after_decay(self):
+        sched = FairScheduler(half_life=60, aging=0)
+        for _ in range(20):
+            sched.charge("bursty", now=0)
+        first = sched.allocate([_item("bursty"), _item("quiet")], {"claude": 1}, {}, now=0)
+        assert first[0].project_id == "quiet"
+        later = sched.allocate([_item("bursty")], {"claude": 1}, {}, now=3600)
+        assert later[0].project_id == "bursty"
+        assert sched.usage("bursty", now=3600) < 0.01
+
+    def test_held_slots_count_toward_share(self):
+        sched = FairScheduler(aging=0)
+        grants = sched.allocate([_item("a"), _item("b")], {"claude": 1}, {"a": 2}, now=0)
+        assert grants[0].project_id == "b"
+
+    def test_item_skipped_when_its_provider_has_no_free_slot(self):
+        sched = FairScheduler()
+        items = [_item("a", "FTR-1", "codex"), _item("a", "FTR-2", "claude")]
+        grants = sched.allocate(items, {"claude": 1, "codex": 0}, {}, now=0)
+        assert [g.spec_id for g in grants] == ["FTR-2"]
+
+
+class TestDispatchScheduled:
+    def test_grants_dispatched_and_charged(self, isolated_db, monkeypatch):
+        db.seed_projects_from_json(
+            [
+                {"project_id": "a", "path": "/tmp/a", "provider": "claude"},
+                {"project_id": "b", "path": "/tmp/b", "provider": "claude"},
+                {"project_id": "c", "path": "/tmp/c", "provider": "claude"},
+            ]
+        )
+        sched = FairScheduler()
+        monkeypatch.setattr(orchestrator, "_scheduler", sched)
+        monkeypatch.setattr(
+            orchestrator,
+            "_project_policy",
+            {"a": {"weight": 1.0, "max_slots": None}, "b": {"weight": 1.0, "max_slots": None}},
+        )
+        dispatched = []
+
+        def fake_dispatch(item):
+            dispatched.append(item.project_id)
+            return db.try_acquire_slot(item.project_id, item.provider, 100 + len(dispatched))
+
+        with patch.object(orchestrator, "dispatch_spec", side_effect=fake_dispatch):
+            n = orchestrator.dispatch_scheduled([_item("a"), _item("b"), _item("c")])
+
+        # schema.sql seeds two claude slots
+        assert n == 2
+        assert len(dispatched) == 2
+        assert all(sched.usage(pid) > 0 for pid in dispatched)
+        assert db.get_free_slots_by_provider()["claude"] == 0
+        assert db.get_slots_by_project() == {pid: 1 for pid in dispatched}
+
+    def test_wakeup_cycle_weighs_projects_not_rescanned(self, monkeypatch):
+        monkeypatch.setattr(orchestrator, "_pending", {"a": [_item("a")], "gone": [_item("gone")]})
+        monkeypatch.setattr(orchestrator, "_in_flight", {})
+        projects = [{"project_id": "a", "path": "/tmp/a"}, {"project_id": "b", "path": "/tmp/b"}]
+        with patch.object(orchestrator, "process_project", return_value=[_item("b")]):
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                orchestrator.process_all_projects(pool, projects[1:], deadline=5)
+        assert orchestrator.pending_work(projects) == [_item("a"), _item("b")]
+        assert "gone" not in orchestrator._pending
+
+    def test_empty_work_does_not_touch_db(self):
+        with patch.object(orchestrator.db, "get_free_slots_by_provider") as free:
+            assert orchestrator.dispatch_scheduled([]) == 0
+        free.assert_not_called()
+
+
+FILL_BACKLOG = """| ID | Task | Status |
+|----|------|--------|
+| FTR-1 | a | queued |
+| FTR-2 | b | queued |
+| FTR-3 | c | resumed |
+| FTR-4 | d | done |
+"""
+
+
+class TestFillDispatch:
+    @pytest.fixture
+    def project(self, tmp_path, isolated_db, monkeypatch):
+        (tmp_path / "ai").mkdir()
+        (tmp_path / "ai" / "backlog.md").write_text(FILL_BACKLOG)
+        db.seed_projects_from_json(
+            [{"project_id": "p", "path": str(tmp_path), "provider": "claude"}]
+        )
+        monkeypatch.setattr(orchestrator, "_project_policy", {})
+        monkeypatch.setattr(orchestrator, "_scheduler", FairScheduler())
+        monkeypatch.setattr(orchestrator, "_pueue", PueueSnapshot({}))
+        monkeypatch.setenv("DISPATCH_MODE", "fill")
+        return str(tmp_path)
+
+    def _run_cycle(self, project, start_id=500):
+        ids = iter(range(start_id, start_id + 100))
+
+        def fake_add(group, label, cmd, env=None):
+            tid = next(ids)
+            orchestrator._pueue.note_added(tid, label)
+            return tid
+
+        with patch.object(orchestrator, "_pueue_add", side_effect=fake_add):
+            items = orchestrator.collect_backlog("p", project)
+            return orchestrator.dispatch_scheduled(items)
+
+    def test_fills_free_slots_in_one_cycle(self, project, monkeypatch):
+        monkeypatch.setenv("MAX_SLOTS_PER_PROJECT", "4")
+        # schema.sql seeds two claude slots
+        assert self._run_cycle(project) == 2
+        assert db.get_slots_by_project() == {"p": 2}
+
+    def test_single_mode_dispatches_one(self, project, monkeypatch):
+        monkeypatch.setenv("DISPATCH_MODE", "single")
+        assert self._run_cycle(project) == 1
+
+    def test_per_project_cap(self, project, monkeypatch):
+        monkeypatch.setenv("MAX_SLOTS_PER_PROJECT", "1")
+        assert self._run_cycle(project) == 1
+        assert orchestrator.collect_backlog("p", project) == []
+
+    def test_skips_specs_already_in_pueue(self, project, monkeypatch):
+        monkeypatch.setenv("MAX_SLOTS_PER_PROJECT", "4")
+        orchestrator._pueue.note_added(1, "p:FTR-1")
+        specs = [i.spec_id for i in orchestrator.collect_backlog("p", project)]
+        assert specs == ["FTR-2", "FTR-3"]
@@ -0,0 +1,104 @@
+# scripts/vps/tests/test_spec_catalog.py
+"""Unit tests for scripts/vps/spec_catalog.py (cached backlog/spec index).
+
+Covers: row parsing, next_dispatchable, mtime invalidation, exact spec-file
+lookup, provider override caching, orchestrator.scan_backlog integration.
+"""
+
+import os
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+VPS_DIR = str(Path(__file__).resolve().parent.parent)
+if VPS_DIR not in sys.path:
+    sys.path.insert(0, VPS_DIR)
+
+import orchestrator
+import spec_catalog
+
+BACKLOG = """# Backlog
+
+| ID | Task | Status | Priority | Feature.md |
+|----|------|--------|----------|------------|
+| FTR-1 | first | done | P1 | [spec](features/FTR-1.md) |
+| ARCH-176 | parent | split | P0 | - |
+| ARCH-176a | child | queued | P0 | - |
+| BUG-7 | bug | resumed | P2 | - |
+"""
+
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / "ai" / "features").mkdir(parents=True)
+    (tmp_path / "ai" / "backlog.md").write_text(BACKLOG)
+    (tmp_path / "ai" / "features" / "ARCH-176-parent.md").write_text("**Status:** split\n")
+    (tmp_path / "ai" / "features" / "ARCH-176a-child.md").write_text(
+        "provider: codex\n**Status:** queued\n"
+    )
+    return tmp_path
+
+
+def _touch_later(path: Path, text: str) -> None:
+    st = path.stat()
+    path.write_text(text)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+class TestBacklogRows:
+    def test_parses_structured_rows(self, project):
+        cat = spec_catalog.SpecCatalog(str(project))
+        rows = {r.spec_id: r for r in cat.rows()}
+        assert rows["FTR-1"].status == "done"
+        assert rows["ARCH-176"].status == "split"
+        assert rows["ARCH-176a"].status == "queued" and rows["ARCH-176a"].dispatchable
+        assert [r.spec_id for r in cat.dispatchable()] == ["ARCH-176a", "BUG-7"]
+        assert cat.next_dispatchable().spec_id == "ARCH-176a"
+
+    def test_has_status_matches_exact_id_cell(self, project):
+        cat = spec_catalog.SpecCatalog(str(project))
+        assert cat.has_status("ARCH-176a", "queued")
+        assert not cat.has_status("ARCH-176", "queued")
+        assert cat.has_status("ARCH-176", "split")
+
+    def test_reparses_only_when_backlog_changes(self, project):
+        cat = spec_catalog.SpecCatalog(str(project))
+        cat.rows()
+        with patch.object(Path, "read_text", side_effect=AssertionError("reparsed")):
+            assert cat.next_dispatchable().spec_id == "ARCH-176a"
+        _touch_later(project / "ai" / "backlog.md", BACKLOG.replace("| queued |", "| done |"))
+        assert cat.next_dispatchable().spec_id == "BUG-7"
+
+    def test_missing_backlog(self, tmp_path):
+        cat = spec_catalog.SpecCatalog(str(tmp_path))
+        assert cat.rows() == [] and cat.next_dispatchable() is None
+
+
+class TestSpecFiles:
+    def test_exact_id_lookup(self, project):
+        cat = spec_catalog.SpecCatalog(str(project))
+        assert cat.spec_file("ARCH-176").name == "ARCH-176-parent.md"
+        assert cat.spec_file("ARCH-176a").name == "ARCH-176a-child.md"
+        assert cat.spec_file("FTR-404") is None
+
+    def test_provider_override(self, project):
+        cat = spec_catalog.SpecCatalog(str(project))
+        assert cat.spec_provider("ARCH-176a") == "codex"
+        assert cat.spec_provider("ARCH-176") is None
+        _touch_later(project / "ai" / "features" / "ARCH-176a-child.md", "provider: gemini\n")
+        assert cat.spec_provider("ARCH-176a") == "gemini"
+
+
+class TestScanBacklogUsesCatalog:
+    def test_dispatches_next_spec_with_provider_override(self, project, seed_project):
+        with (
+            patch("orchestrator.pueue_has_active_label", return_value=False),
+            patch("orchestrator._pueue_add", return_value=77) as add,
+        ):
+            assert orchestrator.scan_backlog("testproject", str(project)) is True
+        group, label, cmd = add.call_args.args
+        assert group == "codex-runner"
+        assert label == "testproject:ARCH-176a"
+        assert cmd[-1] == "/autopilot ARCH-176a"
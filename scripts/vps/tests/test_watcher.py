@@ -0,0 +1,106 @@
+# scripts/vps/tests/test_watcher.py
+"""Unit tests for scripts/vps/watcher.py (event-driven orchestrator wakeups).
+
+Covers: build_targets key mapping, polling fallback, inotify backend,
+orchestrator.select_projects.
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+VPS_DIR = str(Path(__file__).resolve().parent.parent)
+if VPS_DIR not in sys.path:
+    sys.path.insert(0, VPS_DIR)
+
+import orchestrator
+import watcher
+
+
+@pytest.fixture
+def layout(tmp_path):
+    """Two projects with ai/inbox + backlog, a script dir and projects.json."""
+    projects = []
+    for pid in ("alpha", "beta"):
+        (tmp_path / pid / "ai" / "inbox").mkdir(parents=True)
+        (tmp_path / pid / "ai" / "backlog.md").write_text("| ID | Status |\n")
+        projects.append({"project_id": pid, "path": str(tmp_path / pid)})
+    script_dir = tmp_path / "vps"
+    script_dir.mkdir()
+    projects_json = script_dir / "projects.json"
+    projects_json.write_text("[]")
+    targets = watcher.build_targets(projects, script_dir, projects_json)
+    return tmp_path, script_dir, targets
+
+
+class TestBuildTargets:
+    def test_key_mapping(self, layout):
+        root, script_dir, targets = layout
+        inbox_fns = targets[str(root / "alpha" / "ai" / "inbox")]
+        assert [fn("idea.md") for fn in inbox_fns] == ["alpha"]
+        assert [fn("idea.txt") for fn in inbox_fns] == [None]
+        ai_fns = targets[str(root / "beta" / "ai")]
+        assert [fn("backlog.md") for fn in ai_fns] == ["beta"]
+        assert [fn("ideas.md") for fn in ai_fns] == [None]
+        script_keys = {
+            fn(n)
+            for fn in targets[str(script_dir)]
+            for n in (".run-now-alpha", ".review-trigger", "projects.json", ".task-cmd-x.txt")
+        }
+        assert script_keys == {"alpha", watcher.GLOBAL, None}
+
+
+class TestPollingBackend:
+    def test_detects_new_inbox_file_and_backlog_edit(self, layout):
+        root, script_dir, targets = layout
+        wake = threading.Event()
+        w = watcher.ChangeWatcher(wake, mode="poll")
+        w.watch(targets)
+        w.poll_once()  # baseline
+        assert not wake.is_set() and w.drain() == set()
+
+        (root / "alpha" / "ai" / "inbox" / "new-idea.md").write_text("**Status:** new")
+        (root / "beta" / "ai" / "backlog.md").write_text("| FTR-1 | queued |\n")
+        (script_dir / ".task-cmd-x.txt").write_text("ignored")
+        w.poll_once()
+        assert wake.is_set()
+        assert w.drain() == {"alpha", "beta"}
+        assert w.drain() == set()
+
+    def test_unchanged_tree_stays_quiet(self, layout):
+        _, _, targets = layout
+        wake = threading.Event()
+        w = watcher.ChangeWatcher(wake, mode="poll")
+        w.watch(targets)
+        w.poll_once()
+        w.poll_once()
+        assert not wake.is_set()
+
+
+@pytest.mark.skipif(watcher._load_inotify() is None, reason="inotify unavailable")
+class TestInotifyBackend:
+    def test_run_now_trigger_wakes(self, layout):
+        _, script_dir, targets = layout
+        wake = threading.Event()
+        w = watcher.ChangeWatcher(wake, mode="inotify", poll_interval=0.2)
+        assert w.backend == "inotify"
+        w.watch(targets)
+        w.start()
+        try:
+            (script_dir / ".run-now-beta").write_text("")
+            assert wake.wait(5)
+            assert "beta" in w.drain()
+        finally:
+            w.stop()
+
+
+class TestSelectProjects:
+    def test_full_cycle_processes_all(self):
+        projects = [{"project_id": "a"}, {"project_id": "b"}]
+        assert orchestrator.select_projects(projects, set(), full=True) == projects
+
+    def test_wakeup_processes_only_affected(self):
+        projects = [{"project_id": "a"}, {"project_id": "b"}]
+        assert orchestrator.select_projects(projects, {"b"}, full=False) == [{"project_id": "b"}]
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Module: watcher
+Role: File-change wakeups for the orchestrator poll loop (inotify, polling fallback).
+Uses: ctypes (libc inotify), select, threading (stdlib)
+Used by: orchestrator.py (main loop)
+
+Watches every project's ai/inbox/ and ai/backlog.md, projects.json and the
+trigger files in SCRIPT_DIR (.run-now-<id>, .review-trigger). Each change is
+mapped to a key — a project_id, or GLOBAL for changes that need a full
+cycle — and the shared wake Event is set so the main loop stops sleeping.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Callable
+
+log = logging.getLogger("watcher")
+
+GLOBAL = "*"
+
+# name → key (project_id / GLOBAL) or None when the file is not interesting
+KeyFn = Callable[[str], "str | None"]
+
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_WATCH_MASK = _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+_EVENT_HDR = struct.Struct("iIII")
+
+
+def build_targets(projects: list[dict], script_dir: Path, projects_json: Path) -> dict:
+    """Return {directory: [KeyFn, ...]} for everything the orchestrator reacts to."""
+    targets: dict[str, list[KeyFn]] = {}
+
+    def add(directory: Path, fn: KeyFn) -> None:
+        targets.setdefault(str(directory), []).append(fn)
+
+    for proj in projects:
+        pid, ai_dir = proj["project_id"], Path(proj["path"]) / "ai"
+        add(ai_dir / "inbox", lambda name, pid=pid: pid if name.endswith(".md") else None)
+        add(ai_dir, lambda name, pid=pid: pid if name == "backlog.md" else None)
+
+    def script_key(name: str) -> str | None:
+        if name == ".review-trigger":
+            return GLOBAL
+        if name.startswith(".run-now-"):
+            return name[len(".run-now-") :] or None
+        return None
+
+    add(script_dir, script_key)
+    pj_name = projects_json.name
+    add(projects_json.parent, lambda name: GLOBAL if name == pj_name else None)
+    return targets
+
+
+def _load_inotify():
+    """Return libc with inotify symbols, or None (non-Linux / restricted env)."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    except OSError:
+        return None
+    return libc if hasattr(libc, "inotify_init1") else None
+
+
+class ChangeWatcher:
+    """Background thread that turns file changes into wakeups.
+
+    mode: "auto" (inotify, else polling), "inotify", "poll", or "off".
+    Polling stats only the watched directories' entries every
+    `poll_interval` seconds, so idle cost stays flat.
+    """
+
+    def __init__(self, wake: Event, mode: str = "auto", poll_interval: float = 5.0):
+        self._wake = wake
+        self._halt = Event()
+        self._lock = Lock()
+        self._changed: set[str] = set()
+        self._targets: dict[str, list[KeyFn]] = {}
+        self.poll_interval = poll_interval
+        self._thread: Thread | None = None
+        self._libc = None
+        self._fd = -1
+        self._wd_dir: dict[int, str] = {}
+        self._dir_wd: dict[str, int] = {}
+        self._seen: dict[str, dict[str, tuple]] = {}
+
+        if mode in ("auto", "inotify"):
+            self._libc = _load_inotify()
+            if self._libc is not None:
+                self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+                if self._fd < 0:
+                    log.warning("inotify_init1 failed (errno=%d), polling", ctypes.get_errno())
+                    self._libc = None
+        if mode == "off":
+            self.backend = "off"
+        else:
+            self.backend = "inotify" if self._libc is not None else "poll"
+
+    # --- public API -------------------------------------------------------
+
+    def watch(self, targets: dict) -> None:
+        """Replace the watched set. Missing directories are retried on the next call."""
+        with self._lock:
+            self._targets = targets
+            if self.backend != "inotify":
+                return
+            for directory in list(self._dir_wd):
+                if directory not in targets:
+                    wd = self._dir_wd.pop(directory)
+                    self._wd_dir.pop(wd, None)
+                    self._libc.inotify_rm_watch(self._fd, wd)
+            for directory in targets:
+                if directory in self._dir_wd or not os.path.isdir(directory):
+                    continue
+                wd = self._libc.inotify_add_watch(self._fd, directory.encode(), _WATCH_MASK)
+                if wd < 0:
+                    log.warning(
+                        "inotify_add_watch %s failed (errno=%d)", directory, ctypes.get_errno()
+                    )
+                    continue
+                self._dir_wd[directory] = wd
+                self._wd_dir[wd] = directory
+
+    def start(self) -> None:
+        if self.backend == "off" or self._thread is not None:
+            return
+        self._thread = Thread(target=self._run, name="watcher", daemon=True)
+        self._thread.start()
+        log.info("watcher started backend=%s", self.backend)
+
+    def stop(self) -> None:
+        self._halt.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def drain(self) -> set[str]:
+        """Return and clear the keys changed since the last drain."""
+        with self._lock:
+            changed, self._changed = self._changed, set()
+        return changed
+
+    # --- internals --------------------------------------------------------
+
+    def _emit(self, directory: str, name: str) -> None:
+        for fn in self._targets.get(directory, ()):
+            key = fn(name)
+            if key:
+                self._changed.add(key)
+                self._wake.set()
+
+    def _run(self) -> None:
+        while not self._halt.is_set():
+            try:
+                if self.backend == "inotify":
+                    ready, _, _ = select.select([self._fd], [], [], self.poll_interval)
+                    if ready:
+                        self._read_events()
+                else:
+                    self.poll_once()
+                    self._halt.wait(self.poll_interval)
+            except Exception:
+                log.exception("watcher error")
+                self._halt.wait(self.poll_interval)
+
+    def _read_events(self) -> None:
+        try:
+            buf = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        with self._lock:
+            offset = 0
+            while offset + _EVENT_HDR.size <= len(buf):
+                wd, mask, _cookie, length = _EVENT_HDR.unpack_from(buf, offset)
+                offset += _EVENT_HDR.size
+                name = buf[offset : offset + length].rstrip(b"\0").decode(errors="replace")
+                offset += length
+                if mask & _IN_Q_OVERFLOW:
+                    self._changed.add(GLOBAL)
+                    self._wake.set()
+                    continue
+                directory = self._wd_dir.get(wd)
+                if directory is None:
+                    continue
+                if mask & _IN_IGNORED:
+                    # Directory removed — forget it; watch() re-adds if it returns.
+                    self._wd_dir.pop(wd, None)
+                    self._dir_wd.pop(directory, None)
+                    continue
+                self._emit(directory, name)
+
+    def poll_once(self) -> None:
+        """One polling pass: diff (mtime, size) of matching entries per directory."""
+        with self._lock:
+            for directory, fns in self._targets.items():
+                current: dict[str, tuple] = {}
+                try:
+                    with os.scandir(directory) as it:
+                        for entry in it:
+                            if any(fn(entry.name) for fn in fns):
+                                st = entry.stat()
+                                current[entry.name] = (st.st_ino, st.st_mtime_ns, st.st_size)
+                except OSError:
+                    pass
+                previous = self._seen.get(directory)
+                self._seen[directory] = current
+                if previous is None:
+                    continue  # first observation is the baseline
+                for name, sig in current.items():
+                    if previous.get(name) != sig:
+                        self._emit(directory, name)
@@ -220,7 +220,7 @@ def test_verify_status_sync_both_done(tmp_path, caplog):
     )
 
 
-def test_verify_status_sync_fixes_spec(tmp_path, caplog):
+def test_verify_status_sync_fixes_spec(tmp_db, tmp_path, caplog):
     """Spec in_progress → auto-fixed to done, file content updated."""
     features = tmp_path / "ai" / "features"
     features.mkdir(parents=True)
@@ -240,7 +240,7 @@ def test_verify_status_sync_fixes_spec(tmp_path, caplog):
     assert any("STATUS_FIX: spec BUG-300" in r.message for r in caplog.records)
 
 
-def test_verify_status_sync_fixes_backlog(tmp_path, caplog):
+def test_verify_status_sync_fixes_backlog(tmp_db, tmp_path, caplog):
     """Backlog in_progress → auto-fixed to done, file content updated."""
     features = tmp_path / "ai" / "features"
     features.mkdir(parents=True)
@@ -260,8 +260,8 @@ def test_verify_status_sync_fixes_backlog(tmp_path, caplog):
     assert any("STATUS_FIX: backlog TECH-400" in r.message for r in caplog.records)
 
 
-def test_verify_status_sync_fixes_both(tmp_path, caplog):
-    """Neither done → both auto-fixed, git commit attempted."""
+def test_verify_status_sync_fixes_both(tmp_db, tmp_path, caplog):
+    """Neither done → both auto-fixed, one batched git commit queued."""
     features = tmp_path / "ai" / "features"
     features.mkdir(parents=True)
     spec = features / "FTR-500-new-thing.md"
@@ -279,12 +279,19 @@ def test_verify_status_sync_fixes_both(tmp_path, caplog):
     # Files fixed
     assert "**Status:** done" in spec.read_text()
     assert "done" in backlog.read_text().split("FTR-500")[1].split("\n")[0]
-    # Git commit+push attempted (3 calls: add, commit, push)
-    assert mock_run.call_count == 3
+    # Git commit+push deferred to one git_push job (no git in the callback)
+    mock_run.assert_not_called()
+    assert db.claim_job() is None  # not due before the batch window
+    with db.read_db() as conn:
+        row = conn.execute("SELECT step, payload FROM callback_jobs").fetchone()
+    assert row["step"] == "git_push"
+    payload = json.loads(row["payload"])
+    assert payload["files"] == ["ai/features/FTR-500-new-thing.md", "ai/backlog.md"]
+    assert payload["marks"] == ["FTR-500 as done"]
     assert any("auto-fixed 2 file(s)" in r.message for r in caplog.records)
 
 
-def test_verify_status_sync_failed_sets_blocked(tmp_path, caplog):
+def test_verify_status_sync_failed_sets_blocked(tmp_db, tmp_path, caplog):
     """Failed autopilot → spec and backlog set to blocked."""
     features = tmp_path / "ai" / "features"
     features.mkdir(parents=True)